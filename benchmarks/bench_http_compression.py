@@ -0,0 +1,137 @@
+"""
+HTTP 본문 압축 벤치마크
+
+SQL 샘플 코퍼스로 만든 요청 / 응답 본문에 대해 인코딩별(gzip, zstd) 압축 전/후 바이트 수,
+압축 / 해제 시간과 지정한 링크 대역폭에서의 예상 전송 시간 절감량을 측정한다.
+
+- 요청: 시스템 프롬프트 + 대화 내역(6개) + MSTR 설계표 프롬프트로 구성한 멀티턴 요청
+- 응답: SQL 본문을 답변 내용으로 넣은 비스트리밍 응답 (대형 설계표 응답 대용)
+- SSE: 같은 답변을 토큰 단위 이벤트로 나눠 이벤트마다 flush하며 압축
+
+사용법:
+    python -m benchmarks.bench_http_compression [SQL 디렉토리] [대역폭(Mbps)]
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+from src.client import SYSTEM_PROMPT, encode_body, get_mstr_design_prompt
+from src.config import settings
+from src.http_compression import SUPPORTED_ENCODINGS, StreamCompressor, compress, decompress
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(__file__), "sql_samples")
+DEFAULT_BANDWIDTH_MBPS = 10.0
+
+
+def build_request(sql: str) -> dict:
+    history = []
+    for i in range(3):
+        history.append({"role": "user", "content": f"{i + 1}번째 테이블의 컬럼 설명을 정리해 주세요."})
+        history.append({"role": "assistant", "content": sql[:2000]})
+    return {
+        "model": "gpt-4o",
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT}, *history,
+                     {"role": "user", "content": get_mstr_design_prompt(sql)}],
+        "stream": False,
+    }
+
+
+def build_response(answer: str) -> dict:
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+    }
+
+
+def build_sse_events(answer: str, token_chars: int = 4) -> list:
+    events = []
+    for i in range(0, len(answer), token_chars):
+        chunk = build_response("")
+        chunk["object"] = "chat.completion.chunk"
+        chunk["choices"] = [{"index": 0, "delta": {"content": answer[i:i + token_chars]}, "finish_reason": None}]
+        events.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+    return events
+
+
+def transfer_ms(nbytes: int, mbps: float) -> float:
+    return nbytes * 8 / (mbps * 1_000_000) * 1000
+
+
+def measure(body: bytes, encoding: str, repeat: int) -> tuple:
+    """(압축 후 바이트, 압축 ms, 해제 ms)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encoded = compress(body, encoding, settings)
+    compress_ms = (time.perf_counter() - started) / repeat * 1000
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decompress(encoded, encoding, len(body))
+    decompress_ms = (time.perf_counter() - started) / repeat * 1000
+    return len(encoded), compress_ms, decompress_ms
+
+
+def measure_sse(events: list, encoding: str) -> tuple:
+    """(압축 후 바이트, 이벤트당 압축 ms)"""
+    compressor = StreamCompressor(encoding, settings)
+    started = time.perf_counter()
+    size = sum(len(compressor.compress(event)) for event in events) + len(compressor.finish())
+    return size, (time.perf_counter() - started) / len(events) * 1000
+
+
+def run(corpus_dir: str = DEFAULT_CORPUS_DIR, mbps: float = DEFAULT_BANDWIDTH_MBPS, repeat: int = 20) -> None:
+    paths = sorted(glob.glob(os.path.join(corpus_dir, "*.sql")))
+    if not paths:
+        print(f"SQL 파일이 없습니다: {corpus_dir}")
+        return
+
+    print(f"링크 대역폭 {mbps:g} Mbps 기준, 인코딩: {', '.join(SUPPORTED_ENCODINGS)}")
+    print(f"{'파일':<32} {'종류':<5} {'인코딩':<6} {'원본(B)':>9} {'압축(B)':>9} {'비율':>6} "
+          f"{'압축ms':>7} {'해제ms':>7} {'절감ms':>8}")
+    totals = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            sql = f.read()
+        name = os.path.basename(path)[:32]
+        request_body = json.dumps(build_request(sql), ensure_ascii=False).encode("utf-8")
+        response_body = json.dumps(build_response(sql), ensure_ascii=False).encode("utf-8")
+        for kind, body in (("요청", request_body), ("응답", response_body)):
+            for encoding in SUPPORTED_ENCODINGS:
+                size, compress_ms, decompress_ms = measure(body, encoding, repeat)
+                saved_ms = transfer_ms(len(body) - size, mbps) - compress_ms - decompress_ms
+                total = totals.setdefault((kind, encoding), [0, 0, 0.0])
+                total[0] += len(body)
+                total[1] += size
+                total[2] += saved_ms
+                print(f"{name:<32} {kind:<5} {encoding:<6} {len(body):>9} {size:>9} {size / len(body):>6.1%} "
+                      f"{compress_ms:>7.2f} {decompress_ms:>7.2f} {saved_ms:>8.1f}")
+
+        events = build_sse_events(sql)
+        raw = sum(len(event) for event in events)
+        for encoding in SUPPORTED_ENCODINGS:
+            size, per_event_ms = measure_sse(events, encoding)
+            saved_ms = transfer_ms(raw - size, mbps) - per_event_ms * len(events)
+            total = totals.setdefault(("SSE", encoding), [0, 0, 0.0])
+            total[0] += raw
+            total[1] += size
+            total[2] += saved_ms
+            print(f"{name:<32} {'SSE':<5} {encoding:<6} {raw:>9} {size:>9} {size / raw:>6.1%} "
+                  f"{per_event_ms:>7.3f} {'-':>7} {saved_ms:>8.1f}")
+
+    print()
+    for (kind, encoding), (raw, size, saved_ms) in totals.items():
+        print(f"합계 {kind:<5} {encoding:<6} {raw:>10} -> {size:>10} ({size / raw:.1%}), "
+              f"예상 전송 시간 절감 {saved_ms:.1f}ms")
+
+    # 실제 클라이언트가 보내는 본문 (REQUEST_COMPRESSION 설정 적용)
+    body, headers = encode_body(build_request(sql))
+    print(f"\nclient.encode_body: {headers.get('Content-Encoding', 'identity')} {len(body)}바이트")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS_DIR,
+        float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BANDWIDTH_MBPS)
@@ -0,0 +1,46 @@
+"""
+프롬프트 압축 벤치마크
+
+SQL 샘플 코퍼스에 대해 get_mstr_design_prompt 페이로드의 압축 전/후 추정 토큰 수와 처리 시간을 측정한다.
+
+사용법:
+    python -m benchmarks.bench_prompt_compression [SQL 디렉토리]
+"""
+import glob
+import os
+import sys
+import time
+
+from src.client import get_mstr_design_prompt
+from src.prompt_compression import compress_content, estimate_tokens
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(__file__), "sql_samples")
+
+
+def run(corpus_dir: str = DEFAULT_CORPUS_DIR, repeat: int = 20) -> None:
+    paths = sorted(glob.glob(os.path.join(corpus_dir, "*.sql")))
+    if not paths:
+        print(f"SQL 파일이 없습니다: {corpus_dir}")
+        return
+
+    total_before = total_after = 0
+    print(f"{'파일':<40} {'압축 전':>8} {'압축 후':>8} {'절감률':>7} {'소요(ms)':>9}")
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            prompt = get_mstr_design_prompt(f.read())
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            compressed = compress_content(prompt)
+        elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+
+        before, after = estimate_tokens(prompt), estimate_tokens(compressed)
+        total_before += before
+        total_after += after
+        print(f"{os.path.basename(path):<40} {before:>8} {after:>8} {1 - after / before:>7.1%} {elapsed_ms:>9.2f}")
+
+    print(f"{'합계':<40} {total_before:>8} {total_after:>8} {1 - total_after / total_before:>7.1%}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS_DIR)
@@ -0,0 +1,115 @@
+"""
+서버 / 클라이언트 시작 시간 벤치마크
+
+- import 시간: 새 프로세스에서 python -X importtime으로 모듈을 import한 누적 시간 (반복 중 최솟값, 중앙값)
+  과 자체 시간이 큰 모듈 목록
+- 시작 시간: uvicorn src.server:create_app --factory 프로세스 실행부터 /health/live 응답까지의 시간
+  (업스트림은 연결되지 않는 주소를 사용하므로 사전 연결이 시작을 막지 않는지도 함께 확인)
+
+--budget-ms를 주면 src.server import 시간(최솟값)이 예산을 넘을 때 종료 코드 1로 끝난다 (CI 확인용).
+
+사용법:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 10 --budget-ms 800
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+MODULES = ["src.server", "src.client"]
+
+
+def import_profile(module: str) -> Tuple[int, Dict[str, int]]:
+    """(모듈 누적 import 시간 us, 모듈별 자체 시간 us) - 새 프로세스에서 측정"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    total, self_times = 0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        self_times[name.strip()] = int(self_us)
+        if name.strip() == module:
+            total = int(cumulative_us)
+    return total, self_times
+
+
+def measure_imports(module: str, repeat: int) -> Tuple[List[float], Dict[str, int]]:
+    """반복 측정한 누적 import 시간(ms) 목록과 가장 빠른 실행의 모듈별 자체 시간"""
+    runs = [import_profile(module) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run[0])
+    return [total / 1000 for total, _ in runs], best[1]
+
+
+def measure_startup(port: int, timeout: float = 30.0) -> float:
+    """서버 프로세스 실행부터 /health/live 응답까지의 시간 (초)"""
+    env = {
+        **os.environ,
+        "LLM_API_BASE_URL": "http://127.0.0.1:9/v1/chat/completions",   # 연결되지 않는 업스트림
+        "API_KEY": os.environ.get("API_KEY") or "startup-bench",
+        "CAPTURE_ENABLED": "false",
+        "METERING_ENABLED": "false",
+        "CONFIG_WATCH_INTERVAL": "0",
+        "LOG_LEVEL": "WARNING",
+    }
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.server:create_app", "--factory", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"서버 프로세스가 종료되었습니다 (종료 코드 {proc.returncode})")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health/live", timeout=1.0).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"서버가 {timeout:g}초 안에 시작되지 않았습니다.")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run(repeat: int, top: int, port: int, budget_ms: Optional[float] = None, startup: bool = True) -> int:
+    server_ms = None
+    for module in MODULES:
+        times, self_times = measure_imports(module, repeat)
+        if module == "src.server":
+            server_ms = min(times)
+        print(f"{module}: import 최소 {min(times):.0f}ms, 중앙값 {statistics.median(times):.0f}ms ({repeat}회)")
+        for name, us in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f"    {us / 1000:>7.1f}ms  {name}")
+
+    if startup:
+        startups = [measure_startup(port) * 1000 for _ in range(repeat)]
+        print(f"서버 시작 (/health/live 응답까지): 최소 {min(startups):.0f}ms, "
+              f"중앙값 {statistics.median(startups):.0f}ms ({repeat}회)")
+
+    if budget_ms is not None and server_ms > budget_ms:
+        print(f"❌ src.server import {server_ms:.0f}ms > 예산 {budget_ms:g}ms")
+        return 1
+    if budget_ms is not None:
+        print(f"✅ src.server import {server_ms:.0f}ms <= 예산 {budget_ms:g}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="서버 / 클라이언트 import 및 시작 시간 측정")
+    parser.add_argument("--repeat", type=int, default=5, help="측정 반복 횟수")
+    parser.add_argument("--top", type=int, default=10, help="자체 import 시간 상위 모듈 수")
+    parser.add_argument("--port", type=int, default=9396, help="시작 시간 측정용 서버 포트")
+    parser.add_argument("--budget-ms", type=float, help="src.server import 시간 예산 (초과 시 종료 코드 1)")
+    parser.add_argument("--no-startup", action="store_true", help="서버 시작 시간 측정 생략")
+    args = parser.parse_args()
+    sys.exit(run(args.repeat, args.top, args.port, args.budget_ms, not args.no_startup))
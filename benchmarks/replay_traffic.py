@@ -0,0 +1,323 @@
+"""
+캡처한 트래픽 재현 (운영 트래픽 형태로 프록시 성능 검증)
+
+CAPTURE_ENABLED=true로 기록한 캡처 파일의 요청을 기록된 도착 간격 그대로 프록시에 다시 보낸다.
+업스트림은 로컬 대역(stand-in) 서버가 맡아 요청마다 기록된 첫 토큰 지연 / 토큰 간 간격 / 전체 지연과
+오류를 그대로 재현하므로, 같은 캡처 파일로 프록시 변경 전/후를 오프라인에서 비교할 수 있다.
+
+- 메시지 내용은 기록된 역할과 추정 토큰 수에 맞춘 고정 문자열로 생성한다 (실행마다 동일).
+- 마지막 메시지 앞에 [replay:<번호>]를 붙여 대역 서버가 어떤 기록을 재현할지 찾는다.
+- 클라이언트가 끊었던 요청(cancelled)은 같은 시점에 연결을 끊는다.
+
+사용법:
+    # 대역 서버를 띄우고 프록시도 대역 서버를 업스트림으로 실행
+    python -m benchmarks.replay_traffic data/capture.jsonl.gz --spawn-proxy --output after.json
+    # 이미 실행 중인 프록시 사용 (프록시의 LLM_API_BASE_URL을 대역 서버 주소로 설정)
+    python -m benchmarks.replay_traffic data/capture.jsonl.gz --proxy http://localhost:9393
+    # 이전 결과와 비교
+    python -m benchmarks.replay_traffic data/capture.jsonl.gz --spawn-proxy --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from src.traffic_capture import load_capture
+
+CHAT_PATH = "/v1/chat/completions"
+REPLAY_MARKER = re.compile(r"^\[replay:(\d+)\] ")
+
+
+def filler(tokens: int) -> str:
+    """추정 토큰 수(4자당 1토큰)에 맞춘 고정 문자열"""
+    return "".join(f"w{i % 100:02d} " for i in range(max(tokens, 1)))
+
+
+def build_payload(index: int, record: dict) -> dict:
+    """기록된 형태대로 요청 본문 생성"""
+    messages = [{"role": role, "content": filler(tokens)} for role, tokens in record["messages"]]
+    if not messages:
+        messages = [{"role": "user", "content": filler(1)}]
+    messages[-1]["content"] = f"[replay:{index}] " + messages[-1]["content"]
+    payload = {"model": record["model"], "messages": messages, "stream": record["stream"]}
+    if record.get("max_tokens"):
+        payload["max_tokens"] = record["max_tokens"]
+    return payload
+
+
+def stream_chunk(delta: dict, finish_reason: Optional[str] = None, usage: Optional[dict] = None) -> str:
+    chunk = {"choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+    if usage:
+        chunk["usage"] = usage
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def create_standin_app(records: List[dict]) -> FastAPI:
+    """기록된 업스트림 응답 시간을 재현하는 대역 업스트림"""
+    app = FastAPI(title="Replay stand-in upstream")
+    served: Dict[int, int] = {}   # 기록 번호별로 받은 시도 수 (프록시 재시도 재현)
+
+    @app.head(CHAT_PATH)
+    async def probe():
+        # 프록시의 커넥션 사전 연결 확인용
+        return Response()
+
+    @app.post(CHAT_PATH)
+    async def chat(request: Request):
+        body = await request.json()
+        match = REPLAY_MARKER.match(body["messages"][-1]["content"]) if body.get("messages") else None
+        if match is None or int(match.group(1)) >= len(records):
+            return JSONResponse({"error": {"message": "재현 대상 요청이 아닙니다."}}, status_code=400)
+        index = int(match.group(1))
+        record = records[index]
+        usage = {"prompt_tokens": sum(tokens for _, tokens in record["messages"]),
+                 "completion_tokens": record["completion_tokens"]}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        # 시도별 소요 시간이 기록되어 있으면 시도마다 해당 시간만큼만 지연
+        # (마지막 시도 전까지는 실패한 시도, attempts_ms가 없는 이전 캡처는 한 번의 시도로 간주)
+        attempts_ms = record.get("attempts_ms") or [record["latency_ms"]]
+        attempt = served.get(index, 0)
+        served[index] = attempt + 1
+        attempt_ms = attempts_ms[min(attempt, len(attempts_ms) - 1)]
+
+        if record["status"] == "error" or attempt < len(attempts_ms) - 1:
+            await asyncio.sleep(attempt_ms / 1000)
+            return JSONResponse({"error": {"message": "재현된 업스트림 오류"}}, status_code=500)
+
+        if not record["stream"]:
+            await asyncio.sleep(attempt_ms / 1000)
+            return {
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "tok " * record["completion_tokens"]},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            if "ttfb_ms" in record:
+                await asyncio.sleep(record["ttfb_ms"] / 1000)
+                yield stream_chunk({"content": "tok "})
+                for gap in record.get("gaps_ms", []):
+                    await asyncio.sleep(gap / 1000)
+                    yield stream_chunk({"content": "tok "})
+            else:
+                await asyncio.sleep(record["latency_ms"] / 1000)
+            yield stream_chunk({}, "stop", usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+async def replay_one(client: httpx.AsyncClient, url: str, index: int, record: dict) -> dict:
+    """요청 하나 재현 후 클라이언트 측 측정값 반환"""
+    result = {"index": index, "stream": record["stream"], "recorded_status": record["status"],
+              "status": None, "ttfb_ms": None, "latency_ms": None, "tokens": 0}
+    payload = build_payload(index, record)
+    started = time.perf_counter()
+
+    async def send() -> None:
+        if not record["stream"]:
+            response = await client.post(url, json=payload)
+            result["status"] = response.status_code
+            return
+        async with client.stream("POST", url, json=payload) as response:
+            result["status"] = response.status_code
+            async for line in response.aiter_lines():
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                choices = json.loads(line[6:]).get("choices") or [{}]
+                if choices[0].get("delta", {}).get("content"):
+                    result["tokens"] += 1
+                    if result["ttfb_ms"] is None:
+                        result["ttfb_ms"] = (time.perf_counter() - started) * 1000
+                    if record["status"] == "cancelled" and result["tokens"] >= record["completion_tokens"]:
+                        return
+
+    try:
+        if record["status"] == "cancelled":
+            # 기록된 시점에 연결 종료 (스트리밍은 기록된 토큰 수를 받은 뒤)
+            try:
+                await asyncio.wait_for(send(), timeout=record["latency_ms"] / 1000)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await send()
+    except Exception as e:
+        result["error"] = str(e)
+    result["latency_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def schedule(records: List[dict], speed: float, max_idle: float) -> List[float]:
+    """기록된 도착 간격으로 요청별 발송 시점(초) 계산 (긴 공백은 max_idle로 단축)"""
+    offsets, elapsed = [], 0.0
+    previous = records[0]["t"]
+    for record in records:
+        elapsed += min(record["t"] - previous, max_idle)
+        previous = record["t"]
+        offsets.append(elapsed / speed)
+    return offsets
+
+
+async def replay(records: List[dict], proxy_url: str, speed: float, max_idle: float) -> List[dict]:
+    url = proxy_url.rstrip("/") + CHAT_PATH
+    offsets = schedule(records, speed, max_idle)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(600), limits=httpx.Limits(max_connections=None)) as client:
+        started = time.perf_counter()
+
+        async def delayed(index: int) -> dict:
+            await asyncio.sleep(max(started + offsets[index] - time.perf_counter(), 0))
+            return await replay_one(client, url, index, records[index])
+
+        return await asyncio.gather(*(delayed(i) for i in range(len(records))))
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(int(len(values) * p), len(values) - 1)], 1)
+
+
+def summarize(records: List[dict], results: List[dict]) -> dict:
+    """스트리밍 / 일반 요청별 지연 시간 백분위수와 기록 대비 프록시 추가 지연"""
+    summary = {}
+    for kind, stream in (("stream", True), ("normal", False)):
+        group = [(records[r["index"]], r) for r in results if r["stream"] is stream]
+        if not group:
+            continue
+        ok = [(rec, r) for rec, r in group if rec["status"] == "ok"]
+        # 기록상 정상이었는데 재현에서 실패한 요청
+        failures = sum(1 for _, r in ok if r["status"] != 200 or "error" in r)
+        if stream:
+            measured = [r["ttfb_ms"] for _, r in ok if r["ttfb_ms"] is not None]
+            overhead = [r["ttfb_ms"] - rec["ttfb_ms"] for rec, r in ok
+                        if r["ttfb_ms"] is not None and "ttfb_ms" in rec]
+            key = "ttfb"
+        else:
+            measured = [r["latency_ms"] for _, r in ok]
+            overhead = [r["latency_ms"] - rec["latency_ms"] for rec, r in ok]
+            key = "latency"
+        summary[kind] = {
+            "requests": len(group),
+            "failures": failures,
+            f"{key}_p50_ms": percentile(measured, 0.5),
+            f"{key}_p95_ms": percentile(measured, 0.95),
+            f"{key}_p99_ms": percentile(measured, 0.99),
+            "overhead_p50_ms": percentile(overhead, 0.5),
+            "overhead_p95_ms": percentile(overhead, 0.95),
+            "overhead_p99_ms": percentile(overhead, 0.99),
+            "total_p99_ms": percentile([r["latency_ms"] for _, r in ok], 0.99),
+        }
+    return summary
+
+
+def print_summary(summary: dict, baseline: Optional[dict] = None) -> None:
+    for kind, values in summary.items():
+        print(f"[{kind}]")
+        for name, value in values.items():
+            line = f"  {name:<18} {value if value is not None else '-':>10}"
+            previous = (baseline or {}).get(kind, {}).get(name)
+            if isinstance(value, (int, float)) and isinstance(previous, (int, float)):
+                line += f"   (기준 {previous}, 변화 {value - previous:+.1f})"
+            print(line)
+
+
+async def wait_ready(proxy_url: str, timeout: float = 30.0) -> None:
+    async with httpx.AsyncClient() as client:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(proxy_url.rstrip("/") + "/health/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"프록시가 {timeout:g}초 안에 준비되지 않았습니다: {proxy_url}")
+
+
+def spawn_proxy(port: int, upstream_url: str) -> subprocess.Popen:
+    """대역 서버를 업스트림으로 하는 프록시 실행 (캡처 / 캐시 / 사용량 집계 제외, 나머지는 .env 설정 사용)"""
+    env = {
+        **os.environ,
+        "LLM_API_BASE_URL": upstream_url,
+        "API_KEY": os.environ.get("API_KEY") or "replay",
+        "CAPTURE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "METERING_ENABLED": "false",
+        "CONFIG_WATCH_INTERVAL": "0",
+        "LOG_LEVEL": os.environ.get("REPLAY_PROXY_LOG_LEVEL", "WARNING"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.server:create_app", "--factory", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    records = load_capture(args.capture)
+    if not records:
+        print(f"캡처된 요청이 없습니다: {args.capture}")
+        return
+    print(f"요청 {len(records)}개 재현 (배속 {args.speed:g}, 최대 공백 {args.max_idle:g}s)")
+
+    standin = uvicorn.Server(uvicorn.Config(create_standin_app(records), host="127.0.0.1",
+                                            port=args.upstream_port, log_level="warning"))
+    standin_task = asyncio.create_task(standin.serve())
+    while not standin.started:
+        await asyncio.sleep(0.05)
+
+    proxy = None
+    proxy_url = args.proxy
+    try:
+        if args.spawn_proxy:
+            proxy = spawn_proxy(args.proxy_port, f"http://127.0.0.1:{args.upstream_port}{CHAT_PATH}")
+            proxy_url = f"http://127.0.0.1:{args.proxy_port}"
+        await wait_ready(proxy_url)
+
+        results = await replay(records, proxy_url, args.speed, args.max_idle)
+        summary = summarize(records, results)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)["summary"]
+        print_summary(summary, baseline)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"capture": args.capture, "speed": args.speed, "summary": summary, "results": results},
+                          f, ensure_ascii=False, indent=2)
+            print(f"결과 저장: {args.output}")
+    finally:
+        if proxy is not None:
+            proxy.terminate()
+            proxy.wait()
+        standin.should_exit = True
+        await standin_task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="캡처한 트래픽을 프록시에 재현")
+    parser.add_argument("capture", help="캡처 파일 (CAPTURE_FILE)")
+    parser.add_argument("--proxy", default="http://127.0.0.1:9393", help="재현 대상 프록시 주소")
+    parser.add_argument("--spawn-proxy", action="store_true", help="대역 서버를 업스트림으로 하는 프록시를 직접 실행")
+    parser.add_argument("--proxy-port", type=int, default=9394, help="--spawn-proxy 사용 시 프록시 포트")
+    parser.add_argument("--upstream-port", type=int, default=9395, help="대역 업스트림 포트")
+    parser.add_argument("--speed", type=float, default=1.0, help="재현 배속 (2이면 도착 간격을 절반으로)")
+    parser.add_argument("--max-idle", type=float, default=30.0, help="요청 사이 최대 공백 (초)")
+    parser.add_argument("--output", help="결과 저장 파일 (JSON)")
+    parser.add_argument("--baseline", help="비교할 이전 결과 파일 (JSON)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,37 @@
+/*
+ * 채널별 가입자 현황
+ * 변경이력: 2023-04 조직 개편 반영
+ */
+SELECT  A.CHNL_CD                                                   AS CHNL_CD
+      , A.CHNL_NM                                                   AS CHNL_NM
+      , (SELECT  COUNT(DISTINCT S.SVC_MGMT_NUM)
+         FROM    MFACT_SUBS_D S
+         WHERE   S.CHNL_CD = A.CHNL_CD
+         AND     S.STD_DT BETWEEN :START_DT AND :END_DT
+         AND     S.SVC_STAT_CD IN ('A', 'S'))                       AS SUBS_CNT
+      , (SELECT  COUNT(DISTINCT S.SVC_MGMT_NUM)
+         FROM    MFACT_SUBS_D S
+         WHERE   S.CHNL_CD = A.CHNL_CD
+         AND     S.STD_DT BETWEEN :START_DT AND :END_DT
+         AND     S.SVC_STAT_CD IN ('A', 'S'))
+        - (SELECT  COUNT(DISTINCT S.SVC_MGMT_NUM)
+           FROM    MFACT_SUBS_D S
+           WHERE   S.CHNL_CD = A.CHNL_CD
+           AND     S.STD_DT = :START_DT)                             AS NET_ADD_CNT
+      , NVL(B.ARPU_AMT, 0)                                          AS ARPU_AMT
+FROM    MCHNL_D A
+LEFT OUTER JOIN (
+        SELECT  R.CHNL_CD                                           AS CHNL_CD
+              , CASE WHEN SUM(R.SUBS_CNT) > 0
+                     THEN SUM(R.REV_AMT) / SUM(R.SUBS_CNT)
+                     ELSE 0
+                END                                                 AS ARPU_AMT
+        FROM    MFACT_REV_M R
+        WHERE   R.STD_YM = SUBSTR(:END_DT, 1, 6)                    /* 치환: 종료일 기준 월 */
+        GROUP BY R.CHNL_CD
+) B
+ON      A.CHNL_CD = B.CHNL_CD
+WHERE   A.USE_YN = 'Y'
+--AND   A.CHNL_GRP_CD = '01'
+AND     A.CHNL_GRP_CD = :CHNL_GRP_CD                                /* 치환: 채널그룹 선택 시 */
+ORDER BY A.CHNL_CD
@@ -0,0 +1,54 @@
+-- 매장별 판매 실적 리포트
+-- 작성: MI 프로젝트
+WITH SALE_BASE AS (
+    SELECT  T1.SALE_DT                      AS SALE_DT
+          , T1.SHOP_CD                      AS SHOP_CD
+          , T1.SALE_TYP_CD                  AS SALE_TYP_CD
+          , SUM(NVL(T1.SALE_CNT, 0))        AS SALE_CNT
+          , SUM(NVL(T1.SALE_AMT, 0))        AS SALE_AMT
+    FROM    MFACT_SALE_D        T1
+    WHERE   T1.SALE_DT BETWEEN :START_DT AND :END_DT     /* 치환: 시작일, 종료일 (YYYYMMDD) */
+    AND     T1.SALE_TYP_CD IN (:SALE_TYP_CD)              /* 치환: 판매유형코드 다중 선택 */
+    GROUP BY T1.SALE_DT
+           , T1.SHOP_CD
+           , T1.SALE_TYP_CD
+)
+, TERM_BASE AS (
+    SELECT  T2.SHOP_CD                      AS SHOP_CD
+          , SUM(NVL(T2.TERM_CNT, 0))        AS TERM_CNT
+          , SUM(NVL(T2.SUSP_CNT, 0))        AS SUSP_CNT
+    FROM    MFACT_TERM_D        T2
+    WHERE   T2.TERM_DT BETWEEN :START_DT AND :END_DT     /* 치환: 시작일, 종료일 (YYYYMMDD) */
+    GROUP BY T2.SHOP_CD
+)
+SELECT  T5.MKT_DIV_ORG_CD                                   AS MKT_DIV_ORG_CD
+      , T6.ORG_NM                                           AS MKT_DIV_ORG_NM
+      , T5.SHOP_CD                                          AS SHOP_CD
+      , T5.SHOP_NM                                          AS SHOP_NM
+      , SUM(B.SALE_CNT)                                     AS SALE_CNT
+      , SUM(B.SALE_AMT)                                     AS SALE_AMT
+      , SUM(T.TERM_CNT)                                     AS TERM_CNT
+      , CASE WHEN SUM(B.SALE_CNT) > 0
+             THEN ROUND(SUM(T.TERM_CNT) / SUM(B.SALE_CNT) * 100, 2)
+             ELSE 0
+        END                                                 AS TERM_RATE     -- 해지율
+      , CASE WHEN SUM(B.SALE_CNT) > 0
+             THEN ROUND(SUM(T.SUSP_CNT) / SUM(B.SALE_CNT) * 100, 2)
+             ELSE 0
+        END                                                 AS SUSP_RATE     -- 정지율
+FROM    SALE_BASE           B
+      , TERM_BASE           T
+      , MMAP_SHOP_D         T5
+      , MORG_D              T6
+WHERE   B.SHOP_CD           = T.SHOP_CD (+)
+AND     B.SHOP_CD           = T5.SHOP_CD
+AND     T5.MKT_DIV_ORG_CD   = T6.ORG_CD
+AND     T5.CHNL_CD          = :CHNL_CD                      /* 치환: 채널코드가 존재할 경우에만 조건 추가 */
+AND     T5.MKT_CD           = :MKT_CD                       /* 치환: 상권코드가 존재할 경우 AND T5.MKT_CD = :MKT_CD */
+GROUP BY T5.MKT_DIV_ORG_CD
+       , T6.ORG_NM
+       , T5.SHOP_CD
+       , T5.SHOP_NM
+ORDER BY T5.MKT_DIV_ORG_CD
+       , T5.SHOP_CD
+;
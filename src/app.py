@@ -1,15 +1,21 @@
 import streamlit as st
 import requests
 import logging
-import json
 import uuid
-from datetime import datetime
-from src.client import chat_with_context, chat_with_context_stream
+from src.client import ChatSocket, chat_with_context, chat_with_context_stream, chat_with_context_ws
 
 # 서버 설정
 SERVER_CHAT_API = "http://localhost:9393/v1/chat/completions"
+SERVER_CHAT_WS = "ws://localhost:9393/v1/chat/ws"
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
+# HTTP 세션 (브라우저 세션당 하나 - 스크립트 재실행 간 서버 커넥션 재사용)
+# requests.Session은 스레드 안전하지 않으므로 여러 브라우저 세션이 공유하지 않음
+def get_http_session():
+    if "http_session" not in st.session_state:
+        st.session_state.http_session = requests.Session()
+    return st.session_state.http_session
+
 # 마크다운 이스케이프 함수
 def escape_markdown(text):
     """사용자 입력에서 마크다운 특수문자를 이스케이프 처리"""
@@ -61,16 +67,30 @@ def handle_chat_submission(prompt):
         full_response = ""
         try:
             if st.session_state.get("use_streaming", True):
-                # 스트리밍 응답
+                # 스트리밍 응답 (WebSocket 사용 시 세션당 연결 하나를 재사용)
                 response_placeholder = st.empty()
-                for chunk in chat_with_context_stream(
-                    message=processed_prompt,
-                    conversation_history=st.session_state.conversation_context,
-                    server_url=SERVER_CHAT_API,
-                    model_name=st.session_state.get("model_name", "gpt-4o"),
-                    temperature=st.session_state.get("temperature", 0.7),
-                    max_tokens=st.session_state.get("max_tokens", 1024)
-                ):
+                if st.session_state.get("use_websocket"):
+                    if "chat_socket" not in st.session_state:
+                        st.session_state.chat_socket = ChatSocket(SERVER_CHAT_WS)
+                    chunks = chat_with_context_ws(
+                        message=processed_prompt,
+                        conversation_history=st.session_state.conversation_context,
+                        chat_socket=st.session_state.chat_socket,
+                        model_name=st.session_state.get("model_name", "gpt-4o"),
+                        temperature=st.session_state.get("temperature", 0.7),
+                        max_tokens=st.session_state.get("max_tokens", 1024)
+                    )
+                else:
+                    chunks = chat_with_context_stream(
+                        message=processed_prompt,
+                        conversation_history=st.session_state.conversation_context,
+                        server_url=SERVER_CHAT_API,
+                        model_name=st.session_state.get("model_name", "gpt-4o"),
+                        temperature=st.session_state.get("temperature", 0.7),
+                        max_tokens=st.session_state.get("max_tokens", 1024),
+                        session=get_http_session()
+                    )
+                for chunk in chunks:
                     if chunk:
                         full_response += chunk
                         response_placeholder.markdown(full_response + "▌")
@@ -84,7 +104,8 @@ def handle_chat_submission(prompt):
                         server_url=SERVER_CHAT_API,
                         model_name=st.session_state.get("model_name", "gpt-4o"),
                         temperature=st.session_state.get("temperature", 0.7),
-                        max_tokens=st.session_state.get("max_tokens", 1024)
+                        max_tokens=st.session_state.get("max_tokens", 1024),
+                        session=get_http_session()
                     )
                     st.markdown(full_response)
         except Exception as e:
@@ -226,6 +247,7 @@ with st.sidebar:
         st.session_state.max_tokens = st.slider("🧱 Max Tokens", 50, 4096, 1024, step=10, help="최대 응답 길이")
         st.session_state.use_cot = st.checkbox("🧠 Chain of Thought", value=False, help="단계별 사고 과정 요청")
         st.session_state.use_streaming = st.checkbox("🌊 스트리밍 응답", value=True, help="실시간 응답 표시")
+        st.session_state.use_websocket = st.checkbox("🔌 WebSocket 연결", value=False, help="세션당 연결 하나로 스트리밍 (스트리밍 응답 사용 시)")
     
     st.divider()
     
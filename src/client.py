@@ -1,6 +1,12 @@
 import requests
+import gzip
 import logging
 import json
+import os
+import queue
+import threading
+import time
+import uuid
 
 # 챗봇 성능 향상을 위한 시스템 프롬프트
 SYSTEM_PROMPT = """You are a professional AI assistant specialized in MI (Management Information) projects and IT infrastructure. Follow these guidelines:
@@ -35,6 +41,72 @@ FORMATTING:
 
 Remember: You are helping with MI project tasks, so prioritize accuracy, clarity, and practical applicability in your responses."""
 
+# 스트리밍 연결이 끊겼을 때 Last-Event-ID로 이어받기 재시도 횟수 및 대기 시간(초)
+STREAM_RESUME_ATTEMPTS = 3
+STREAM_RESUME_DELAY = 0.5
+
+# 사용량 집계 / 할당량 적용 단위 (팀명 등, 미설정 시 서버에서 anonymous로 집계)
+CALLER_ID = os.getenv("CALLER_ID", "")
+
+def caller_headers():
+    """호출자 식별 헤더 생성"""
+    return {"X-Caller-ID": CALLER_ID} if CALLER_ID else {}
+
+# 요청 본문 압축 방식 (gzip / zstd / none) 및 압축 대상 최소 크기 (바이트)
+REQUEST_COMPRESSION = os.getenv("REQUEST_COMPRESSION", "gzip").lower()
+REQUEST_COMPRESSION_MIN_SIZE = int(os.getenv("REQUEST_COMPRESSION_MIN_SIZE", "1024"))
+
+# 압축된 요청 본문을 거부한 서버 주소 - 이후 압축하지 않고 전송
+_uncompressed_servers = set()
+
+# 압축 본문 거부로 볼 응답 코드: 415(지원하지 않는 인코딩), 압축 해제 미들웨어가 없는 서버는 400 / 422(본문 파싱 실패)
+COMPRESSION_REJECTED_STATUS = (400, 415, 422)
+
+def encode_body(payload, compress=True):
+    """
+    요청 본문을 JSON으로 직렬화하고, 임계값 이상이면 압축한다.
+    :return: (본문 바이트, 본문 관련 헤더)
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if not compress or REQUEST_COMPRESSION not in ("gzip", "zstd") or len(body) < REQUEST_COMPRESSION_MIN_SIZE:
+        return body, headers
+    if REQUEST_COMPRESSION == "zstd":
+        try:
+            import zstandard
+            return zstandard.ZstdCompressor().compress(body), {**headers, "Content-Encoding": "zstd"}
+        except ImportError:
+            pass   # zstandard 미설치 시 gzip 사용
+    return gzip.compress(body, compresslevel=6), {**headers, "Content-Encoding": "gzip"}
+
+def post_json(server_url, payload, headers, timeout, stream=False, session=None):
+    """
+    요청 본문을 압축해서 POST (서버가 압축 본문을 지원하지 않으면 압축 없이 다시 전송)
+    session을 주면 해당 requests.Session의 커넥션 풀을 재사용한다.
+    """
+    http = session or requests
+    body, body_headers = encode_body(payload, server_url not in _uncompressed_servers)
+    response = http.post(server_url, data=body, headers={**headers, **body_headers}, timeout=timeout, stream=stream)
+    if response.status_code in COMPRESSION_REJECTED_STATUS and "Content-Encoding" in body_headers:
+        rejected_status = response.status_code
+        response.close()
+        body, body_headers = encode_body(payload, compress=False)
+        response = http.post(server_url, data=body, headers={**headers, **body_headers}, timeout=timeout, stream=stream)
+        # 압축 없이 보낸 요청까지 같은 오류면 본문 자체의 문제이므로 압축 지원 여부는 판단하지 않음
+        if rejected_status == 415 or response.status_code not in COMPRESSION_REJECTED_STATUS:
+            logging.warning(f"⚠️ 서버가 압축된 요청 본문을 지원하지 않아 압축 없이 전송합니다: {server_url}")
+            _uncompressed_servers.add(server_url)
+    return response
+
+# 서버가 클라이언트 포기 이후 업스트림 요청을 계속하지 않도록 요청 기한 전달
+# (requests의 timeout은 읽기 대기 시간만 제한하므로 스트리밍에서는 별도 기한이 있을 때만 전달)
+def request_headers(deadline=None):
+    """요청 처리 기한(초, 없으면 서버 기본값) 및 호출자 식별 헤더 생성"""
+    headers = caller_headers()
+    if deadline:
+        headers["X-Request-Timeout"] = str(deadline)
+    return headers
+
 # LLM 서버 호출 함수 (재사용용)
 def chat_with_api(message, server_url="http://localhost:9393/v1/chat/completions", model_name="gpt-4o", timeout=60, temperature=0.7, max_tokens=4096):
     """
@@ -61,7 +133,7 @@ def chat_with_api(message, server_url="http://localhost:9393/v1/chat/completions
     }
     
     try:
-        response = requests.post(server_url, json=payload, timeout=timeout)
+        response = post_json(server_url, payload, request_headers(timeout), timeout)
         response.raise_for_status()
         result = response.json()
         answer = result.get("choices", [{}])[0].get("message", {}).get("content", "❌ 응답 없음")
@@ -71,7 +143,7 @@ def chat_with_api(message, server_url="http://localhost:9393/v1/chat/completions
         return "[오류] 서버 응답 실패"
 
 # 대화 맥락을 포함한 고급 채팅 함수
-def chat_with_context(message, conversation_history=None, server_url="http://localhost:9393/v1/chat/completions", model_name="gpt-4o", timeout=60, temperature=0.7, max_tokens=2048):
+def chat_with_context(message, conversation_history=None, server_url="http://localhost:9393/v1/chat/completions", model_name="gpt-4o", timeout=60, temperature=0.7, max_tokens=2048, session=None):
     """
     대화 맥락을 포함하여 LLM 서버에 요청을 보낸다.
     :param message: 현재 사용자 메시지
@@ -81,6 +153,7 @@ def chat_with_context(message, conversation_history=None, server_url="http://loc
     :param timeout: 요청 타임아웃(초)
     :param temperature: 응답의 창의성 조절 (0.0-1.5)
     :param max_tokens: 최대 응답 길이
+    :param session: 재사용할 requests.Session (없으면 요청마다 새 연결)
     :return: LLM 응답 텍스트
     """
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
@@ -101,7 +174,7 @@ def chat_with_context(message, conversation_history=None, server_url="http://loc
     }
     
     try:
-        response = requests.post(server_url, json=payload, timeout=timeout)
+        response = post_json(server_url, payload, request_headers(timeout), timeout, session=session)
         response.raise_for_status()
         result = response.json()
         answer = result.get("choices", [{}])[0].get("message", {}).get("content", "❌ 응답 없음")
@@ -111,16 +184,18 @@ def chat_with_context(message, conversation_history=None, server_url="http://loc
         return "[오류] 서버 응답 실패"
 
 # 스트리밍 응답을 위한 함수
-def chat_with_context_stream(message, conversation_history=None, server_url="http://localhost:9393/v1/chat/completions", model_name="gpt-4o", timeout=60, temperature=0.7, max_tokens=2048):
+def chat_with_context_stream(message, conversation_history=None, server_url="http://localhost:9393/v1/chat/completions", model_name="gpt-4o", timeout=60, temperature=0.7, max_tokens=2048, session=None, deadline=None):
     """
     스트리밍 방식으로 대화 맥락을 포함하여 LLM 서버에 요청을 보낸다.
     :param message: 현재 사용자 메시지
     :param conversation_history: 이전 대화 내역 [{"role": "user/assistant", "content": "..."}]
     :param server_url: LLM 서버 API 주소
     :param model_name: 사용할 모델명
-    :param timeout: 요청 타임아웃(초)
+    :param timeout: 수신 대기 타임아웃(초, 청크 사이 대기 시간 기준 - 전체 응답 시간은 제한하지 않음)
     :param temperature: 응답의 창의성 조절 (0.0-1.5)
     :param max_tokens: 최대 응답 길이
+    :param session: 재사용할 requests.Session (없으면 요청마다 새 연결)
+    :param deadline: 전체 요청 처리 기한(초, 없으면 서버 기본값)
     :return: 스트리밍 응답 제너레이터
     """
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
@@ -140,33 +215,198 @@ def chat_with_context_stream(message, conversation_history=None, server_url="htt
         "max_tokens": max_tokens
     }
     
+    full_response = ""
+    last_event_id = None   # 마지막으로 받은 이벤트 ID (연결이 끊기면 이 지점부터 이어받기)
+    for attempt in range(STREAM_RESUME_ATTEMPTS + 1):
+        headers = request_headers(deadline)
+        if last_event_id:
+            headers["Last-Event-ID"] = last_event_id
+        try:
+            response = post_json(server_url, payload, headers, timeout, stream=True, session=session)
+            response.raise_for_status()
+
+            event_id = None
+            for line in response.iter_lines():
+                if line:
+                    line = line.decode('utf-8')
+                    if line.startswith('id: '):
+                        event_id = line[4:]
+                    elif line.startswith('data: '):
+                        data = line[6:]  # 'data: ' 제거
+                        if data.strip() == '[DONE]':
+                            return full_response
+                        try:
+                            json_data = json.loads(data)
+                            if 'choices' in json_data and json_data['choices']:
+                                delta = json_data['choices'][0].get('delta', {})
+                                if 'content' in delta:
+                                    content = delta['content']
+                                    full_response += content
+                                    yield content
+                        except json.JSONDecodeError:
+                            pass
+                        # 이벤트 처리가 끝난 뒤에 이어받기 지점 갱신
+                        last_event_id = event_id or last_event_id
+            
+            return full_response
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            if not last_event_id or attempt == STREAM_RESUME_ATTEMPTS:
+                logging.error(f"❌ 스트리밍 LLM 서버 호출 오류: {e}")
+                yield "[오류] 서버 응답 실패"
+                return full_response
+            logging.warning(f"⚠️ 스트리밍 연결 끊김, 이어받기 시도 ({attempt + 1}/{STREAM_RESUME_ATTEMPTS}): {e}")
+            time.sleep(STREAM_RESUME_DELAY * (attempt + 1))
+        except Exception as e:
+            logging.error(f"❌ 스트리밍 LLM 서버 호출 오류: {e}")
+            yield "[오류] 서버 응답 실패"
+            return full_response
+
+# WebSocket 채팅 세션 (연결 하나에서 여러 요청을 스트림 ID로 구분)
+class ChatSocket:
+    """
+    /v1/chat/ws 연결을 유지하며 여러 채팅 요청을 동시에 스트리밍한다.
+    수신 스레드가 프레임을 스트림 ID별 큐로 분배한다.
+    """
+
+    def __init__(self, server_url="ws://localhost:9393/v1/chat/ws", open_timeout=10):
+        self.server_url = server_url
+        self.open_timeout = open_timeout
+        self._ws = None
+        self._reader = None
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self):
+        return self._reader is not None and self._reader.is_alive()
+
+    def connect(self):
+        """연결되어 있지 않으면 연결 (끊어진 경우 재연결)"""
+        from websockets.sync.client import connect
+
+        with self._lock:
+            if self.connected:
+                return
+            self._ws = connect(self.server_url, open_timeout=self.open_timeout, max_size=None,
+                               additional_headers=caller_headers())
+            self._reader = threading.Thread(target=self._read_loop, args=(self._ws,), name="chat-socket-reader", daemon=True)
+            self._reader.start()
+
+    def _read_loop(self, ws):
+        try:
+            for raw in ws:
+                frame = json.loads(raw)
+                stream_queue = self._queues.get(frame.get("id"))
+                if stream_queue is not None:
+                    stream_queue.put(frame)
+                elif frame.get("type") == "error":
+                    logging.error(f"❌ WebSocket 오류: {frame.get('detail')}")
+        except Exception as e:
+            logging.warning(f"⚠️ WebSocket 수신 종료: {e}")
+        finally:
+            # 대기 중인 스트림에 연결 종료 알림
+            for stream_queue in list(self._queues.values()):
+                stream_queue.put({"type": "error", "detail": "WebSocket 연결이 종료되었습니다."})
+
+    def _send(self, message):
+        with self._lock:
+            self._ws.send(json.dumps(message, ensure_ascii=False))
+
+    def start(self, payload, timeout=None):
+        """
+        채팅 요청을 보내고 스트림 ID를 반환한다.
+        :param payload: /v1/chat/completions와 동일한 요청 본문
+        :param timeout: 요청 처리 기한(초)
+        """
+        self.connect()
+        stream_id = uuid.uuid4().hex
+        self._queues[stream_id] = queue.Queue()
+        message = {**payload, "type": "chat", "id": stream_id}
+        if timeout:
+            message["timeout"] = timeout
+        self._send(message)
+        return stream_id
+
+    def events(self, stream_id, timeout=None):
+        """
+        스트림 프레임(delta, done, cancelled, error)을 순서대로 반환한다.
+        종료 전에 반복을 멈추면 서버에 취소를 요청한다.
+        :param timeout: 프레임 간 최대 대기 시간(초), 초과 시 queue.Empty
+        """
+        stream_queue = self._queues[stream_id]
+        finished = False
+        try:
+            while True:
+                frame = stream_queue.get(timeout=timeout)
+                finished = frame.get("type") in ("done", "cancelled", "error")
+                yield frame
+                if finished:
+                    return
+        finally:
+            self._queues.pop(stream_id, None)
+            if not finished and self.connected:
+                self.cancel(stream_id)
+
+    def cancel(self, stream_id):
+        """진행 중인 스트림 취소 요청 (서버가 업스트림 요청을 중단)"""
+        self._send({"type": "cancel", "id": stream_id})
+
+    def close(self):
+        with self._lock:
+            if self._ws is not None:
+                self._ws.close()
+                self._ws = None
+
+# WebSocket 스트리밍 응답을 위한 함수
+def chat_with_context_ws(message, conversation_history=None, chat_socket=None, server_url="ws://localhost:9393/v1/chat/ws", model_name="gpt-4o", timeout=60, temperature=0.7, max_tokens=2048, deadline=None):
+    """
+    WebSocket 연결로 대화 맥락을 포함하여 스트리밍 요청을 보낸다.
+    :param message: 현재 사용자 메시지
+    :param conversation_history: 이전 대화 내역 [{"role": "user/assistant", "content": "..."}]
+    :param chat_socket: 재사용할 ChatSocket (없으면 이번 요청에만 사용할 연결 생성)
+    :param server_url: WebSocket 엔드포인트 주소 (chat_socket이 없을 때 사용)
+    :param model_name: 사용할 모델명
+    :param timeout: 수신 대기 타임아웃(초, 프레임 사이 대기 시간 기준 - 전체 응답 시간은 제한하지 않음)
+    :param temperature: 응답의 창의성 조절 (0.0-1.5)
+    :param max_tokens: 최대 응답 길이
+    :param deadline: 전체 요청 처리 기한(초, 없으면 서버 기본값)
+    :return: 스트리밍 응답 제너레이터
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    
+    # 대화 맥락 추가 (최근 6개 메시지만 유지)
+    if conversation_history:
+        messages.extend(conversation_history[-6:])
+    
+    # 현재 메시지 추가
+    messages.append({"role": "user", "content": message})
+    
+    payload = {
+        "model": model_name,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+
+    owned = chat_socket is None
+    chat_socket = chat_socket or ChatSocket(server_url)
     try:
-        response = requests.post(server_url, json=payload, timeout=timeout, stream=True)
-        response.raise_for_status()
-        
-        full_response = ""
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    data = line[6:]  # 'data: ' 제거
-                    if data.strip() == '[DONE]':
-                        break
-                    try:
-                        json_data = json.loads(data)
-                        if 'choices' in json_data and json_data['choices']:
-                            delta = json_data['choices'][0].get('delta', {})
-                            if 'content' in delta:
-                                content = delta['content']
-                                full_response += content
-                                yield content
-                    except json.JSONDecodeError:
-                        continue
-        
-        return full_response
+        stream_id = chat_socket.start(payload, timeout=deadline)
+        for frame in chat_socket.events(stream_id, timeout=timeout):
+            if frame["type"] == "delta":
+                choices = frame["chunk"].get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+            elif frame["type"] == "error":
+                logging.error(f"❌ WebSocket LLM 서버 호출 오류: {frame.get('detail')}")
+                yield "[오류] 서버 응답 실패"
     except Exception as e:
-        logging.error(f"❌ 스트리밍 LLM 서버 호출 오류: {e}")
+        logging.error(f"❌ WebSocket LLM 서버 호출 오류: {e}")
         yield "[오류] 서버 응답 실패"
+    finally:
+        if owned:
+            chat_socket.close()
 
 # MSTR 설계표 분석용 프롬프트 생성 함수
 def get_mstr_design_prompt(sql: str) -> str:
@@ -3,46 +3,274 @@ Configuration settings for Isolated Chat
 환경 변수를 통해 모든 설정을 관리합니다.
 """
 import os
-from dotenv import load_dotenv
+from dotenv import load_dotenv, dotenv_values
 
-# 환경 변수 로드
-load_dotenv()
 
-# API 설정
-API_KEY = os.getenv("API_KEY", "")
-LLM_API_BASE_URL = os.getenv("LLM_API_BASE_URL", "https://your-llm-api.com/v1/chat/completions")
+def parse_mapping(value: str, cast=str) -> dict:
+    """"이름=값,이름=값" 형식의 설정값을 dict로 변환"""
+    return {
+        name.strip(): cast(item_value.strip())
+        for name, item_value in (item.split("=", 1) for item in value.split(",") if "=" in item)
+    }
+
+
+# 시작 시에만 적용되는 설정 (재적재하면 값은 바뀌지만 재시작 전까지 동작에는 반영되지 않음)
+RESTART_REQUIRED = (
+    "FASTAPI_HOST", "FASTAPI_PORT", "STREAMLIT_HOST", "STREAMLIT_PORT",
+    "LOG_LEVEL", "LOG_DIR", "DEFAULT_MODEL", "SUPPORTED_MODELS",
+    "SEMANTIC_CACHE_THRESHOLD", "SEMANTIC_CACHE_MAX_ENTRIES", "SEMANTIC_CACHE_TTL",
+    "METERING_ENABLED", "METERING_DB", "METERING_FLUSH_INTERVAL",
+    "CAPTURE_ENABLED", "CAPTURE_FILE", "CAPTURE_SAMPLE_RATE",
+    "LOOP_MONITOR_INTERVAL", "SLOW_CALLBACK_THRESHOLD_MS",
+)
+
+
+class Settings:
+    """환경 변수로부터 읽은 설정 스냅샷
+
+    설정 재적재(hot reload) 시 새 Settings 객체로 통째로 교체되며,
+    요청은 시작 시점의 스냅샷을 끝까지 사용한다.
+    """
+
+    def __init__(self, env=None, version: int = 1):
+        get = (env if env is not None else os.environ).get
+        self.version = version
+
+        # API 설정
+        self.API_KEY = get("API_KEY", "")
+        self.LLM_API_BASE_URL = get("LLM_API_BASE_URL", "https://your-llm-api.com/v1/chat/completions")
+
+        # 서버 설정
+        self.FASTAPI_HOST = get("FASTAPI_HOST", "0.0.0.0")
+        self.FASTAPI_PORT = int(get("FASTAPI_PORT", "9393"))
+
+        self.STREAMLIT_HOST = get("STREAMLIT_HOST", "0.0.0.0")
+        self.STREAMLIT_PORT = int(get("STREAMLIT_PORT", "9191"))
+
+        # API 타임아웃 및 재시도 설정
+        self.API_TIMEOUT = int(get("API_TIMEOUT", "30"))
+        self.API_MAX_RETRIES = int(get("API_MAX_RETRIES", "3"))
+        self.API_RETRY_DELAY = int(get("API_RETRY_DELAY", "1"))
+
+        # 업스트림 커넥션 풀 설정
+        self.POOL_MAX_CONNECTIONS = int(get("POOL_MAX_CONNECTIONS", "100"))
+        self.POOL_MAX_KEEPALIVE = int(get("POOL_MAX_KEEPALIVE", "10"))
+        # 유휴 커넥션 유지 시간 (초) - keepalive 주기보다 길어야 커넥션이 유지됨
+        self.POOL_KEEPALIVE_EXPIRY = float(get("POOL_KEEPALIVE_EXPIRY", "60"))
+
+        # 시작 시 미리 연결할 업스트림 커넥션 수 및 유휴 시 재연결 주기 (초, 0이면 비활성화)
+        self.UPSTREAM_PREWARM_CONNECTIONS = int(get("UPSTREAM_PREWARM_CONNECTIONS", "2"))
+        self.UPSTREAM_KEEPALIVE_INTERVAL = float(get("UPSTREAM_KEEPALIVE_INTERVAL", "30"))
+
+        # 요청 처리 기한 (초) - 대기, 재시도, 스트리밍 전체에 적용
+        # 클라이언트는 X-Request-Timeout 헤더로 요청별 기한을 지정할 수 있음
+        self.REQUEST_DEADLINE = float(get("REQUEST_DEADLINE", "120"))
+
+        # 모델별 기본 요청 기한 (예: "gpt-4o=180,gpt-4o-mini=60")
+        self.MODEL_DEADLINES = parse_mapping(get("MODEL_DEADLINES", ""), float)
+
+        # 업스트림 단계별 타임아웃 상한 (초)
+        self.UPSTREAM_CONNECT_TIMEOUT = float(get("UPSTREAM_CONNECT_TIMEOUT", "5"))
+        self.FIRST_TOKEN_TIMEOUT = float(get("FIRST_TOKEN_TIMEOUT", "60"))
+        self.STREAM_IDLE_TIMEOUT = float(get("STREAM_IDLE_TIMEOUT", "30"))
+
+        # 적응형 타임아웃: 최근 지연 시간 백분위수 x 배수 (하한 ~ 단계별 상한 범위, 첫 토큰 / 토큰 간격에만 적용)
+        self.ADAPTIVE_TIMEOUT_PERCENTILE = float(get("ADAPTIVE_TIMEOUT_PERCENTILE", "99"))
+        self.ADAPTIVE_TIMEOUT_MULTIPLIER = float(get("ADAPTIVE_TIMEOUT_MULTIPLIER", "2.0"))
+        self.ADAPTIVE_TIMEOUT_FLOOR = float(get("ADAPTIVE_TIMEOUT_FLOOR", "5"))
+        self.ADAPTIVE_TIMEOUT_MIN_SAMPLES = int(get("ADAPTIVE_TIMEOUT_MIN_SAMPLES", "20"))
+
+        # 업스트림 요청 헤징: 응답(스트리밍은 첫 토큰)이 최근 지연 시간 백분위수 안에 오지 않으면 한 번 더 요청
+        self.HEDGE_ENABLED = get("HEDGE_ENABLED", "false").lower() == "true"
+        self.HEDGE_PERCENTILE = float(get("HEDGE_PERCENTILE", "95"))
+        self.HEDGE_MIN_DELAY = float(get("HEDGE_MIN_DELAY", "0.5"))
+        # 전체 요청 대비 헤지 요청 비율 상한 (%)
+        self.HEDGE_BUDGET_PERCENT = float(get("HEDGE_BUDGET_PERCENT", "5"))
+        # 헤지 요청을 보낼 대체 업스트림 (미설정 시 같은 업스트림)
+        self.LLM_API_HEDGE_URL = get("LLM_API_HEDGE_URL", "")
+
+        # 클라이언트 연결 종료 감지 주기 (초)
+        self.DISCONNECT_CHECK_INTERVAL = float(get("DISCONNECT_CHECK_INTERVAL", "0.5"))
+
+        # WebSocket 연결 하나에서 동시에 진행할 수 있는 최대 스트림 수
+        self.WS_MAX_STREAMS = int(get("WS_MAX_STREAMS", "8"))
+
+        # 스트림 이어받기 (Last-Event-ID): 클라이언트 연결이 끊긴 뒤 업스트림 생성을 계속할 시간
+        # (초, 기본 0 = 비활성화 - 켜면 중지 / 연결 종료 후에도 그 시간 동안 업스트림 토큰이 소비됨)
+        self.STREAM_RESUME_GRACE = float(get("STREAM_RESUME_GRACE", "0"))
+        # 완료된 스트림 버퍼 유지 시간 (초) 및 전체 / 스트림별 버퍼 메모리 한도 (바이트)
+        self.STREAM_BUFFER_TTL = float(get("STREAM_BUFFER_TTL", "300"))
+        self.STREAM_BUFFER_MAX_BYTES = int(get("STREAM_BUFFER_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.STREAM_BUFFER_MAX_STREAM_BYTES = int(get("STREAM_BUFFER_MAX_STREAM_BYTES", str(1024 * 1024)))
 
-# 서버 설정
-FASTAPI_HOST = os.getenv("FASTAPI_HOST", "0.0.0.0")
-FASTAPI_PORT = int(os.getenv("FASTAPI_PORT", "9393"))
+        # 이벤트 루프 지연 측정 주기 (초, 0이면 비활성화) 및 느린 콜백 기록 임계값 (ms, 0이면 비활성화)
+        # 느린 콜백 기록은 asyncio 내부(Handle._run)를 교체하므로 선택 사항이며 기본 asyncio 루프에서만 동작 (uvloop 미지원)
+        self.LOOP_MONITOR_INTERVAL = float(get("LOOP_MONITOR_INTERVAL", "0.5"))
+        self.SLOW_CALLBACK_THRESHOLD_MS = float(get("SLOW_CALLBACK_THRESHOLD_MS", "0"))
 
-STREAMLIT_HOST = os.getenv("STREAMLIT_HOST", "0.0.0.0")
-STREAMLIT_PORT = int(os.getenv("STREAMLIT_PORT", "9191"))
+        # 로깅 설정
+        self.LOG_LEVEL = get("LOG_LEVEL", "INFO")
+        self.LOG_DIR = get("LOG_DIR", "logs")
 
-# API 타임아웃 및 재시도 설정
-API_TIMEOUT = int(os.getenv("API_TIMEOUT", "30"))
-API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
-API_RETRY_DELAY = int(os.getenv("API_RETRY_DELAY", "1"))
+        # 모델 설정
+        self.DEFAULT_MODEL = get("DEFAULT_MODEL", "gpt-4o")
+        self.SUPPORTED_MODELS = ["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo", "gpt-4", "gpt-4.1"]
 
-# 로깅 설정
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-LOG_DIR = os.getenv("LOG_DIR", "logs")
+        # 시맨틱 캐시 설정 (단일 턴 근사 중복 질문 응답 재사용, 기본 비활성화)
+        self.SEMANTIC_CACHE_ENABLED = get("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+        self.SEMANTIC_CACHE_THRESHOLD = float(get("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+        self.SEMANTIC_CACHE_MAX_ENTRIES = int(get("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+        self.SEMANTIC_CACHE_TTL = int(get("SEMANTIC_CACHE_TTL", "86400"))
 
-# 모델 설정
-DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-4o")
-SUPPORTED_MODELS = ["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo", "gpt-4", "gpt-4.1"]
+        # 토큰 사용량 집계 (호출자 x 모델 x 일자, 주기적으로 SQLite에 일괄 기록)
+        self.METERING_ENABLED = get("METERING_ENABLED", "true").lower() == "true"
+        self.METERING_DB = get("METERING_DB", "data/usage.db")
+        self.METERING_FLUSH_INTERVAL = float(get("METERING_FLUSH_INTERVAL", "5"))
 
-# CORS 설정
-CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
+        # 호출자별 토큰 할당량 (0이면 무제한), 호출자별 예외값은 "팀=토큰수,팀=토큰수" 형식
+        self.DAILY_TOKEN_QUOTA = int(get("DAILY_TOKEN_QUOTA", "0"))
+        self.MONTHLY_TOKEN_QUOTA = int(get("MONTHLY_TOKEN_QUOTA", "0"))
+        self.CALLER_DAILY_QUOTAS = parse_mapping(get("CALLER_DAILY_QUOTAS", ""), int)
+        self.CALLER_MONTHLY_QUOTAS = parse_mapping(get("CALLER_MONTHLY_QUOTAS", ""), int)
+
+        # 트래픽 캡처 (재현 부하 테스트용 요청 형태 / 업스트림 응답 시간 기록, 기본 비활성화)
+        self.CAPTURE_ENABLED = get("CAPTURE_ENABLED", "false").lower() == "true"
+        self.CAPTURE_FILE = get("CAPTURE_FILE", "data/capture.jsonl.gz")
+        self.CAPTURE_SAMPLE_RATE = float(get("CAPTURE_SAMPLE_RATE", "1.0"))
+
+        # HTTP 본문 압축: gzip / zstd(zstandard 설치 시) 요청 해제 및 응답 압축
+        self.COMPRESSION_ENABLED = get("COMPRESSION_ENABLED", "true").lower() == "true"
+        # 이 크기(바이트) 이상인 일반 응답만 압축
+        self.COMPRESSION_MIN_SIZE = int(get("COMPRESSION_MIN_SIZE", "1024"))
+        self.COMPRESSION_GZIP_LEVEL = int(get("COMPRESSION_GZIP_LEVEL", "6"))
+        self.COMPRESSION_ZSTD_LEVEL = int(get("COMPRESSION_ZSTD_LEVEL", "3"))
+        # SSE 스트림도 이벤트 단위로 flush하며 압축 (프록시 / 클라이언트가 지원할 때만 사용)
+        self.COMPRESSION_SSE = get("COMPRESSION_SSE", "false").lower() == "true"
+        # 압축 해제 후 요청 본문 최대 크기 (압축 폭탄 방지)
+        self.MAX_REQUEST_BODY_BYTES = int(get("MAX_REQUEST_BODY_BYTES", str(16 * 1024 * 1024)))
+
+        # CORS 설정
+        self.CORS_ORIGINS = get("CORS_ORIGINS", "*").split(",")
+
+        # 관리자 엔드포인트 인증 토큰 (미설정 시 localhost에서만 접근 허용)
+        self.ADMIN_TOKEN = get("ADMIN_TOKEN", "")
+
+    def validate(self):
+        """필수 설정 및 값 범위 검증 (실패 시 ValueError)"""
+        if not self.API_KEY:
+            raise ValueError("API_KEY 환경변수가 설정되지 않았습니다. .env 파일을 확인하세요.")
+
+        if not self.LLM_API_BASE_URL or self.LLM_API_BASE_URL == "https://your-llm-api.com/v1/chat/completions":
+            raise ValueError("LLM_API_BASE_URL 환경변수를 실제 LLM API 주소로 설정하세요.")
+
+        if self.API_TIMEOUT <= 0 or self.REQUEST_DEADLINE <= 0:
+            raise ValueError("API_TIMEOUT, REQUEST_DEADLINE은 0보다 커야 합니다.")
+
+        if self.API_MAX_RETRIES < 1:
+            raise ValueError("API_MAX_RETRIES는 1 이상이어야 합니다.")
+
+        if not 0 < self.POOL_MAX_KEEPALIVE <= self.POOL_MAX_CONNECTIONS:
+            raise ValueError("POOL_MAX_KEEPALIVE는 1 이상 POOL_MAX_CONNECTIONS 이하여야 합니다.")
+
+        if not 0 <= self.COMPRESSION_GZIP_LEVEL <= 9:
+            raise ValueError("COMPRESSION_GZIP_LEVEL은 0 ~ 9 범위여야 합니다.")
+
+    def public_dict(self) -> dict:
+        """관리자 조회용 설정값 (민감 정보 마스킹)"""
+        values = {k: v for k, v in vars(self).items() if k.isupper()}
+        for key in ("API_KEY", "ADMIN_TOKEN"):
+            values[key] = "****" if values.get(key) else ""
+        return values
+
+
+# 설정 파일 경로 (hot reload 시 다시 읽음) 및 변경 감지 주기 (초, 0이면 비활성화)
+CONFIG_FILE = os.getenv("CONFIG_FILE", ".env")
+CONFIG_WATCH_INTERVAL = float(os.getenv("CONFIG_WATCH_INTERVAL", "5"))
+
+# 프로세스 환경 변수 (.env 값보다 우선, 재적재 시에도 동일한 우선순위 유지)
+PROCESS_ENV = dict(os.environ)
+
+# 환경 변수 로드
+load_dotenv(CONFIG_FILE)
+
+# 시작 시점 설정
+settings = Settings()
+
+# 모듈 상수 (시작 시점 값, 재적재 대상이 아닌 설정에 사용)
+API_KEY = settings.API_KEY
+LLM_API_BASE_URL = settings.LLM_API_BASE_URL
+FASTAPI_HOST = settings.FASTAPI_HOST
+FASTAPI_PORT = settings.FASTAPI_PORT
+STREAMLIT_HOST = settings.STREAMLIT_HOST
+STREAMLIT_PORT = settings.STREAMLIT_PORT
+API_TIMEOUT = settings.API_TIMEOUT
+API_MAX_RETRIES = settings.API_MAX_RETRIES
+API_RETRY_DELAY = settings.API_RETRY_DELAY
+POOL_MAX_CONNECTIONS = settings.POOL_MAX_CONNECTIONS
+POOL_MAX_KEEPALIVE = settings.POOL_MAX_KEEPALIVE
+POOL_KEEPALIVE_EXPIRY = settings.POOL_KEEPALIVE_EXPIRY
+UPSTREAM_PREWARM_CONNECTIONS = settings.UPSTREAM_PREWARM_CONNECTIONS
+UPSTREAM_KEEPALIVE_INTERVAL = settings.UPSTREAM_KEEPALIVE_INTERVAL
+REQUEST_DEADLINE = settings.REQUEST_DEADLINE
+MODEL_DEADLINES = settings.MODEL_DEADLINES
+UPSTREAM_CONNECT_TIMEOUT = settings.UPSTREAM_CONNECT_TIMEOUT
+FIRST_TOKEN_TIMEOUT = settings.FIRST_TOKEN_TIMEOUT
+STREAM_IDLE_TIMEOUT = settings.STREAM_IDLE_TIMEOUT
+ADAPTIVE_TIMEOUT_PERCENTILE = settings.ADAPTIVE_TIMEOUT_PERCENTILE
+ADAPTIVE_TIMEOUT_MULTIPLIER = settings.ADAPTIVE_TIMEOUT_MULTIPLIER
+ADAPTIVE_TIMEOUT_FLOOR = settings.ADAPTIVE_TIMEOUT_FLOOR
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = settings.ADAPTIVE_TIMEOUT_MIN_SAMPLES
+HEDGE_ENABLED = settings.HEDGE_ENABLED
+HEDGE_PERCENTILE = settings.HEDGE_PERCENTILE
+HEDGE_MIN_DELAY = settings.HEDGE_MIN_DELAY
+HEDGE_BUDGET_PERCENT = settings.HEDGE_BUDGET_PERCENT
+LLM_API_HEDGE_URL = settings.LLM_API_HEDGE_URL
+DISCONNECT_CHECK_INTERVAL = settings.DISCONNECT_CHECK_INTERVAL
+WS_MAX_STREAMS = settings.WS_MAX_STREAMS
+STREAM_RESUME_GRACE = settings.STREAM_RESUME_GRACE
+STREAM_BUFFER_TTL = settings.STREAM_BUFFER_TTL
+STREAM_BUFFER_MAX_BYTES = settings.STREAM_BUFFER_MAX_BYTES
+STREAM_BUFFER_MAX_STREAM_BYTES = settings.STREAM_BUFFER_MAX_STREAM_BYTES
+LOOP_MONITOR_INTERVAL = settings.LOOP_MONITOR_INTERVAL
+SLOW_CALLBACK_THRESHOLD_MS = settings.SLOW_CALLBACK_THRESHOLD_MS
+LOG_LEVEL = settings.LOG_LEVEL
+LOG_DIR = settings.LOG_DIR
+DEFAULT_MODEL = settings.DEFAULT_MODEL
+SUPPORTED_MODELS = settings.SUPPORTED_MODELS
+SEMANTIC_CACHE_ENABLED = settings.SEMANTIC_CACHE_ENABLED
+SEMANTIC_CACHE_THRESHOLD = settings.SEMANTIC_CACHE_THRESHOLD
+SEMANTIC_CACHE_MAX_ENTRIES = settings.SEMANTIC_CACHE_MAX_ENTRIES
+SEMANTIC_CACHE_TTL = settings.SEMANTIC_CACHE_TTL
+METERING_ENABLED = settings.METERING_ENABLED
+METERING_DB = settings.METERING_DB
+METERING_FLUSH_INTERVAL = settings.METERING_FLUSH_INTERVAL
+DAILY_TOKEN_QUOTA = settings.DAILY_TOKEN_QUOTA
+MONTHLY_TOKEN_QUOTA = settings.MONTHLY_TOKEN_QUOTA
+CALLER_DAILY_QUOTAS = settings.CALLER_DAILY_QUOTAS
+CALLER_MONTHLY_QUOTAS = settings.CALLER_MONTHLY_QUOTAS
+CAPTURE_ENABLED = settings.CAPTURE_ENABLED
+CAPTURE_FILE = settings.CAPTURE_FILE
+CAPTURE_SAMPLE_RATE = settings.CAPTURE_SAMPLE_RATE
+COMPRESSION_ENABLED = settings.COMPRESSION_ENABLED
+COMPRESSION_MIN_SIZE = settings.COMPRESSION_MIN_SIZE
+COMPRESSION_GZIP_LEVEL = settings.COMPRESSION_GZIP_LEVEL
+COMPRESSION_ZSTD_LEVEL = settings.COMPRESSION_ZSTD_LEVEL
+COMPRESSION_SSE = settings.COMPRESSION_SSE
+MAX_REQUEST_BODY_BYTES = settings.MAX_REQUEST_BODY_BYTES
+CORS_ORIGINS = settings.CORS_ORIGINS
+ADMIN_TOKEN = settings.ADMIN_TOKEN
+
+
+def read_settings(version: int) -> Settings:
+    """설정 파일을 다시 읽어 새 설정 스냅샷 생성 (프로세스 환경 변수가 우선)"""
+    env = {k: v for k, v in dotenv_values(CONFIG_FILE).items() if v is not None}
+    env.update(PROCESS_ENV)
+    return Settings(env, version=version)
 
 # 검증 함수
 def validate_config():
     """필수 설정 검증"""
-    if not API_KEY:
-        raise ValueError("API_KEY 환경변수가 설정되지 않았습니다. .env 파일을 확인하세요.")
-
-    if not LLM_API_BASE_URL or LLM_API_BASE_URL == "https://your-llm-api.com/v1/chat/completions":
-        raise ValueError("LLM_API_BASE_URL 환경변수를 실제 LLM API 주소로 설정하세요.")
+    settings.validate()
 
 # 설정값 출력 (디버깅용)
 def print_config():
@@ -56,6 +284,8 @@ def print_config():
     print(f"Default Model: {DEFAULT_MODEL}")
     print(f"API Timeout: {API_TIMEOUT}s")
     print(f"Max Retries: {API_MAX_RETRIES}")
+    print(f"Request Deadline: {REQUEST_DEADLINE}s (per model: {MODEL_DEADLINES or '-'})")
+    print(f"Timeouts: connect={UPSTREAM_CONNECT_TIMEOUT}s, first token={FIRST_TOKEN_TIMEOUT}s, idle={STREAM_IDLE_TIMEOUT}s")
     print(f"Log Level: {LOG_LEVEL}")
     print(f"CORS Origins: {CORS_ORIGINS}")
     print("=" * 50)
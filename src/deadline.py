@@ -0,0 +1,113 @@
+"""
+요청 기한(Deadline) 및 적응형 타임아웃 관리
+"""
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from src.config import Settings, settings
+
+# 클라이언트가 요청 처리 기한(초)을 지정할 때 사용하는 헤더
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    """요청 처리 기한 또는 단계별 타임아웃 초과"""
+
+
+class Deadline:
+    """요청 단위 종료 기한 (monotonic 시계 기준)"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """남은 시간(초), 이미 지났으면 0"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def exceeded(self) -> DeadlineExceeded:
+        return DeadlineExceeded(f"요청 처리 기한({self.budget:.1f}s) 초과")
+
+    def clamp(self, timeout: float) -> float:
+        """단계별 타임아웃을 남은 기한 이내로 제한 (기한이 지났으면 DeadlineExceeded)"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise self.exceeded()
+        return min(timeout, remaining)
+
+    def timeout_error(self, waited: float, timeout: float, message: str) -> DeadlineExceeded:
+        """clamp한 대기(waited)가 시간 초과로 끝났을 때의 예외
+
+        남은 기한이 단계별 타임아웃보다 짧아 대기 시간이 줄었다면 요청 기한 초과, 아니면 단계별 타임아웃 초과(message)
+        """
+        return self.exceeded() if waited < timeout else DeadlineExceeded(message)
+
+
+def resolve_deadline(model: str, header_value: Optional[str] = None, cfg: Optional[Settings] = None) -> Deadline:
+    """클라이언트 헤더 또는 모델별 기본값으로 요청 기한 결정"""
+    cfg = cfg or settings
+    if header_value:
+        try:
+            budget = float(header_value)
+            if budget > 0:
+                return Deadline(budget)
+        except ValueError:
+            pass
+    return Deadline(cfg.MODEL_DEADLINES.get(model, cfg.REQUEST_DEADLINE))
+
+
+# 적응형 타임아웃 적용 단계 (답변 길이와 무관한 첫 토큰 지연 / 토큰 간 간격만)
+ADAPTIVE_KINDS = ("first_token", "inter_token")
+
+
+class LatencyTracker:
+    """최근 업스트림 지연 시간 샘플을 모아 적응형 타임아웃을 계산"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.samples: Dict[str, deque] = {}
+
+    def record(self, kind: str, seconds: float) -> None:
+        """지연 시간 샘플 기록 (kind: response, first_token, inter_token)"""
+        self.samples.setdefault(kind, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, kind: str, pct: float) -> Optional[float]:
+        samples = self.samples.get(kind)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        index = min(int(len(ordered) * pct / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def timeout_for(self, kind: str, ceiling: float, cfg: Optional[Settings] = None) -> float:
+        """관측된 백분위수 x 배수를 [하한, 상한] 범위로 제한한 타임아웃 (ADAPTIVE_TIMEOUT_* 는 cfg 기준)
+
+        샘플이 충분하지 않거나 적응형 대상 단계(ADAPTIVE_KINDS)가 아니면 설정된 상한값을 그대로 사용한다.
+        """
+        cfg = cfg or settings
+        samples = self.samples.get(kind)
+        if kind not in ADAPTIVE_KINDS or not samples or len(samples) < cfg.ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return ceiling
+        observed = self.percentile(kind, cfg.ADAPTIVE_TIMEOUT_PERCENTILE)
+        return min(max(observed * cfg.ADAPTIVE_TIMEOUT_MULTIPLIER, cfg.ADAPTIVE_TIMEOUT_FLOOR), ceiling)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """통계 엔드포인트용 백분위수 요약"""
+        return {
+            kind: {
+                "samples": len(samples),
+                "p50": round(self.percentile(kind, 50), 3),
+                "p90": round(self.percentile(kind, 90), 3),
+                "p99": round(self.percentile(kind, 99), 3),
+            }
+            for kind, samples in self.samples.items()
+            if samples
+        }
+
+
+# 업스트림 지연 시간 추적기 (프로세스 전역)
+latency_tracker = LatencyTracker()
@@ -0,0 +1,114 @@
+"""
+업스트림 요청 헤징(hedging)
+
+응답(스트리밍은 첫 토큰)이 최근 지연 시간 백분위수 안에 오지 않으면
+같은 요청을 한 번 더 보내고(대체 업스트림 지정 가능) 먼저 성공한 쪽을 사용한다.
+늦은 쪽은 취소하며, 헤지 요청 수는 전체 요청 대비 비율(예산)로 제한한다.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from src.config import Settings
+from src.deadline import latency_tracker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """헤지 요청 발사 / 예산 관리 및 통계"""
+
+    def __init__(self, max_budget: float = 10.0):
+        self.max_budget = max_budget
+        self.budget = 0.0          # 요청마다 HEDGE_BUDGET_PERCENT / 100 적립, 헤지 1회에 1 사용
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+        self.budget_denied = 0
+
+    def delay(self, kind: str, cfg: Settings) -> Optional[float]:
+        """헤지 요청을 보내기까지 기다릴 시간 (샘플이 부족하면 None - 헤징하지 않음)"""
+        samples = latency_tracker.samples.get(kind)
+        if not samples or len(samples) < cfg.ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return None
+        return max(latency_tracker.percentile(kind, cfg.HEDGE_PERCENTILE), cfg.HEDGE_MIN_DELAY)
+
+    def _withdraw(self) -> bool:
+        if self.budget >= 1:
+            self.budget -= 1
+            return True
+        self.budget_denied += 1
+        return False
+
+    @staticmethod
+    def _settle_loser(task: asyncio.Task, discard: Optional[Callable[[T], Awaitable[None]]]) -> None:
+        """취소한 요청이 그 사이 끝났으면 결과 정리 (응답 스트림 닫기 등)"""
+        if task.cancelled():
+            return
+        if task.exception() is None and discard is not None:
+            asyncio.ensure_future(discard(task.result()))
+
+    async def race(self, attempt: Callable[[str], Awaitable[T]], kind: str, cfg: Settings,
+                   discard: Optional[Callable[[T], Awaitable[None]]] = None) -> T:
+        """
+        attempt(업스트림 URL)을 실행하고, 지연되면 헤지 요청을 추가로 보내 먼저 성공한 결과를 반환한다.
+        :param kind: 헤지 지연 기준이 되는 지연 시간 종류 (response, first_token)
+        :param discard: 늦게 성공한 결과 정리 함수
+        """
+        self.requests += 1
+        delay = self.delay(kind, cfg) if cfg.HEDGE_ENABLED else None
+        if delay is None:
+            return await attempt(cfg.LLM_API_BASE_URL)
+        self.budget = min(self.budget + cfg.HEDGE_BUDGET_PERCENT / 100, self.max_budget)
+
+        primary = asyncio.create_task(attempt(cfg.LLM_API_BASE_URL))
+        tasks = [primary]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._withdraw():
+                self.fired += 1
+                logger.info(f"업스트림 헤지 요청 발사: {kind} {delay:.2f}s 초과")
+                tasks.append(asyncio.create_task(attempt(cfg.LLM_API_HEDGE_URL or cfg.LLM_API_BASE_URL)))
+
+            # 먼저 성공한 쪽 사용 (먼저 끝난 쪽이 실패하면 나머지를 기다림)
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task in done and task.exception() is None:
+                        winner = task
+                        break
+
+            if winner is None:
+                # 모두 실패 - 원 요청의 오류를 그대로 전달 (재시도 판단용)
+                raise primary.exception()
+            if winner is not primary:
+                self.won += 1
+            return winner.result()
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if task.done():
+                    self._settle_loser(task, discard)
+                else:
+                    task.cancel()
+                    task.add_done_callback(lambda t: self._settle_loser(t, discard))
+
+    def stats(self) -> dict:
+        """통계 엔드포인트용 헤징 현황"""
+        return {
+            "requests": self.requests,
+            "hedges_fired": self.fired,
+            "hedges_won": self.won,
+            "budget_denied": self.budget_denied,
+            "hedge_rate": round(self.fired / self.requests, 4) if self.requests else 0.0,
+            "win_rate": round(self.won / self.fired, 4) if self.fired else 0.0,
+        }
+
+
+# 프로세스 전역 헤징 관리자
+hedger = Hedger()
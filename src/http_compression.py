@@ -0,0 +1,288 @@
+"""
+HTTP 본문 압축 (gzip / zstd)
+
+- 요청: Content-Encoding이 gzip / zstd인 요청 본문을 풀어서 전달 (해제 크기 제한)
+- 응답: Accept-Encoding 협상 후 임계값 이상의 일반 응답을 압축
+- SSE: 설정 시 이벤트마다 flush하며 스트리밍 압축 (지연 없이 이벤트 단위로 전달)
+
+zstd는 zstandard 패키지가 설치된 경우에만 사용한다 (없으면 gzip만 지원).
+"""
+import json
+import zlib
+from typing import Callable, List, Optional
+
+from src.config import Settings
+
+try:
+    import zstandard
+except ImportError:  # 선택 의존성
+    zstandard = None
+
+# 서버 선호 순서 (클라이언트가 둘 다 허용하면 앞쪽 사용)
+SUPPORTED_ENCODINGS: List[str] = (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+class BodyTooLarge(Exception):
+    """해제한 요청 본문이 허용 크기 초과"""
+
+
+def compress(data: bytes, encoding: str, cfg: Settings) -> bytes:
+    """본문 전체 압축"""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=cfg.COMPRESSION_ZSTD_LEVEL).compress(data)
+    compressor = zlib.compressobj(cfg.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data: bytes, encoding: str, max_size: int) -> bytes:
+    """본문 해제 (max_size 초과 시 BodyTooLarge, 손상된 데이터는 ValueError)"""
+    if encoding == "zstd":
+        try:
+            chunks, size = [], 0
+            with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+                while size <= max_size:
+                    chunk = reader.read(max_size + 1 - size)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    size += len(chunk)
+            result = b"".join(chunks)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"zstd 해제 실패: {e}")
+    else:
+        try:
+            decompressor = zlib.decompressobj(31)
+            result = decompressor.decompress(data, max_size + 1)
+        except zlib.error as e:
+            raise ValueError(f"gzip 해제 실패: {e}")
+    if len(result) > max_size:
+        raise BodyTooLarge(f"압축 해제한 요청 본문이 {max_size:,}바이트를 초과합니다.")
+    return result
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Accept-Encoding 헤더에서 사용할 인코딩 선택 (q=0은 제외)"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+class StreamCompressor:
+    """청크마다 flush하는 스트리밍 압축기 (SSE 이벤트가 버퍼에 묶여 지연되지 않도록)"""
+
+    def __init__(self, encoding: str, cfg: Settings):
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=cfg.COMPRESSION_ZSTD_LEVEL).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._compressor = zlib.compressobj(cfg.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(self._flush_mode)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class CompressionStats:
+    """압축 전/후 바이트 수 집계"""
+
+    def __init__(self):
+        self.requests_decoded = 0
+        self.request_bytes_in = 0      # 수신한 압축 본문
+        self.request_bytes_out = 0     # 해제한 본문
+        self.responses_encoded = 0
+        self.response_bytes_in = 0     # 압축 전 응답
+        self.response_bytes_out = 0    # 전송한 압축 응답
+
+    def summary(self) -> dict:
+        """통계 엔드포인트용 압축 현황"""
+        return {
+            "encodings": SUPPORTED_ENCODINGS,
+            "requests_decoded": self.requests_decoded,
+            "request_bytes_saved": self.request_bytes_out - self.request_bytes_in,
+            "responses_encoded": self.responses_encoded,
+            "response_bytes_saved": self.response_bytes_in - self.response_bytes_out,
+            "response_ratio": round(self.response_bytes_out / self.response_bytes_in, 4)
+            if self.response_bytes_in else None,
+        }
+
+
+compression_stats = CompressionStats()
+
+
+def _header(headers: list, name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _send_error(send, status_code: int, message: str) -> None:
+    """FastAPI HTTPException과 같은 형식의 오류 응답"""
+    body = json.dumps({"detail": message}, ensure_ascii=False).encode("utf-8")
+    await send({"type": "http.response.start", "status": status_code,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class CompressionMiddleware:
+    """요청 본문 해제 및 응답 압축 ASGI 미들웨어 (설정은 요청마다 스냅샷에서 읽음)"""
+
+    def __init__(self, app, settings: Callable[[], Settings]):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        cfg = self.settings()
+        if not cfg.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = scope["headers"]
+        content_encoding = (_header(headers, b"content-encoding") or "identity").strip().lower()
+        if content_encoding != "identity":
+            if content_encoding not in SUPPORTED_ENCODINGS:
+                await _send_error(send, 415, f"지원하지 않는 Content-Encoding: {content_encoding}")
+                return
+            receive, error = await self._decode_request(receive, content_encoding, cfg)
+            if error is not None:
+                await _send_error(send, *error)
+                return
+            scope = dict(scope)
+            scope["headers"] = [(k, v) for k, v in headers if k.lower() not in (b"content-encoding", b"content-length")]
+
+        encoding = negotiate(_header(headers, b"accept-encoding") or "")
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, ResponseEncoder(send, encoding, cfg))
+
+    @staticmethod
+    async def _decode_request(receive, encoding: str, cfg: Settings):
+        """본문 전체를 받아 해제한 뒤, 해제된 본문을 돌려주는 receive 생성"""
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # 본문 수신 중 연결 종료
+                return receive, (400, "요청 본문 수신 중 연결이 종료되었습니다.")
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > cfg.MAX_REQUEST_BODY_BYTES:
+                return receive, (413, f"요청 본문이 {cfg.MAX_REQUEST_BODY_BYTES:,}바이트를 초과합니다.")
+            if not message.get("more_body", False):
+                break
+        raw = b"".join(chunks)
+        try:
+            body = decompress(raw, encoding, cfg.MAX_REQUEST_BODY_BYTES)
+        except BodyTooLarge as e:
+            return receive, (413, str(e))
+        except ValueError as e:
+            return receive, (400, str(e))
+
+        compression_stats.requests_decoded += 1
+        compression_stats.request_bytes_in += len(raw)
+        compression_stats.request_bytes_out += len(body)
+        delivered = False
+
+        async def decoded_receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # 본문 전달 후에는 연결 종료 감지 등을 위해 원래 receive로 위임
+            return await receive()
+
+        return decoded_receive, None
+
+
+class ResponseEncoder:
+    """응답 send 래퍼: 단일 본문은 임계값 이상일 때, 스트리밍(SSE) 응답은 설정 시 이벤트 단위로 압축"""
+
+    def __init__(self, send, encoding: str, cfg: Settings):
+        self.send = send
+        self.encoding = encoding
+        self.cfg = cfg
+        self.start_message: Optional[dict] = None
+        self.compressor: Optional[StreamCompressor] = None   # None이면 이후 본문을 그대로 전달
+
+    async def __call__(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            # 첫 본문을 보고 압축 여부를 정할 때까지 보류
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.start_message is None:
+            if self.compressor is not None:
+                await self._send_stream_chunk(message.get("body", b""), message.get("more_body", False))
+            else:
+                await self.send(message)
+            return
+
+        start, self.start_message = self.start_message, None
+        headers = start.get("headers", [])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if _header(headers, b"content-encoding") is not None:
+            # 이미 인코딩된 응답은 그대로 전달
+            await self.send(start)
+            await self.send(message)
+        elif not more_body:
+            # 단일 본문 응답: 임계값 이상이고 실제로 줄어들 때만 압축
+            encoded = compress(body, self.encoding, self.cfg) if len(body) >= self.cfg.COMPRESSION_MIN_SIZE else body
+            if len(encoded) < len(body):
+                compression_stats.responses_encoded += 1
+                compression_stats.response_bytes_in += len(body)
+                compression_stats.response_bytes_out += len(encoded)
+                await self.send(self._encoded_start(start, len(encoded)))
+                await self.send({"type": "http.response.body", "body": encoded})
+            else:
+                await self.send(start)
+                await self.send(message)
+        elif self.cfg.COMPRESSION_SSE:
+            # 스트리밍 응답 (채팅 SSE 스트림)
+            self.compressor = StreamCompressor(self.encoding, self.cfg)
+            compression_stats.responses_encoded += 1
+            await self.send(self._encoded_start(start, None))
+            await self._send_stream_chunk(body, more_body)
+        else:
+            await self.send(start)
+            await self.send(message)
+
+    def _encoded_start(self, start: dict, length: Optional[int]) -> dict:
+        """Content-Encoding / Vary 추가 및 Content-Length 갱신 (스트리밍이면 제거)"""
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        headers.append((b"vary", b"Accept-Encoding"))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        return {**start, "headers": headers}
+
+    async def _send_stream_chunk(self, body: bytes, more_body: bool) -> None:
+        encoded = self.compressor.compress(body) if body else b""
+        if not more_body:
+            encoded += self.compressor.finish()
+        compression_stats.response_bytes_in += len(body)
+        compression_stats.response_bytes_out += len(encoded)
+        await self.send({"type": "http.response.body", "body": encoded, "more_body": more_body})
@@ -0,0 +1,107 @@
+"""
+설정 재적재(hot reload) 관리
+
+SIGHUP 또는 설정 파일 변경 시 설정을 다시 읽어 검증한 뒤 원자적으로 교체한다.
+새 요청은 새 설정을, 진행 중인 요청은 시작 시점의 설정을 계속 사용한다.
+"""
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import Callable, List, Optional
+
+from src.config import CONFIG_FILE, CONFIG_WATCH_INTERVAL, RESTART_REQUIRED, Settings, read_settings, settings
+
+logger = logging.getLogger(__name__)
+
+
+class LiveConfig:
+    """현재 설정 스냅샷 보관 및 재적재"""
+
+    def __init__(self, initial: Settings):
+        self.initial = initial   # 재시작 필요 설정(RESTART_REQUIRED)의 실제 적용 값
+        self.current = initial
+        self.loaded_at = time.time()
+        self.last_error: Optional[str] = None
+        self._listeners: List[Callable[[Settings, Settings], None]] = []
+        self._file_mtime = self._mtime()
+
+    @staticmethod
+    def _mtime() -> Optional[float]:
+        try:
+            return os.path.getmtime(CONFIG_FILE)
+        except OSError:
+            return None
+
+    def on_reload(self, listener: Callable[[Settings, Settings], None]) -> None:
+        """설정 교체 시 호출할 콜백 등록 (old, new)"""
+        self._listeners.append(listener)
+
+    def reload(self) -> Settings:
+        """설정 파일을 다시 읽어 검증 후 교체 (검증 실패 시 기존 설정 유지, ValueError)"""
+        try:
+            candidate = read_settings(self.current.version + 1)
+            candidate.validate()
+        except ValueError as e:
+            self.last_error = str(e)
+            logger.error(f"설정 재적재 실패 (기존 설정 유지): {e}")
+            raise
+
+        old, self.current = self.current, candidate
+        self.loaded_at = time.time()
+        self.last_error = None
+        for listener in self._listeners:
+            try:
+                listener(old, candidate)
+            except Exception as e:
+                logger.error(f"설정 교체 후처리 오류: {e}")
+        logger.info(f"설정 재적재 완료: 버전 {old.version} -> {candidate.version}")
+        return candidate
+
+    def _reload_quietly(self) -> None:
+        try:
+            self.reload()
+        except ValueError:
+            pass
+
+    def install_signal_handler(self) -> None:
+        """SIGHUP 수신 시 재적재 (지원하지 않는 플랫폼에서는 무시)"""
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self._reload_quietly)
+        except (NotImplementedError, AttributeError, RuntimeError):
+            logger.info("SIGHUP 설정 재적재를 지원하지 않는 환경입니다.")
+
+    async def watch(self) -> None:
+        """설정 파일 수정 시각을 주기적으로 확인하여 변경 시 재적재 (백그라운드 태스크)"""
+        if CONFIG_WATCH_INTERVAL <= 0:
+            return
+        while True:
+            await asyncio.sleep(CONFIG_WATCH_INTERVAL)
+            mtime = self._mtime()
+            if mtime != self._file_mtime:
+                self._file_mtime = mtime
+                logger.info(f"설정 파일 변경 감지: {CONFIG_FILE}")
+                self._reload_quietly()
+
+    def status(self) -> dict:
+        """관리자 조회용 현재 설정 버전 정보"""
+        applied, configured = self.initial.public_dict(), self.current.public_dict()
+        return {
+            "version": self.current.version,
+            "loaded_at": self.loaded_at,
+            "config_file": CONFIG_FILE,
+            "last_error": self.last_error,
+            "settings": configured,
+            "restart_required": list(RESTART_REQUIRED),
+            # 재적재로 값이 바뀌었지만 재시작 전까지 시작 시점 값이 계속 적용되는 설정
+            "pending_restart": {
+                key: {"applied": applied[key], "configured": configured[key]}
+                for key in RESTART_REQUIRED
+                if applied[key] != configured[key]
+            },
+        }
+
+
+# 프로세스 전역 설정 관리자
+live_config = LiveConfig(settings)
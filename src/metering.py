@@ -0,0 +1,224 @@
+"""
+토큰 사용량 집계 및 할당량 관리
+
+요청 경로에서는 메모리의 카운터만 갱신하고, 누적된 사용량은
+백그라운드 태스크가 주기적으로 SQLite에 하나의 트랜잭션으로 일괄 기록한다.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from src.config import METERING_DB, METERING_ENABLED, METERING_FLUSH_INTERVAL, Settings
+
+logger = logging.getLogger(__name__)
+
+# 호출자(팀) 식별 헤더 및 헤더가 없을 때의 호출자명
+CALLER_HEADER = "X-Caller-ID"
+ANONYMOUS_CALLER = "anonymous"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_usage (
+    caller TEXT NOT NULL,
+    model TEXT NOT NULL,
+    day TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (caller, model, day)
+)
+"""
+
+UPSERT = """
+INSERT INTO token_usage (caller, model, day, requests, prompt_tokens, completion_tokens)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (caller, model, day) DO UPDATE SET
+    requests = requests + excluded.requests,
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens
+"""
+
+
+class QuotaExceeded(Exception):
+    """호출자의 일/월 토큰 할당량 초과"""
+
+
+def today() -> str:
+    return time.strftime("%Y-%m-%d")
+
+
+class UsageMeter:
+    """호출자 x 모델 x 일자별 토큰 사용량 집계 및 할당량 검사"""
+
+    def __init__(self, db_path: str = METERING_DB, enabled: bool = METERING_ENABLED,
+                 flush_interval: float = METERING_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        # 아직 기록하지 않은 증분: (호출자, 모델, 일자) -> [요청 수, 프롬프트 토큰, 완료 토큰]
+        self.pending: Dict[Tuple[str, str, str], list] = {}
+        # 할당량 검사용 누적치 (오늘 / 이번 달만 유지)
+        self.daily: Dict[str, int] = {}
+        self.monthly: Dict[str, int] = {}
+        self.day = today()
+        self.flushes = 0
+        self.flush_failures = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+        return self._conn
+
+    def _roll_day(self) -> None:
+        """날짜가 바뀌면 일별 누적치 초기화 (월이 바뀌면 월별도 초기화)"""
+        current = today()
+        if current != self.day:
+            if current[:7] != self.day[:7]:
+                self.monthly.clear()
+            self.daily.clear()
+            self.day = current
+
+    def _load_totals(self) -> None:
+        """재시작 후에도 할당량이 이어지도록 오늘 / 이번 달 사용량을 DB에서 읽음"""
+        with self._db_lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT caller, SUM(CASE WHEN day = ? THEN prompt_tokens + completion_tokens ELSE 0 END),"
+                " SUM(prompt_tokens + completion_tokens) FROM token_usage WHERE day >= ? GROUP BY caller",
+                (self.day, self.day[:7] + "-01"),
+            ).fetchall()
+        for caller, daily, monthly in rows:
+            self.daily[caller] = daily
+            self.monthly[caller] = monthly
+
+    async def start(self) -> None:
+        """DB 초기화 및 누적치 적재"""
+        if not self.enabled:
+            return
+        self._roll_day()
+        await asyncio.to_thread(self._load_totals)
+
+    def check(self, caller: str, cfg: Settings) -> None:
+        """요청 전 할당량 검사 (메모리 조회만 수행, 초과 시 QuotaExceeded)"""
+        if not self.enabled:
+            return
+        self._roll_day()
+        daily_limit = cfg.CALLER_DAILY_QUOTAS.get(caller, cfg.DAILY_TOKEN_QUOTA)
+        if daily_limit and self.daily.get(caller, 0) >= daily_limit:
+            raise QuotaExceeded(f"일일 토큰 할당량({daily_limit:,})을 모두 사용했습니다.")
+        monthly_limit = cfg.CALLER_MONTHLY_QUOTAS.get(caller, cfg.MONTHLY_TOKEN_QUOTA)
+        if monthly_limit and self.monthly.get(caller, 0) >= monthly_limit:
+            raise QuotaExceeded(f"월간 토큰 할당량({monthly_limit:,})을 모두 사용했습니다.")
+
+    def record(self, caller: str, model: str, usage: dict) -> None:
+        """요청 1건의 사용량 누적 (메모리만 갱신)"""
+        if not self.enabled:
+            return
+        self._roll_day()
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        entry = self.pending.setdefault((caller, model, self.day), [0, 0, 0])
+        entry[0] += 1
+        entry[1] += prompt_tokens
+        entry[2] += completion_tokens
+        self.daily[caller] = self.daily.get(caller, 0) + prompt_tokens + completion_tokens
+        self.monthly[caller] = self.monthly.get(caller, 0) + prompt_tokens + completion_tokens
+
+    def _write(self, batch: Dict[Tuple[str, str, str], list]) -> None:
+        with self._db_lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(UPSERT, [(*key, *values) for key, values in batch.items()])
+
+    async def flush(self) -> None:
+        """누적된 증분을 하나의 트랜잭션으로 기록 (실패 시 다음 주기에 다시 시도)"""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.flushes += 1
+        except Exception as e:
+            self.flush_failures += 1
+            logger.error(f"사용량 기록 실패 (다음 주기에 재시도): {e}")
+            for key, values in batch.items():
+                entry = self.pending.setdefault(key, [0, 0, 0])
+                for i, value in enumerate(values):
+                    entry[i] += value
+
+    async def run(self) -> None:
+        """주기적 일괄 기록 (백그라운드 태스크, 취소 시 남은 증분 기록)"""
+        if not self.enabled:
+            return
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+    def _query(self, start: str, end: str, caller: Optional[str]) -> list:
+        sql = ("SELECT caller, model, day, requests, prompt_tokens, completion_tokens"
+               " FROM token_usage WHERE day BETWEEN ? AND ?")
+        params = [start, end]
+        if caller:
+            sql += " AND caller = ?"
+            params.append(caller)
+        with self._db_lock:
+            return self._connect().execute(sql + " ORDER BY day, caller, model", params).fetchall()
+
+    async def report(self, start: str, end: str, caller: Optional[str] = None) -> dict:
+        """기간별 사용량 보고서 (호출자 x 모델 x 일자 행 + 호출자별 합계)"""
+        await self.flush()
+        rows = await asyncio.to_thread(self._query, start, end, caller)
+        totals: Dict[str, dict] = {}
+        usage = []
+        for row_caller, model, day, requests, prompt_tokens, completion_tokens in rows:
+            usage.append({
+                "caller": row_caller,
+                "model": model,
+                "day": day,
+                "requests": requests,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            })
+            total = totals.setdefault(row_caller, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            total["requests"] += requests
+            total["prompt_tokens"] += prompt_tokens
+            total["completion_tokens"] += completion_tokens
+        return {"start": start, "end": end, "usage": usage, "totals": totals}
+
+    def quota_status(self, cfg: Settings) -> Dict[str, dict]:
+        """호출자별 오늘 / 이번 달 사용량과 할당량"""
+        self._roll_day()
+        callers = set(self.daily) | set(self.monthly) | set(cfg.CALLER_DAILY_QUOTAS) | set(cfg.CALLER_MONTHLY_QUOTAS)
+        return {
+            caller: {
+                "daily_tokens": self.daily.get(caller, 0),
+                "daily_quota": cfg.CALLER_DAILY_QUOTAS.get(caller, cfg.DAILY_TOKEN_QUOTA) or None,
+                "monthly_tokens": self.monthly.get(caller, 0),
+                "monthly_quota": cfg.CALLER_MONTHLY_QUOTAS.get(caller, cfg.MONTHLY_TOKEN_QUOTA) or None,
+            }
+            for caller in sorted(callers)
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 프로세스 전역 사용량 집계기
+usage_meter = UsageMeter()
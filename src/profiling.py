@@ -0,0 +1,240 @@
+"""
+On-demand 프로파일링 및 핫패스 계측
+
+- SamplingProfiler: 지정한 시간 동안 이벤트 루프 스레드의 스택을 샘플링하여
+  flamegraph 호환 collapsed-stack 텍스트 생성
+- PhaseTimers: 엔드포인트별 단계(검증, 업스트림 연결, TTFB, 청크 변환, 전송 등) 소요 시간 집계
+- LoopMonitor: 이벤트 루프 지연(lag) 측정 및 느린 콜백 기록 (느린 콜백은 선택 사항, asyncio 기본 루프 전용)
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Optional
+
+from src.config import LOOP_MONITOR_INTERVAL, SLOW_CALLBACK_THRESHOLD_MS
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """sys._current_frames() 기반 저부하 샘플링 프로파일러 (요청 시에만 동작)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def _collapse(self, frame) -> str:
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_label(frame))
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    async def profile(self, seconds: float, interval: float) -> str:
+        """
+        현재 이벤트 루프 스레드를 seconds 동안 interval 간격으로 샘플링한다.
+        :return: collapsed-stack 텍스트 ("스택;경로 샘플수" 줄 단위, flamegraph.pl / speedscope 호환)
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("이미 프로파일링이 진행 중입니다.")
+        try:
+            target = threading.get_ident()
+            samples: Counter = Counter()
+            stop = threading.Event()
+
+            def sample():
+                while not stop.wait(interval):
+                    frame = sys._current_frames().get(target)
+                    if frame is not None:
+                        samples[self._collapse(frame)] += 1
+
+            sampler = threading.Thread(target=sample, name="sampling-profiler", daemon=True)
+            sampler.start()
+            await asyncio.sleep(seconds)
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            return "\n".join(f"{stack} {count}" for stack, count in samples.most_common()) + "\n"
+        finally:
+            self._lock.release()
+
+
+# 매칭된 라우트가 없는 요청(404 등)의 집계 키
+UNMATCHED_ROUTE = "(unmatched)"
+
+
+def route_template(scope: dict) -> str:
+    """집계 키로 쓸 엔드포인트: 원본 URL이 아닌 매칭된 라우트 템플릿 (임의 URL로 키가 늘어나지 않도록)"""
+    return getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+
+
+class PhaseTimers:
+    """엔드포인트 x 단계별 소요 시간 집계 (횟수, 합계, 최대, 최근 백분위수)"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.phases: Dict[str, Dict[str, dict]] = {}
+
+    def record(self, endpoint: str, phase: str, seconds: float) -> None:
+        entry = self.phases.setdefault(endpoint, {}).get(phase)
+        if entry is None:
+            entry = {"count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=self.window)}
+            self.phases[endpoint][phase] = entry
+        entry["count"] += 1
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        entry["recent"].append(seconds)
+
+    def connect_tracer(self, endpoint: str):
+        """httpx trace 확장용 콜백: TCP 연결 / TLS 핸드셰이크 시간 기록"""
+        started = {}
+
+        async def trace(event_name: str, info: dict) -> None:
+            for prefix, phase in (("connection.connect_tcp", "upstream_connect"),
+                                  ("connection.start_tls", "upstream_tls")):
+                if event_name == f"{prefix}.started":
+                    started[prefix] = time.perf_counter()
+                elif event_name == f"{prefix}.complete" and prefix in started:
+                    self.record(endpoint, phase, time.perf_counter() - started.pop(prefix))
+
+        return trace
+
+    def reset(self) -> None:
+        self.phases.clear()
+
+    def summary(self) -> dict:
+        """단계별 통계 (밀리초)"""
+        result = {}
+        for endpoint, phases in self.phases.items():
+            result[endpoint] = {}
+            for phase, entry in phases.items():
+                recent = sorted(entry["recent"])
+                p99 = recent[min(int(len(recent) * 0.99), len(recent) - 1)] if recent else 0.0
+                result[endpoint][phase] = {
+                    "count": entry["count"],
+                    "avg_ms": round(entry["total"] / entry["count"] * 1000, 3),
+                    "p99_ms": round(p99 * 1000, 3),
+                    "max_ms": round(entry["max"] * 1000, 3),
+                    "total_ms": round(entry["total"] * 1000, 1),
+                }
+        return result
+
+
+# 루프 종류와 무관하게 기록하는 지연 급증 기준 (초)
+LAG_SPIKE_THRESHOLD = 0.1
+
+
+class LoopMonitor:
+    """이벤트 루프 지연 측정 및 느린 콜백 기록"""
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL,
+                 slow_callback_ms: float = SLOW_CALLBACK_THRESHOLD_MS, window: int = 600):
+        self.interval = interval
+        self.slow_callback_ms = slow_callback_ms
+        self.lags = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.lag_spikes = deque(maxlen=100)
+        self.slow_callbacks = deque(maxlen=100)
+        self.slow_callback_tracking = "disabled"   # disabled, enabled, unsupported
+        self._original_run = None
+
+    async def run(self) -> None:
+        """interval마다 깨어나 예정 시각 대비 지연을 기록 (백그라운드 태스크)"""
+        if self.interval <= 0:
+            return
+        self._install_slow_callback_hook(asyncio.get_running_loop())
+        try:
+            while True:
+                expected = time.perf_counter() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(time.perf_counter() - expected, 0.0)
+                self.lags.append(lag)
+                self.max_lag = max(self.max_lag, lag)
+                if lag >= LAG_SPIKE_THRESHOLD:
+                    # 직전 interval 안에서 루프를 막은 작업이 있었음 (uvloop에서도 동작)
+                    self.lag_spikes.append({"lag_ms": round(lag * 1000, 1), "at": time.time()})
+        finally:
+            self._remove_slow_callback_hook()
+
+    def _install_slow_callback_hook(self, loop: asyncio.AbstractEventLoop) -> None:
+        """asyncio Handle 실행 시간을 측정해 임계값을 넘는 콜백 기록
+
+        Handle._run 교체는 순수 파이썬 asyncio 루프에만 적용되므로 uvloop 등 다른 루프에서는 설치하지 않는다.
+        """
+        if self.slow_callback_ms <= 0 or self._original_run is not None:
+            return
+        if not isinstance(loop, asyncio.BaseEventLoop):
+            self.slow_callback_tracking = "unsupported"
+            loop_type = f"{type(loop).__module__}.{type(loop).__name__}"
+            logger.warning(f"느린 콜백 기록은 asyncio 기본 루프에서만 지원됩니다 (현재 {loop_type})")
+            return
+        original_run = asyncio.events.Handle._run
+        threshold = self.slow_callback_ms / 1000
+        monitor = self
+
+        def timed_run(handle):
+            started = time.perf_counter()
+            try:
+                return original_run(handle)
+            finally:
+                elapsed = time.perf_counter() - started
+                if elapsed >= threshold:
+                    monitor.slow_callbacks.append({
+                        "callback": monitor._describe(handle),
+                        "duration_ms": round(elapsed * 1000, 1),
+                        "at": time.time(),
+                    })
+
+        self._original_run = original_run
+        asyncio.events.Handle._run = timed_run
+        self.slow_callback_tracking = "enabled"
+
+    @staticmethod
+    def _describe(handle) -> str:
+        """콜백 설명: 태스크 재개 콜백이면 코루틴 이름 사용"""
+        owner = getattr(handle._callback, "__self__", None)
+        if isinstance(owner, asyncio.Task):
+            coro = owner.get_coro()
+            return f"Task {owner.get_name()}: {getattr(coro, '__qualname__', repr(coro))}"
+        return repr(handle)[:300]
+
+    def _remove_slow_callback_hook(self) -> None:
+        if self._original_run is not None:
+            asyncio.events.Handle._run = self._original_run
+            self._original_run = None
+
+    def summary(self) -> dict:
+        """루프 지연 통계 (밀리초) 및 최근 느린 콜백 목록"""
+        lags = sorted(self.lags)
+
+        def pct(p: float) -> Optional[float]:
+            return round(lags[min(int(len(lags) * p), len(lags) - 1)] * 1000, 3) if lags else None
+
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": len(lags),
+            "lag_p50_ms": pct(0.5),
+            "lag_p99_ms": pct(0.99),
+            "lag_max_ms": round(self.max_lag * 1000, 3),
+            "lag_spikes": list(self.lag_spikes)[-20:],
+            "slow_callback_threshold_ms": self.slow_callback_ms,
+            "slow_callback_tracking": self.slow_callback_tracking,
+            "slow_callbacks": list(self.slow_callbacks)[-20:],
+        }
+
+
+# 프로세스 전역 계측 객체
+sampling_profiler = SamplingProfiler()
+phase_timers = PhaseTimers()
+loop_monitor = LoopMonitor()
@@ -0,0 +1,209 @@
+"""
+SQL / 코드 페이로드 압축 (토큰 절약용)
+
+공백, 불필요한 주석, 중복 알리아스, 반복 블록을 제거하되
+치환 조건처럼 의미 있는 주석은 보존한다.
+"""
+import re
+from typing import List, Tuple
+
+# 보존할 주석 패턴 (치환 조건, 옵티마이저 힌트 등)
+KEEP_COMMENT_PATTERN = re.compile(r"치환|^\s*\+|TODO|주의", re.IGNORECASE)
+
+# 반복 블록으로 간주할 최소 길이 (문자 수)
+MIN_REPEAT_BLOCK_CHARS = 80
+
+FENCE_PATTERN = re.compile(r"```([\w+-]*)\n(.*?)```", re.DOTALL)
+# 코드 블록 없는 SQL 본문 감지 (일반 문장 오인을 줄이기 위해 대문자 키워드만)
+SQL_START_PATTERN = re.compile(r"^\s*(WITH|SELECT)\b", re.MULTILINE)
+# 코드 블록 없는 SQL 본문의 끝 (세미콜론 또는 빈 줄 - 뒤따르는 질문 문장은 압축하지 않음)
+SQL_END_PATTERN = re.compile(r";|\n[ \t]*\n")
+# client.get_mstr_design_prompt가 SQL 바로 앞에 두는 문구 (이후 메시지 끝까지 SQL)
+MSTR_SQL_MARKER = "아래 SQL을 분석해줘:\n"
+REDUNDANT_ALIAS_PATTERN = re.compile(r"\b(\w+)\.(\w+)\s+AS\s+\2\b", re.IGNORECASE)
+SPACE_AROUND_PUNCT = re.compile(r"\s*([,()=])\s*")
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 추정 (영문/기호 약 4자당 1토큰, 한글 등 비ASCII는 1자당 1토큰)"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - non_ascii
+    return (ascii_chars + 3) // 4 + non_ascii
+
+
+def _sql_segments(sql: str):
+    """SQL을 (종류, 원문) 조각으로 분리 - 종류: code, string, comment"""
+    i, start, length = 0, 0, len(sql)
+    while i < length:
+        if sql.startswith("--", i) or sql.startswith("/*", i):
+            if start < i:
+                yield "code", sql[start:i]
+            if sql[i + 1] == "-":
+                end = sql.find("\n", i)
+                end = length if end == -1 else end
+            else:
+                end = sql.find("*/", i + 2)
+                end = length if end == -1 else end + 2
+            yield "comment", sql[i:end]
+            i = start = end
+            continue
+        if sql[i] in ("'", '"'):
+            quote = sql[i]
+            if start < i:
+                yield "code", sql[start:i]
+            end = i + 1
+            while end < length:
+                if sql[end] == quote and sql.startswith(quote * 2, end):
+                    end += 2
+                    continue
+                if sql[end] == quote:
+                    break
+                end += 1
+            end = min(end + 1, length)
+            yield "string", sql[i:end]
+            i = start = end
+            continue
+        i += 1
+    if start < length:
+        yield "code", sql[start:]
+
+
+def minify_sql(sql: str) -> str:
+    """
+    SQL 공백/주석을 최소화한다.
+    문자열 리터럴은 그대로 두고, 보존 대상 주석은 /* */ 형태로 남긴다.
+    """
+    parts = []
+
+    def append(text: str) -> None:
+        # 조각 경계에서 공백이 겹치지 않도록 처리
+        if parts and parts[-1].endswith(" ") and text.startswith(" "):
+            text = text[1:]
+        if text:
+            parts.append(text)
+
+    for kind, text in _sql_segments(sql):
+        if kind == "string":
+            append(text)
+        elif kind == "comment":
+            body = text[2:-2] if text.startswith("/*") else text[2:]
+            if KEEP_COMMENT_PATTERN.search(body):
+                append(f" /*{' '.join(body.split())}*/ ")
+            else:
+                append(" ")
+        else:
+            code = " ".join(text.split())
+            code = REDUNDANT_ALIAS_PATTERN.sub(r"\1.\2", code)
+            code = SPACE_AROUND_PUNCT.sub(r"\1", code)
+            # 구두점에 붙은 경계가 아니면 앞뒤 공백 하나 유지
+            if text[:1].isspace() and code[:1] not in ",()=":
+                code = " " + code
+            if text[-1:].isspace() and code[-1:] not in ",()=":
+                code += " "
+            append(code)
+    return "".join(parts).strip()
+
+
+def _find_repeated_groups(sql: str) -> List[str]:
+    """두 번 이상 등장하는 긴 괄호 블록 (문자열/주석 내부 제외)"""
+    masked = "".join(text if kind == "code" else " " * len(text) for kind, text in _sql_segments(sql))
+    counts = {}
+    stack = []
+    for idx, ch in enumerate(masked):
+        if ch == "(":
+            stack.append(idx)
+        elif ch == ")" and stack:
+            start = stack.pop()
+            block = sql[start:idx + 1]
+            if len(block) >= MIN_REPEAT_BLOCK_CHARS:
+                counts[block] = counts.get(block, 0) + 1
+    repeated = [block for block, count in counts.items() if count > 1]
+    # 바깥 블록 우선 (안쪽 블록은 바깥 블록 치환 시 함께 사라짐)
+    return sorted(repeated, key=len, reverse=True)
+
+
+def dedupe_sql_blocks(sql: str) -> str:
+    """반복되는 긴 괄호 블록은 첫 등장에 번호를 붙이고 이후 등장은 참조로 대체"""
+    for number, block in enumerate(_find_repeated_groups(sql), start=1):
+        if sql.count(block) < 2:
+            continue
+        first = sql.index(block) + len(block)
+        tag = f"B{number}"
+        sql = (sql[:first - len(block)] + f"/*{tag}*/" + block
+               + sql[first:].replace(block, f"(/*{tag} 동일*/)"))
+    return sql
+
+
+def compress_sql(sql: str) -> str:
+    """SQL 압축: 최소화 후 반복 블록 제거"""
+    return dedupe_sql_blocks(minify_sql(sql))
+
+
+def compress_code(code: str) -> str:
+    """일반 코드 압축: 줄 끝 공백, 연속 빈 줄, 반복 단락 제거 (들여쓰기는 유지)"""
+    lines = [line.rstrip() for line in code.splitlines()]
+    text = re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip("\n")
+
+    seen = set()
+    paragraphs = []
+    for paragraph in text.split("\n\n"):
+        if len(paragraph) >= MIN_REPEAT_BLOCK_CHARS and paragraph in seen:
+            paragraphs.append("# (위와 동일한 블록 반복)")
+            continue
+        seen.add(paragraph)
+        paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def _sql_end(text: str, start: int) -> int:
+    """start에서 시작하는 SQL 문의 끝 위치 (문자열 / 주석 밖의 세미콜론 포함, 또는 빈 줄 직전)"""
+    offset = start
+    for kind, segment in _sql_segments(text[start:]):
+        if kind == "code":
+            match = SQL_END_PATTERN.search(segment)
+            if match:
+                return offset + match.end() if match.group() == ";" else offset + match.start()
+        offset += len(segment)
+    return len(text)
+
+
+def compress_content(content: str) -> str:
+    """
+    메시지 본문 압축: 코드 블록은 언어별로, MSTR 설계표 프롬프트는 포함된 SQL을,
+    블록 없는 SQL 본문은 SQL 문(세미콜론 / 빈 줄까지)만 압축하고 나머지 문장은 그대로 둔다.
+    """
+    if "```" in content:
+        def replace(match):
+            lang, body = match.group(1), match.group(2)
+            is_sql = lang.lower() in ("sql", "plsql", "oracle") or (not lang and SQL_START_PATTERN.match(body))
+            compressed = compress_sql(body) if is_sql else compress_code(body)
+            return f"```{lang}\n{compressed}\n```"
+        return FENCE_PATTERN.sub(replace, content)
+
+    if MSTR_SQL_MARKER in content:
+        head, _, sql = content.partition(MSTR_SQL_MARKER)
+        return head + MSTR_SQL_MARKER + compress_sql(sql) + "\n"
+
+    parts, cursor = [], 0
+    for match in SQL_START_PATTERN.finditer(content):
+        start = match.start(1)
+        if start < cursor:
+            continue
+        end = _sql_end(content, start)
+        parts.append(content[cursor:start])
+        parts.append(compress_sql(content[start:end]))
+        cursor = end
+    parts.append(content[cursor:])
+    return "".join(parts)
+
+
+def compress_messages(messages: List[dict]) -> Tuple[List[dict], int, int]:
+    """
+    메시지 목록의 SQL / 코드 페이로드를 압축한다.
+    :param messages: [{"role": ..., "content": ...}, ...]
+    :return: (압축된 메시지 목록, 압축 전 추정 토큰 수, 압축 후 추정 토큰 수)
+    """
+    compressed = [{**m, "content": compress_content(m["content"])} for m in messages]
+    before = sum(estimate_tokens(m["content"]) for m in messages)
+    after = sum(estimate_tokens(m["content"]) for m in compressed)
+    return compressed, before, after
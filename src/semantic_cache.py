@@ -0,0 +1,170 @@
+"""
+근사 중복 질문용 시맨틱 캐시 (MinHash + LSH, 외부 서비스 불필요)
+
+표현만 조금 다른 단일 턴 질문에 대해 이전 응답을 재사용한다.
+"""
+import hashlib
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from src.config import (
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL,
+)
+
+# MinHash 파라미터: 밴드 수 x 밴드당 행 수 = 해시 함수 수
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_HASHES = NUM_BANDS * ROWS_PER_BAND
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 고정 시드로 해시 계수 생성 (프로세스 재시작과 무관하게 동일한 지문)
+_rng = random.Random(20240601)
+_HASH_COEFFS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_HASHES)]
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """소문자화, 문장부호 제거, 공백 정리"""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """공백을 제거한 문자 n-gram 집합 (한글 어절 변화에 강함)"""
+    compact = text.replace(" ", "")
+    if len(compact) <= size:
+        return {compact} if compact else set()
+    return {compact[i:i + size] for i in range(len(compact) - size + 1)}
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """정규화된 텍스트의 MinHash 서명"""
+    hashed = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") & _MAX_HASH
+        for s in shingles(text)
+    ]
+    if not hashed:
+        return tuple([_MAX_HASH] * NUM_HASHES)
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashed) & _MAX_HASH
+        for a, b in _HASH_COEFFS
+    )
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """두 서명의 추정 Jaccard 유사도"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_HASHES
+
+
+class SemanticCache:
+    """MinHash 서명을 LSH 밴드로 색인하는 메모리 캐시 (LRU + TTL 제거)"""
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, ttl: float = SEMANTIC_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[int, dict]" = OrderedDict()
+        self.buckets: Dict[tuple, set] = {}
+        self._next_id = 0
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def cache_scope(model: str, messages: List[dict]) -> Optional[Tuple[str, str]]:
+        """캐시 대상이면 (범위 키, 사용자 질문) 반환 - 시스템 프롬프트 + 단일 사용자 메시지만 대상"""
+        user_messages = [m for m in messages if m.get("role") == "user"]
+        others = [m for m in messages if m.get("role") not in ("user", "system")]
+        if len(user_messages) != 1 or others:
+            return None
+        system = "".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        scope = hashlib.sha1(f"{model}\0{system}".encode("utf-8")).hexdigest()
+        return scope, user_messages[0].get("content", "")
+
+    def _band_keys(self, scope: str, signature: Tuple[int, ...]):
+        for band in range(NUM_BANDS):
+            start = band * ROWS_PER_BAND
+            yield (scope, band, signature[start:start + ROWS_PER_BAND])
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry["scope"], entry["signature"]):
+            bucket = self.buckets.get(key)
+            if bucket:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def lookup(self, model: str, messages: List[dict]) -> Optional[str]:
+        """유사도 임계값 이상의 캐시된 응답 조회"""
+        target = self.cache_scope(model, messages)
+        if target is None:
+            return None
+        scope, prompt = target
+        self.lookups += 1
+        signature = minhash(normalize_prompt(prompt))
+
+        candidates = set()
+        for key in self._band_keys(scope, signature):
+            candidates.update(self.buckets.get(key, ()))
+
+        now = time.time()
+        best_id, best_score = None, 0.0
+        for entry_id in candidates:
+            entry = self.entries[entry_id]
+            if now - entry["created"] > self.ttl:
+                self._remove(entry_id)
+                self.evictions += 1
+                continue
+            score = similarity(signature, entry["signature"])
+            if score > best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is None or best_score < self.threshold:
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(best_id)
+        return self.entries[best_id]["answer"]
+
+    def store(self, model: str, messages: List[dict], answer: str) -> None:
+        """응답 저장 (최대 개수 초과 시 가장 오래 사용되지 않은 항목 제거)"""
+        target = self.cache_scope(model, messages)
+        if target is None or not answer:
+            return
+        scope, prompt = target
+        signature = minhash(normalize_prompt(prompt))
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = {"scope": scope, "signature": signature, "answer": answer, "created": time.time()}
+        for key in self._band_keys(scope, signature):
+            self.buckets.setdefault(key, set()).add(entry_id)
+
+        while len(self.entries) > self.max_entries:
+            oldest_id = next(iter(self.entries))
+            self._remove(oldest_id)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """캐시 적중률 통계"""
+        return {
+            "entries": len(self.entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0,
+            "evictions": self.evictions,
+        }
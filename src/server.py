@@ -1,83 +1,183 @@
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import httpx
 import time
 import uuid
 import logging
 from datetime import datetime
 import asyncio
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 import json
+import hmac
 from src.config import (
-    API_KEY,
-    LLM_API_BASE_URL,
     FASTAPI_HOST,
     FASTAPI_PORT,
-    API_TIMEOUT,
-    API_MAX_RETRIES,
-    API_RETRY_DELAY,
     LOG_LEVEL,
     LOG_DIR,
-    CORS_ORIGINS,
+    Settings,
     validate_config
 )
 import os
 
-# 로그 디렉토리 생성
-os.makedirs(LOG_DIR, exist_ok=True)
-
-# 로그 설정
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(f'{LOG_DIR}/fastapi_server.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
-# 설정 검증
-try:
-    validate_config()
-    logger.info("✅ 설정 검증 완료")
-except ValueError as e:
-    logger.error(f"❌ 설정 오류: {e}")
-    raise
+def setup_logging() -> None:
+    """로그 디렉토리 생성 및 로그 설정 (앱 생성 시 수행, 이미 설정되어 있으면 유지)"""
+    if logging.getLogger().handlers:
+        return
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=getattr(logging, LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(f'{LOG_DIR}/fastapi_server.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+# 업스트림 커넥션 사전 연결 및 설정 재적재 관리
+from src.warmup import upstream_warmer
+from src.live_config import live_config
+from src.profiling import loop_monitor, phase_timers, route_template, sampling_profiler
+from src.metering import ANONYMOUS_CALLER, CALLER_HEADER, QuotaExceeded, today, usage_meter
+from src.http_compression import CompressionMiddleware, compression_stats
+from src.traffic_capture import CaptureRecord, traffic_capture
+
+def create_http_client(cfg: Settings) -> httpx.AsyncClient:
+    """설정 스냅샷의 풀 설정으로 업스트림 HTTP 클라이언트 생성"""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(cfg.API_TIMEOUT),
+        limits=httpx.Limits(
+            max_keepalive_connections=cfg.POOL_MAX_KEEPALIVE,
+            max_connections=cfg.POOL_MAX_CONNECTIONS,
+            keepalive_expiry=cfg.POOL_KEEPALIVE_EXPIRY
+        )
+    )
+
+def current_upstream(app: FastAPI):
+    """현재 (HTTP 클라이언트, 업스트림 URL, 연결 타임아웃)"""
+    cfg = live_config.current
+    return app.state.http_client, cfg.LLM_API_BASE_URL, cfg.UPSTREAM_CONNECT_TIMEOUT
+
+class ClientLeases:
+    """업스트림 HTTP 클라이언트별 사용 중인 요청 수
+
+    설정 재적재로 교체된 클라이언트는 마지막 사용자(재개 가능 스트림 생산자 포함)가 끝난 뒤 닫는다.
+    클라이언트를 받은 뒤 사용 등록까지의 짧은 틈을 위해 교체 후 최소 유예 시간은 기다린다.
+    """
+
+    def __init__(self, grace: float = 5.0, poll_interval: float = 1.0):
+        self.grace = grace
+        self.poll_interval = poll_interval
+        self.users: Dict[httpx.AsyncClient, int] = {}
+
+    def acquire(self, client: httpx.AsyncClient) -> None:
+        self.users[client] = self.users.get(client, 0) + 1
+
+    def release(self, client: httpx.AsyncClient) -> None:
+        remaining = self.users.get(client, 0) - 1
+        if remaining > 0:
+            self.users[client] = remaining
+        else:
+            self.users.pop(client, None)
+
+    async def close_when_idle(self, client: httpx.AsyncClient) -> None:
+        """교체된 클라이언트를 사용하는 요청이 모두 끝나면 종료"""
+        await asyncio.sleep(self.grace)
+        while self.users.get(client):
+            await asyncio.sleep(self.poll_interval)
+        await client.aclose()
+        logger.info("이전 설정의 HTTP 클라이언트를 종료했습니다.")
+
+# 프로세스 전역 HTTP 클라이언트 사용 현황
+client_leases = ClientLeases()
+
+def apply_reloaded_config(app: FastAPI, old: Settings, new: Settings) -> None:
+    """설정 교체 후처리: 풀 설정이 바뀌면 새 클라이언트로 교체, 업스트림 / 사전 연결 수가 바뀌면 재연결"""
+    pool_keys = ("API_TIMEOUT", "POOL_MAX_CONNECTIONS", "POOL_MAX_KEEPALIVE", "POOL_KEEPALIVE_EXPIRY")
+    if any(getattr(old, k) != getattr(new, k) for k in pool_keys):
+        old_client = app.state.http_client
+        app.state.http_client = create_http_client(new)
+        # 이전 클라이언트는 사용 중인 요청(클라이언트 지정 기한, 재개 가능 스트림 포함)이 모두 끝난 뒤 종료
+        asyncio.create_task(client_leases.close_when_idle(old_client))
+        logger.info("커넥션 풀 설정 변경: 새 HTTP 클라이언트로 교체")
+
+    # 프로세스 전역 객체의 한도 / 주기 갱신 (진행 중인 스트림 버퍼는 시작 시점 값 유지)
+    stream_registry.ttl, stream_registry.max_bytes = new.STREAM_BUFFER_TTL, new.STREAM_BUFFER_MAX_BYTES
+    upstream_warmer.connections = new.UPSTREAM_PREWARM_CONNECTIONS
+    upstream_warmer.interval = new.UPSTREAM_KEEPALIVE_INTERVAL
+
+    rewarm_keys = ("LLM_API_BASE_URL", "POOL_MAX_KEEPALIVE", "UPSTREAM_PREWARM_CONNECTIONS")
+    if any(getattr(old, k) != getattr(new, k) for k in rewarm_keys):
+        asyncio.create_task(upstream_warmer.warm(*current_upstream(app)))
 
 # HTTP 클라이언트 설정
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global start_time
+    start_time = time.time()
+
     # 시작 시 HTTP 클라이언트 생성
-    app.state.http_client = httpx.AsyncClient(
-        timeout=httpx.Timeout(API_TIMEOUT),
-        limits=httpx.Limits(max_keepalive_connections=10, max_connections=100)
-    )
+    app.state.http_client = create_http_client(live_config.current)
+
+    # 업스트림 커넥션 사전 연결 (DNS + TCP + TLS 비용을 첫 요청 전에 지불)
+    # 시작을 지연시키지 않도록 백그라운드에서 수행 - 완료 전까지 /health/ready는 503
+    async def warm_upstream() -> None:
+        warmed = await upstream_warmer.warm(*current_upstream(app))
+        logger.info(f"업스트림 커넥션 사전 연결: {warmed}/{upstream_warmer.connections}")
+        await upstream_warmer.run(lambda: current_upstream(app))
+
+    keepalive_task = asyncio.create_task(warm_upstream())
+
+    # 설정 재적재: SIGHUP 및 설정 파일 변경 감지
+    live_config.on_reload(lambda old, new: apply_reloaded_config(app, old, new))
+    live_config.install_signal_handler()
+    config_watch_task = asyncio.create_task(live_config.watch())
+
+    # 이벤트 루프 지연 모니터링
+    loop_monitor_task = asyncio.create_task(loop_monitor.run())
+
+    # 토큰 사용량 집계 (주기적으로 SQLite에 일괄 기록)
+    await usage_meter.start()
+    metering_task = asyncio.create_task(usage_meter.run())
+
+    # 트래픽 캡처 (CAPTURE_ENABLED=true 일 때만 기록)
+    capture_task = asyncio.create_task(traffic_capture.run())
+
     logger.info(f"FastAPI 서버가 시작되었습니다. (포트: {FASTAPI_PORT})")
     yield
     # 종료 시 HTTP 클라이언트 정리
+    keepalive_task.cancel()
+    config_watch_task.cancel()
+    loop_monitor_task.cancel()
+    # 남은 사용량을 기록한 뒤 종료
+    metering_task.cancel()
+    capture_task.cancel()
+    await asyncio.gather(metering_task, capture_task, return_exceptions=True)
+    usage_meter.close()
     await app.state.http_client.aclose()
     logger.info("FastAPI 서버가 종료되었습니다.")
 
-# FastAPI 앱 생성
-app = FastAPI(
-    title="Isolated Chat API",
-    description="폐쇄망 환경을 위한 LLM 프록시 채팅 API 서버",
-    version="1.0.0",
-    lifespan=lifespan
-)
+class LiveCORSMiddleware(CORSMiddleware):
+    """설정 재적재 시 허용 출처(CORS_ORIGINS)를 갱신하는 CORS 미들웨어"""
 
-# CORS 설정
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    def __init__(self, app, **options):
+        self._options = options
+        self._config_version = live_config.current.version
+        super().__init__(app, allow_origins=live_config.current.CORS_ORIGINS, **options)
+
+    async def __call__(self, scope, receive, send):
+        cfg = live_config.current
+        if cfg.version != self._config_version:
+            self._config_version = cfg.version
+            super().__init__(self.app, allow_origins=cfg.CORS_ORIGINS, **self._options)
+        await super().__call__(scope, receive, send)
+
+# 엔드포인트 (create_app에서 앱에 등록)
+router = APIRouter()
 
 # 요청/응답 모델 정의
 class Message(BaseModel):
@@ -93,6 +193,7 @@ class ChatCompletionRequest(BaseModel):
     top_p: Optional[float] = Field(1.0, ge=0.0, le=1.0, description="nucleus sampling")
     frequency_penalty: Optional[float] = Field(0.0, ge=-2.0, le=2.0, description="빈도 페널티")
     presence_penalty: Optional[float] = Field(0.0, ge=-2.0, le=2.0, description="존재 페널티")
+    compress: bool = Field(False, description="SQL/코드 페이로드 압축 여부 (토큰 절약)")
 
 class ChatCompletionResponse(BaseModel):
     id: str
@@ -106,35 +207,75 @@ class ChatCompletionResponse(BaseModel):
 request_count = 0
 error_count = 0
 total_response_time = 0.0
+cancelled_count = 0     # 클라이언트 연결 종료로 취소된 요청 수
+saved_tokens = 0        # 취소로 절약된 토큰 수 (추정치)
+compressed_tokens_before = 0   # 압축 요청의 압축 전 프롬프트 토큰 수 (추정치)
+compressed_tokens_after = 0    # 압축 요청의 압축 후 프롬프트 토큰 수 (추정치)
+
+# 클라이언트가 요청을 끊었을 때 사용하는 상태 코드 (nginx 관례)
+CLIENT_CLOSED_REQUEST = 499
 
 # 유틸리티 함수 import
 from src.utils import generate_chat_id, validate_model
+from src.deadline import (
+    DEADLINE_HEADER,
+    Deadline,
+    DeadlineExceeded,
+    latency_tracker,
+    resolve_deadline,
+)
+from src.semantic_cache import SemanticCache
+from src.stream_buffer import StreamBuffer, StreamGone, stream_registry
+from src.prompt_compression import compress_messages, estimate_tokens
+from src.hedging import hedger
+
+# 근사 중복 질문 캐시 (SEMANTIC_CACHE_ENABLED=true 일 때만 사용)
+semantic_cache = SemanticCache()
 
-async def call_llm_api_with_retry(client: httpx.AsyncClient, payload: dict, retries: int = API_MAX_RETRIES) -> dict:
-    """재시도 로직이 포함된 LLM API 호출"""
+async def call_llm_api_with_retry(client: httpx.AsyncClient, payload: dict, retries: Optional[int] = None,
+                                  deadline: Optional[Deadline] = None, cfg: Optional[Settings] = None,
+                                  endpoint: str = "upstream", capture: Optional[CaptureRecord] = None) -> dict:
+    """재시도 로직이 포함된 LLM API 호출 (전체 재시도가 요청 기한을 넘지 않음, capture에 시도별 소요 시간 기록)"""
     last_exception = None
+    cfg = cfg or live_config.current
+    retries = retries or cfg.API_MAX_RETRIES
+    deadline = deadline or Deadline(cfg.REQUEST_DEADLINE)
 
     for attempt in range(retries):
+        # 시도별 타임아웃: API_TIMEOUT과 남은 기한 중 작은 값
+        # (전체 응답 시간은 답변 길이에 비례하므로 적응형 타임아웃을 쓰지 않음 - 느려도 정상인 긴 답변 보호)
+        attempt_timeout = deadline.clamp(cfg.API_TIMEOUT)
+        started = time.monotonic()
+
         try:
-            logger.info(f"LLM API 호출 시도 {attempt + 1}/{retries}")
-
-            response = await client.post(
-                LLM_API_BASE_URL,
-                headers={
-                    "Authorization": API_KEY,
-                    "Content-Type": "application/json",
-                    "User-Agent": "Isolated-Chat/1.0"
-                },
-                json=payload
-            )
-            
-            response.raise_for_status()
+            logger.info(f"LLM API 호출 시도 {attempt + 1}/{retries} (타임아웃 {attempt_timeout:.1f}s)")
+
+            async def post(url: str) -> httpx.Response:
+                response = await client.post(
+                    url,
+                    headers={
+                        "Authorization": cfg.API_KEY,
+                        "Content-Type": "application/json",
+                        "User-Agent": "Isolated-Chat/1.0"
+                    },
+                    json=payload,
+                    timeout=httpx.Timeout(attempt_timeout, connect=min(cfg.UPSTREAM_CONNECT_TIMEOUT, attempt_timeout)),
+                    extensions={"trace": phase_timers.connect_tracer(endpoint)}
+                )
+                response.raise_for_status()
+                return response
+
+            upstream_warmer.touch()
+            # 응답이 늦으면 헤지 요청을 추가로 보내 먼저 성공한 응답 사용 (HEDGE_ENABLED)
+            response = await asyncio.wait_for(hedger.race(post, "response", cfg), timeout=attempt_timeout)
             result = response.json()
+            latency_tracker.record("response", time.monotonic() - started)
+            phase_timers.record(endpoint, "upstream_response", time.monotonic() - started)
             
             logger.info(f"LLM API 호출 성공 (시도 {attempt + 1})")
             return result
 
-        except httpx.TimeoutException as e:
+        except (httpx.TimeoutException, asyncio.TimeoutError) as e:
             last_exception = e
             logger.warning(f"LLM API 타임아웃 (시도 {attempt + 1}/{retries}): {e}")
 
@@ -150,53 +291,107 @@ async def call_llm_api_with_retry(client: httpx.AsyncClient, payload: dict, retr
             last_exception = e
             logger.error(f"LLM API 호출 오류 (시도 {attempt + 1}/{retries}): {e}")
 
-        # 마지막 시도가 아니면 잠시 대기
+        finally:
+            if capture:
+                capture.attempt(time.monotonic() - started)
+
+        # 마지막 시도가 아니면 잠시 대기 (대기 후 남은 기한이 없으면 중단)
         if attempt < retries - 1:
-            await asyncio.sleep(API_RETRY_DELAY * (attempt + 1))
+            delay = cfg.API_RETRY_DELAY * (attempt + 1)
+            if deadline.remaining() <= delay:
+                logger.warning("요청 처리 기한이 부족하여 재시도를 중단합니다.")
+                break
+            await asyncio.sleep(delay)
     
     # 모든 재시도 실패
     raise last_exception
 
+async def wait_for_disconnect(request: Request, interval: float) -> None:
+    """클라이언트 연결이 끊어질 때까지 대기"""
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+
+def record_cancellation(llm_payload: dict, generated_tokens: int = 0) -> None:
+    """취소된 요청 및 절약된 토큰 수 집계"""
+    global cancelled_count, saved_tokens
+
+    cancelled_count += 1
+    remaining = (llm_payload.get("max_tokens") or 0) - generated_tokens
+    saved_tokens += max(remaining, 0)
+    logger.info(f"클라이언트 연결 종료로 요청 취소: 생성된 토큰≈{generated_tokens}, 절약된 토큰≈{max(remaining, 0)}")
+
 # 미들웨어 - 요청 로깅
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    global request_count, total_response_time
-    
-    start_time = time.time()
-    request_count += 1
-    
-    # 요청 정보 로깅
-    logger.info(f"요청 시작: {request.method} {request.url}")
-    
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        total_response_time += process_time
-        
-        logger.info(f"요청 완료: {request.method} {request.url} - {response.status_code} - {process_time:.3f}s")
-        response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
-        
-    except Exception as e:
-        global error_count
-        error_count += 1
-        process_time = time.time() - start_time
-        logger.error(f"요청 실패: {request.method} {request.url} - {process_time:.3f}s - {e}")
-        raise
+class RequestLogMiddleware:
+    """
+    요청 로깅 / 처리 시간 집계 ASGI 미들웨어
+    (BaseHTTPMiddleware는 receive를 감싸 핸들러에서 연결 종료를 감지하지 못하므로 순수 ASGI로 구현)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global request_count, error_count
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        start_time = time.time()
+        request_count += 1
+        scope.setdefault("state", {})["received_at"] = time.perf_counter()
+
+        # 요청 정보 로깅
+        logger.info(f"요청 시작: {request.method} {request.url}")
+
+        async def send_with_timing(message):
+            global total_response_time
+            if message["type"] == "http.response.start":
+                process_time = time.time() - start_time
+                total_response_time += process_time
+                phase_timers.record(route_template(scope), "handler", process_time)
+                logger.info(f"요청 완료: {request.method} {request.url} - {message['status']} - {process_time:.3f}s")
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-process-time", str(process_time).encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as e:
+            error_count += 1
+            process_time = time.time() - start_time
+            logger.error(f"요청 실패: {request.method} {request.url} - {process_time:.3f}s - {e}")
+            raise
 
 # 헬스체크 엔드포인트
-@app.get("/health")
+@router.get("/health")
 async def health_check():
-    """서버 상태 확인"""
+    """서버 상태 확인 (live: 프로세스 동작, ready: 업스트림 커넥션 준비 완료)"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "live": True,
+        "upstream": upstream_warmer.status()
     }
 
+@router.get("/health/live")
+async def liveness_check():
+    """프로세스 생존 확인"""
+    return {"status": "live"}
+
+@router.get("/health/ready")
+async def readiness_check():
+    """로드밸런서용 준비 상태 확인 (커넥션 사전 연결 전에는 503)"""
+    if not upstream_warmer.ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "warming", "upstream": upstream_warmer.status()}
+        )
+    return {"status": "ready", "upstream": upstream_warmer.status()}
+
 # 통계 엔드포인트
-@app.get("/stats")
+@router.get("/stats")
 async def get_stats():
     """서버 통계 정보"""
     avg_response_time = total_response_time / request_count if request_count > 0 else 0
@@ -206,12 +401,122 @@ async def get_stats():
         "total_errors": error_count,
         "error_rate": error_count / request_count if request_count > 0 else 0,
         "average_response_time": round(avg_response_time, 3),
+        "cancelled_requests": cancelled_count,
+        "saved_tokens": saved_tokens,
+        "upstream_latency": latency_tracker.summary(),
+        "semantic_cache": semantic_cache.stats() if live_config.current.SEMANTIC_CACHE_ENABLED else None,
+        "resumable_streams": stream_registry.stats(),
+        "hedging": hedger.stats(),
+        "http_compression": compression_stats.summary(),
+        "traffic_capture": traffic_capture.stats(),
+        "prompt_compression": {
+            "tokens_before": compressed_tokens_before,
+            "tokens_after": compressed_tokens_after,
+        },
         "uptime": time.time() - start_time if 'start_time' in globals() else 0
     }
 
+# 관리자 엔드포인트 접근 제어
+def require_admin(request: Request) -> None:
+    """ADMIN_TOKEN이 설정되어 있으면 X-Admin-Token 헤더로, 아니면 localhost 요청만 허용"""
+    token = live_config.current.ADMIN_TOKEN
+    if token:
+        if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="관리자 권한이 필요합니다.")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="관리자 엔드포인트는 localhost에서만 접근할 수 있습니다.")
+
+# 설정 조회 / 재적재 엔드포인트
+@router.get("/admin/config", dependencies=[Depends(require_admin)])
+async def get_config():
+    """현재 적용 중인 설정 버전 및 값 (민감 정보 마스킹)"""
+    return live_config.status()
+
+@router.post("/admin/config/reload", dependencies=[Depends(require_admin)])
+async def reload_config():
+    """설정 파일을 다시 읽어 적용 (검증 실패 시 기존 설정 유지)"""
+    try:
+        live_config.reload()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"설정 검증 실패: {e}")
+    return live_config.status()
+
+# 프로파일링 엔드포인트
+@router.post("/admin/profile/cpu", dependencies=[Depends(require_admin)])
+async def profile_cpu(seconds: float = 10.0, interval_ms: float = 5.0):
+    """이벤트 루프 스레드를 N초간 샘플링하여 collapsed-stack(flamegraph 입력) 텍스트 반환"""
+    if not 0 < seconds <= 120 or not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="seconds는 0~120, interval_ms는 1~1000 범위여야 합니다.")
+    try:
+        collapsed = await sampling_profiler.profile(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return PlainTextResponse(collapsed)
+
+@router.get("/admin/profile/phases", dependencies=[Depends(require_admin)])
+async def get_phase_timings():
+    """엔드포인트별 단계 소요 시간 (검증, 업스트림 연결/TLS, TTFB, 청크 변환, 전송 등)"""
+    return phase_timers.summary()
+
+@router.delete("/admin/profile/phases", dependencies=[Depends(require_admin)])
+async def reset_phase_timings():
+    """단계 소요 시간 통계 초기화"""
+    phase_timers.reset()
+    return {"status": "reset"}
+
+@router.get("/admin/profile/loop", dependencies=[Depends(require_admin)])
+async def get_loop_lag():
+    """이벤트 루프 지연 및 느린 콜백 목록"""
+    return loop_monitor.summary()
+
+# 토큰 사용량 조회 엔드포인트
+@router.get("/admin/usage", dependencies=[Depends(require_admin)])
+async def get_usage(start: Optional[str] = None, end: Optional[str] = None, caller: Optional[str] = None):
+    """기간별(YYYY-MM-DD, 기본: 이번 달) 호출자 x 모델 x 일자 사용량 및 할당량 현황"""
+    end = end or today()
+    start = start or end[:7] + "-01"
+    try:
+        datetime.strptime(start, "%Y-%m-%d")
+        datetime.strptime(end, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start, end는 YYYY-MM-DD 형식이어야 합니다.")
+    report = await usage_meter.report(start, end, caller)
+    report["quotas"] = usage_meter.quota_status(live_config.current)
+    return report
+
+def build_llm_payload(req: ChatCompletionRequest) -> Tuple[dict, Optional[dict]]:
+    """
+    채팅 요청으로 SKT API 호출용 페이로드를 구성한다.
+    :return: (페이로드, 압축 전/후 추정 토큰 수 - 압축하지 않으면 None)
+    """
+    global compressed_tokens_before, compressed_tokens_after
+
+    skt_payload = {
+        "model": req.model,
+        "messages": [{"role": m.role, "content": m.content} for m in req.messages],
+        "stream": req.stream
+    }
+
+    # 프롬프트 압축 (요청별 선택)
+    compression = None
+    if req.compress:
+        skt_payload["messages"], tokens_before, tokens_after = compress_messages(skt_payload["messages"])
+        compressed_tokens_before += tokens_before
+        compressed_tokens_after += tokens_after
+        compression = {"tokens_original": tokens_before, "tokens_compressed": tokens_after}
+        logger.info(f"프롬프트 압축: 추정 토큰 {tokens_before} -> {tokens_after}")
+
+    # 선택적 매개변수 추가
+    for name in ("temperature", "max_tokens", "top_p", "frequency_penalty", "presence_penalty"):
+        value = getattr(req, name)
+        if value is not None:
+            skt_payload[name] = value
+    return skt_payload, compression
+
 # 메인 채팅 엔드포인트
-@app.post("/v1/chat/completions")
-async def chat_completion(req: ChatCompletionRequest):
+@router.post("/v1/chat/completions")
+async def chat_completion(req: ChatCompletionRequest, request: Request):
     """채팅 완성 API - OpenAI 호환 (스트리밍 지원)"""
     
     # 입력 검증
@@ -225,38 +530,78 @@ async def chat_completion(req: ChatCompletionRequest):
         logger.warning(f"지원하지 않는 모델 요청: {req.model}")
         # 지원하지 않는 모델이어도 일단 진행 (SKT API에서 처리)
     
+    # 본문 파싱 + pydantic 검증 시간 (미들웨어 진입부터 엔드포인트 진입까지)
+    received_at = getattr(request.state, "received_at", None)
+    if received_at is not None:
+        phase_timers.record(route_template(request.scope), "validation", time.perf_counter() - received_at)
+
+    # 요청 시작 시점의 설정과 HTTP 클라이언트 (설정이 재적재되어도 이 요청은 끝까지 사용)
+    cfg = live_config.current
+    client = request.app.state.http_client
+
+    # 끊긴 스트림 이어받기 (업스트림 생성은 그대로 두고 버퍼에서 이어서 전송)
+    last_event_id = request.headers.get(RESUME_HEADER)
+    if req.stream and last_event_id and cfg.STREAM_RESUME_GRACE > 0:
+        return resume_stream(last_event_id, request, req.model)
+
+    # 호출자별 토큰 할당량 확인 (메모리 조회만 수행)
+    caller = request.headers.get(CALLER_HEADER) or ANONYMOUS_CALLER
+    try:
+        usage_meter.check(caller, cfg)
+    except QuotaExceeded as e:
+        logger.warning(f"토큰 할당량 초과: 호출자={caller} - {e}")
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+
+    # 요청 처리 기한 결정 (클라이언트 헤더 > 모델별 기본값)
+    deadline = resolve_deadline(req.model, request.headers.get(DEADLINE_HEADER), cfg)
+
     # 요청 로깅
-    logger.info(f"채팅 요청: 모델={req.model}, 메시지 수={len(req.messages)}, 스트리밍={req.stream}")
+    logger.info(f"채팅 요청: 모델={req.model}, 메시지 수={len(req.messages)}, 스트리밍={req.stream}, 기한={deadline.budget:.1f}s")
     
-    # SKT API 호출용 페이로드 구성
-    skt_payload = {
-                    "model": req.model,
-        "messages": [{"role": m.role, "content": m.content} for m in req.messages],
-        "stream": req.stream
-    }
-    
-    # 선택적 매개변수 추가
-    if req.temperature is not None:
-        skt_payload["temperature"] = req.temperature
-    if req.max_tokens is not None:
-        skt_payload["max_tokens"] = req.max_tokens
-    if req.top_p is not None:
-        skt_payload["top_p"] = req.top_p
-    if req.frequency_penalty is not None:
-        skt_payload["frequency_penalty"] = req.frequency_penalty
-    if req.presence_penalty is not None:
-        skt_payload["presence_penalty"] = req.presence_penalty
+    # SKT API 호출용 페이로드 구성 (요청별 선택 시 프롬프트 압축)
+    skt_payload, compression = build_llm_payload(req)
+    compression_headers = {}
+    if compression:
+        compression_headers = {
+            "X-Prompt-Tokens-Original": str(compression["tokens_original"]),
+            "X-Prompt-Tokens-Compressed": str(compression["tokens_compressed"]),
+        }
+
+    # 시맨틱 캐시 조회 (단일 턴 요청만 대상)
+    if cfg.SEMANTIC_CACHE_ENABLED:
+        cached_answer = semantic_cache.lookup(req.model, skt_payload["messages"])
+        if cached_answer is not None:
+            logger.info(f"시맨틱 캐시 적중: 모델={req.model}")
+            if req.stream:
+                return StreamingResponse(stream_cached_response(cached_answer, req.model), media_type="text/plain",
+                                         headers=compression_headers)
+            return JSONResponse(build_completion_response(cached_answer, req.model, skt_payload, {}),
+                                headers=compression_headers)
     
     try:
-        if req.stream:
+        if req.stream and cfg.STREAM_RESUME_GRACE > 0:
+            # 이어받기 가능한 스트리밍 응답 처리 (X-Stream-ID / SSE id로 재연결 지점 전달)
+            buffer = start_resumable_stream(skt_payload, req.model, deadline, cfg, client,
+                                            route_template(request.scope), caller)
+            return StreamingResponse(
+                follow_stream(buffer, 0, request, req.model),
+                media_type="text/plain",
+                headers={**compression_headers, "X-Stream-ID": buffer.stream_id}
+            )
+        elif req.stream:
             # 스트리밍 응답 처리
             return StreamingResponse(
-                stream_chat_response(skt_payload, req.model),
-                media_type="text/plain"
+                stream_chat_response(skt_payload, req.model, request, deadline, cfg, client, caller),
+                media_type="text/plain",
+                headers=compression_headers
             )
         else:
             # 일반 응답 처리
-            return await handle_normal_response(skt_payload, req.model)
+            response_data = await handle_normal_response(skt_payload, req.model, request, deadline, cfg, client,
+                                                         caller)
+            if compression_headers and isinstance(response_data, dict):
+                return JSONResponse(response_data, headers=compression_headers)
+            return response_data
             
     except httpx.HTTPStatusError as e:
         logger.error(f"SKT API HTTP 오류: {e.response.status_code} - {e.response.text}")
@@ -265,7 +610,14 @@ async def chat_completion(req: ChatCompletionRequest):
             detail=f"외부 API 오류: {e.response.status_code}"
         )
         
-    except httpx.TimeoutException:
+    except DeadlineExceeded as e:
+        logger.error(f"요청 처리 기한 초과: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="요청 처리 기한 초과"
+        )
+
+    except (httpx.TimeoutException, asyncio.TimeoutError):
         logger.error("SKT API 타임아웃")
         raise HTTPException(
             status_code=status.HTTP_504_GATEWAY_TIMEOUT,
@@ -279,13 +631,55 @@ async def chat_completion(req: ChatCompletionRequest):
             detail="서버 내부 오류가 발생했습니다."
         )
 
-async def handle_normal_response(llm_payload: dict, model: str) -> ChatCompletionResponse:
-    """일반 응답 처리"""
-    llm_data = await call_llm_api_with_retry(app.state.http_client, llm_payload)
+async def handle_normal_response(llm_payload: dict, model: str, request: Request, deadline: Deadline,
+                                 cfg: Settings, client: httpx.AsyncClient,
+                                 caller: str = ANONYMOUS_CALLER) -> ChatCompletionResponse:
+    """일반 응답 처리 (클라이언트 연결 종료 시 업스트림 요청 취소)"""
+    capture = traffic_capture.begin(route_template(request.scope), model, llm_payload, caller)
+    if capture:
+        capture.start()
+
+    async def call_upstream() -> dict:
+        # 업스트림 호출이 끝날 때까지 클라이언트 사용 등록 (설정 재적재 시 조기 종료 방지)
+        client_leases.acquire(client)
+        try:
+            return await call_llm_api_with_retry(client, llm_payload, deadline=deadline, cfg=cfg,
+                                                 endpoint=route_template(request.scope), capture=capture)
+        finally:
+            client_leases.release(client)
+
+    llm_task = asyncio.create_task(call_upstream())
+    disconnect_task = asyncio.create_task(wait_for_disconnect(request, cfg.DISCONNECT_CHECK_INTERVAL))
+
+    try:
+        await asyncio.wait({llm_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect_task.cancel()
+
+    if not llm_task.done():
+        # 클라이언트가 먼저 끊어짐 - 업스트림 요청을 중단하고 연결 반환
+        llm_task.cancel()
+        try:
+            await llm_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        record_cancellation(llm_payload)
+        if capture:
+            capture.finish("cancelled")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    try:
+        llm_data = llm_task.result()
+    except Exception:
+        if capture:
+            capture.finish("error")
+        raise
     
     # 응답 데이터 추출
     choices = llm_data.get("choices", [])
     if not choices:
+        if capture:
+            capture.finish("error")
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail="LLM API에서 유효한 응답을 받지 못했습니다."
@@ -295,9 +689,24 @@ async def handle_normal_response(llm_payload: dict, model: str) -> ChatCompletio
     if not reply_content:
         logger.warning("LLM API 응답이 비어있습니다.")
         reply_content = "죄송합니다. 응답을 생성할 수 없습니다."
+    elif cfg.SEMANTIC_CACHE_ENABLED and choices[0].get("finish_reason", "stop") == "stop":
+        # 잘리지 않은 정상 응답만 캐시에 저장
+        semantic_cache.store(model, llm_payload["messages"], reply_content)
+    
+    response_data = build_completion_response(
+        reply_content, model, llm_payload, llm_data, choices[0].get("finish_reason", "stop")
+    )
     
-    # OpenAI 호환 응답 포맷 구성
-    response_data = {
+    usage_meter.record(caller, model, response_data["usage"])
+    if capture:
+        capture.finish("ok", response_data["usage"].get("completion_tokens", 0))
+    logger.info(f"채팅 응답 성공: 호출자={caller}, 토큰 수={response_data['usage'].get('total_tokens')}")
+    return response_data
+
+def build_completion_response(reply_content: str, model: str, llm_payload: dict, llm_data: dict,
+                              finish_reason: str = "stop") -> dict:
+    """OpenAI 호환 응답 포맷 구성"""
+    return {
         "id": generate_chat_id(),
                 "object": "chat.completion",
                 "created": int(time.time()),
@@ -309,112 +718,491 @@ async def handle_normal_response(llm_payload: dict, model: str) -> ChatCompletio
                             "role": "assistant",
                     "content": reply_content
                 },
-                "finish_reason": choices[0].get("finish_reason", "stop")
+                "finish_reason": finish_reason
             }
         ],
-        "usage": llm_data.get("usage", {
-            "prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in llm_payload.get("messages", [])),
-            "completion_tokens": len(reply_content.split()),
-            "total_tokens": sum(len(str(m.get("content", "")).split()) for m in llm_payload.get("messages", [])) + len(reply_content.split())
-        })
+        "usage": llm_data.get("usage") or estimate_usage(llm_payload, reply_content)
     }
-    
-    logger.info(f"채팅 응답 성공: 토큰 수={len(reply_content)}")
-    return response_data
 
-async def stream_chat_response(llm_payload: dict, model: str):
-    """스트리밍 응답 처리"""
-    chat_id = generate_chat_id()
-    created = int(time.time())
+def estimate_usage(llm_payload: dict, reply_content: str) -> dict:
+    """업스트림이 사용량을 주지 않을 때의 토큰 수 추정 (프롬프트 압축 / 트래픽 캡처와 같은 추정 방식)"""
+    prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in llm_payload.get("messages", []))
+    completion_tokens = estimate_tokens(reply_content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+def build_stream_chunk(chat_id: str, created: int, model: str, delta: dict,
+                       finish_reason: Optional[str] = None) -> dict:
+    """OpenAI 호환 스트리밍 청크 포맷 구성"""
+    return {
+        "id": chat_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "delta": delta,
+                "finish_reason": finish_reason
+            }
+        ]
+    }
+
+async def stream_cached_response(answer: str, model: str):
+    """캐시된 응답을 스트리밍 포맷으로 전송"""
+    cached_chunk = build_stream_chunk(generate_chat_id(), int(time.time()), model,
+                                      {"role": "assistant", "content": answer}, "stop")
+    yield f"data: {json.dumps(cached_chunk, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+
+class ChatStream:
+    """업스트림 스트리밍 응답을 OpenAI 호환 청크로 변환 (SSE / WebSocket 공용)
+
+    연결 / 첫 토큰 / 토큰 간 유휴 타임아웃을 각각 적용하며, 모두 요청 기한을 넘지 않는다.
+    생성된 내용, 종료 사유, 사용량은 스트림 종료 후 속성으로 조회한다.
+    """
+
+    def __init__(self, llm_payload: dict, model: str, deadline: Deadline, cfg: Settings,
+                 client: httpx.AsyncClient, endpoint: str,
+                 is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                 caller: str = ANONYMOUS_CALLER):
+        self.llm_payload = llm_payload
+        self.model = model
+        self.deadline = deadline
+        self.cfg = cfg
+        self.client = client
+        self.endpoint = endpoint
+        self.is_disconnected = is_disconnected
+        self.caller = caller
+        self.chat_id = generate_chat_id()
+        self.created = int(time.time())
+        self.generated_tokens = 0
+        self.content: List[str] = []
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[dict] = None
+        self.cancelled = False
+        self.accepted = False   # 업스트림이 요청을 받아 생성을 시작했는지 (사용량 집계 대상)
+        self.capture = traffic_capture.begin(endpoint, model, llm_payload, caller)
+
+    def mark_cancelled(self) -> None:
+        """취소 집계 (여러 경로에서 호출되어도 한 번만 기록)"""
+        if not self.cancelled:
+            self.cancelled = True
+            record_cancellation(self.llm_payload, self.generated_tokens)
+
+    def usage_summary(self) -> dict:
+        """업스트림이 보고한 사용량, 없으면 추정치"""
+        return self.usage or estimate_usage(self.llm_payload, "".join(self.content))
+
+    async def chunks(self):
+        """업스트림 SSE를 읽어 OpenAI 호환 청크(dict)를 생성
+
+        클라이언트 연결 종료 시 업스트림 스트림을 중단한다. 오류는 호출자에게 전파된다.
+        """
+        cfg, deadline, endpoint = self.cfg, self.deadline, self.endpoint
+        # 스트림이 끝날 때까지 클라이언트 사용 등록 (요청보다 오래 사는 재개 가능 스트림 포함)
+        client_leases.acquire(self.client)
+        transform_time = 0.0   # 업스트림 청크 파싱 / 재인코딩 시간
+        write_time = 0.0       # yield 후 다운스트림 전송까지 대기 시간
+        last_disconnect_check = time.monotonic()
+
+        try:
+            # 단계별 타임아웃 (관측된 지연 시간 기반, 설정값이 상한)
+            first_token_timeout = latency_tracker.timeout_for("first_token", cfg.FIRST_TOKEN_TIMEOUT, cfg)
+            idle_timeout = latency_tracker.timeout_for("inter_token", cfg.STREAM_IDLE_TIMEOUT, cfg)
+            read_timeout = deadline.clamp(max(first_token_timeout, idle_timeout))
+
+            # LLM API에 스트리밍 요청 (공용 커넥션 풀 사용) - 첫 청크까지 받아야 성공으로 간주
+            async def open_stream(url: str):
+                upstream_request = self.client.build_request(
+                    "POST",
+                    url,
+                    headers={
+                        "Authorization": cfg.API_KEY,
+                        "Content-Type": "application/json",
+                        "User-Agent": "Isolated-Chat/1.0"
+                    },
+                    # 마지막 청크에 실제 사용량을 포함하도록 요청 (없으면 추정치로 집계)
+                    json={**self.llm_payload, "stream_options": {"include_usage": True}},
+                    timeout=httpx.Timeout(read_timeout, connect=min(cfg.UPSTREAM_CONNECT_TIMEOUT, read_timeout)),
+                    extensions={"trace": phase_timers.connect_tracer(endpoint)}
+                )
+                response = await self.client.send(upstream_request, stream=True)
+                try:
+                    response.raise_for_status()
+                    upstream_chunks = response.aiter_bytes()
+                    try:
+                        first_chunk = await upstream_chunks.__anext__()
+                    except StopAsyncIteration:
+                        first_chunk = None
+                    return response, upstream_chunks, first_chunk
+                except BaseException:
+                    # 실패하거나 헤지 경쟁에서 져서 취소되면 커넥션 반환
+                    await response.aclose()
+                    raise
+
+            async def discard(opened) -> None:
+                await opened[0].aclose()
+
+            started = time.monotonic()
+            upstream_warmer.touch()
+            if self.capture:
+                self.capture.start()
+            first_token_wait = deadline.clamp(first_token_timeout)
+            try:
+                # 첫 토큰이 늦으면 헤지 요청을 추가로 보내 먼저 도착한 스트림 사용 (HEDGE_ENABLED)
+                response, upstream_chunks, first_chunk = await asyncio.wait_for(
+                    hedger.race(open_stream, "first_token", cfg, discard),
+                    timeout=first_token_wait
+                )
+            except asyncio.TimeoutError:
+                raise deadline.timeout_error(first_token_wait, first_token_timeout,
+                                             f"첫 토큰 타임아웃({first_token_timeout:.1f}s) 초과")
+            last_chunk_at = time.monotonic()
+            phase_timers.record(endpoint, "upstream_ttfb", last_chunk_at - started)
+            if first_chunk is not None:
+                latency_tracker.record("first_token", last_chunk_at - started)
+
+            try:
+                self.accepted = True
 
-    try:
-        # LLM API에 스트리밍 요청
-        async with httpx.AsyncClient(timeout=httpx.Timeout(60.0)) as client:
-            async with client.stream(
-                "POST",
-                LLM_API_BASE_URL,
-                headers={
-                    "Authorization": API_KEY,
-                    "Content-Type": "application/json",
-                    "User-Agent": "Isolated-Chat/1.0"
-                },
-                json=llm_payload
-            ) as response:
-                
-                response.raise_for_status()
-                
                 # 스트리밍 응답 처리
                 buffer = ""
-                async for chunk in response.aiter_bytes():
+                while True:
+                    # 첫 청크는 이미 받았으므로 그대로 처리, 이후는 유휴 타임아웃 적용
+                    if first_chunk is not None:
+                        chunk, first_chunk = first_chunk, None
+                        now = last_chunk_at
+                    else:
+                        idle_wait = deadline.clamp(idle_timeout)
+                        try:
+                            chunk = await asyncio.wait_for(upstream_chunks.__anext__(), timeout=idle_wait)
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            raise deadline.timeout_error(idle_wait, idle_timeout,
+                                                         f"토큰 간 유휴 타임아웃({idle_timeout:.1f}s) 초과")
+                        now = time.monotonic()
+                        latency_tracker.record("inter_token", now - last_chunk_at)
+                        last_chunk_at = now
+
+                    # 주기적으로 클라이언트 연결 상태 확인
+                    if self.is_disconnected and now - last_disconnect_check >= cfg.DISCONNECT_CHECK_INTERVAL:
+                        last_disconnect_check = now
+                        if await self.is_disconnected():
+                            self.mark_cancelled()
+                            return
+
+                    transform_started = time.perf_counter()
                     buffer += chunk.decode('utf-8')
-                    
+
                     # 완전한 라인들을 처리
                     while '\n' in buffer:
                         line, buffer = buffer.split('\n', 1)
                         line = line.strip()
-                        
-                        if line.startswith('data: '):
-                            data_str = line[6:]  # 'data: ' 제거
-                            
-                            if data_str.strip() == '[DONE]':
-                                # 스트리밍 종료 신호
-                                yield "data: [DONE]\n\n"
-                                return
-                            
-                            try:
-                                # SKT API 응답 파싱
-                                data = json.loads(data_str)
-                                
-                                if 'choices' in data and data['choices']:
-                                    choice = data['choices'][0]
-                                    
-                                    # OpenAI 호환 스트리밍 응답 포맷
-                                    stream_response = {
-                                        "id": chat_id,
-                                        "object": "chat.completion.chunk",
-                                        "created": created,
-                                        "model": model,
-                                        "choices": [
-                                            {
-                                                "index": 0,
-                                                "delta": choice.get("delta", {}),
-                                                "finish_reason": choice.get("finish_reason")
-                                            }
-                                        ]
-                                    }
-                                    
-                                    # 클라이언트에 전송
-                                    yield f"data: {json.dumps(stream_response, ensure_ascii=False)}\n\n"
-                                    
-                            except json.JSONDecodeError:
-                                # JSON 파싱 오류는 무시하고 계속
-                                continue
-                        
-                        elif line == '':
-                            # 빈 라인은 무시
+
+                        if not line.startswith('data: '):
+                            # 빈 라인 등은 무시
                             continue
-                
+
+                        data_str = line[6:]  # 'data: ' 제거
+                        if data_str.strip() == '[DONE]':
+                            # 스트리밍 종료 신호 (정상 완료된 응답만 캐시에 저장)
+                            if cfg.SEMANTIC_CACHE_ENABLED and self.finish_reason == "stop":
+                                semantic_cache.store(self.model, self.llm_payload["messages"], "".join(self.content))
+                            transform_time += time.perf_counter() - transform_started
+                            return
+
+                        try:
+                            # SKT API 응답 파싱
+                            data = json.loads(data_str)
+                        except json.JSONDecodeError:
+                            # JSON 파싱 오류는 무시하고 계속
+                            continue
+
+                        if data.get("usage"):
+                            self.usage = data["usage"]
+                        if 'choices' in data and data['choices']:
+                            choice = data['choices'][0]
+                            if choice.get("delta", {}).get("content"):
+                                self.generated_tokens += 1
+                                self.content.append(choice["delta"]["content"])
+                                if self.capture:
+                                    self.capture.token()
+                            if choice.get("finish_reason"):
+                                self.finish_reason = choice["finish_reason"]
+
+                            # OpenAI 호환 스트리밍 응답 포맷
+                            stream_chunk = build_stream_chunk(self.chat_id, self.created, self.model,
+                                                              choice.get("delta", {}), choice.get("finish_reason"))
+                            transform_time += time.perf_counter() - transform_started
+                            write_started = time.perf_counter()
+                            yield stream_chunk
+                            write_time += time.perf_counter() - write_started
+                            transform_started = time.perf_counter()
+
+                    transform_time += time.perf_counter() - transform_started
+
+            finally:
+                # 정상 종료, 타임아웃, 취소 모두 업스트림 응답을 닫아 커넥션 반환
+                await response.aclose()
+
+        except asyncio.CancelledError:
+            # 클라이언트 연결 종료 또는 스트림 취소 요청으로 태스크가 취소된 경우
+            self.mark_cancelled()
+            raise
+
+        finally:
+            client_leases.release(self.client)
+            phase_timers.record(endpoint, "chunk_transform", transform_time)
+            phase_timers.record(endpoint, "write", write_time)
+            # 중간에 취소 / 실패해도 업스트림이 처리한 만큼 집계
+            if self.accepted:
+                usage_meter.record(self.caller, self.model, self.usage_summary())
+            if self.capture:
+                self.capture.finish_current(self.generated_tokens, self.cancelled)
+
+async def stream_chat_response(llm_payload: dict, model: str, request: Request, deadline: Deadline,
+                               cfg: Settings, client: httpx.AsyncClient, caller: str = ANONYMOUS_CALLER):
+    """스트리밍 응답 처리 - SSE 포맷 (클라이언트 연결 종료 시 업스트림 스트림 중단)"""
+    stream = ChatStream(llm_payload, model, deadline, cfg, client, route_template(request.scope),
+                        request.is_disconnected, caller)
+    try:
+        async for chunk in stream.chunks():
+            # 클라이언트에 전송
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
     except Exception as e:
-        logger.error(f"스트리밍 응답 오류: {e}")
         # 오류 발생 시 오류 메시지 전송
-        error_response = {
-            "id": chat_id,
-            "object": "chat.completion.chunk",
-            "created": created,
-            "model": model,
-            "choices": [
-                {
-                    "index": 0,
-                    "delta": {"content": f"[오류] 스트리밍 응답 실패: {str(e)}"},
-                    "finish_reason": "stop"
-                }
-            ]
-        }
-        yield f"data: {json.dumps(error_response, ensure_ascii=False)}\n\n"
+        yield stream_error_event(stream.chat_id, model, e)
+
+    if not stream.cancelled:
+        yield "data: [DONE]\n\n"
+
+def stream_error_event(chat_id: str, model: str, error: Exception) -> str:
+    """스트리밍 중 오류를 알리는 SSE 이벤트"""
+    logger.error(f"스트리밍 응답 오류: {error}")
+    error_chunk = build_stream_chunk(chat_id, int(time.time()), model,
+                                     {"content": f"[오류] 스트리밍 응답 실패: {str(error)}"}, "stop")
+    return f"data: {json.dumps(error_chunk, ensure_ascii=False)}\n\n"
+
+# 이어받기 가능한 스트리밍: 업스트림은 버퍼에 기록하고, 클라이언트는 버퍼를 따라 읽음
+RESUME_HEADER = "Last-Event-ID"
+
+async def produce_stream(buffer: StreamBuffer, stream: ChatStream) -> None:
+    """업스트림 스트림을 끝까지 읽어 버퍼에 기록 (클라이언트 연결이 잠시 끊겨도 계속 진행)"""
+    try:
+        async for chunk in stream.chunks():
+            buffer.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+    except Exception as e:
+        buffer.append(stream_error_event(stream.chat_id, stream.model, e))
+    finally:
+        if stream.cancelled:
+            # 늦게 재연결한 클라이언트가 잘린 응답을 완료로 오인하지 않도록 중단 사실을 기록
+            abandoned = StreamGone("재연결 대기 시간 초과로 생성이 중단되었습니다.")
+            buffer.append(stream_error_event(stream.chat_id, stream.model, abandoned))
+        buffer.append("data: [DONE]\n\n")
+        buffer.finish()
+        stream_registry.evict()
+
+def start_resumable_stream(llm_payload: dict, model: str, deadline: Deadline, cfg: Settings,
+                           client: httpx.AsyncClient, endpoint: str, caller: str = ANONYMOUS_CALLER) -> StreamBuffer:
+    """스트림 버퍼를 만들고 업스트림 생성 태스크 시작"""
+    buffer = stream_registry.create(cfg.STREAM_BUFFER_MAX_STREAM_BYTES, cfg.STREAM_RESUME_GRACE)
+    stream = ChatStream(llm_payload, model, deadline, cfg, client, endpoint, caller=caller)
+    buffer.producer = asyncio.create_task(produce_stream(buffer, stream))
+    return buffer
+
+async def follow_stream(buffer: StreamBuffer, after_seq: int, request: Request, model: str):
+    """버퍼의 이벤트를 after_seq 다음부터 전송 (SSE id: 스트림ID:순번)
+
+    연결이 끊기면 reader만 빠지고, STREAM_RESUME_GRACE 안에 재연결이 없으면 업스트림을 중단한다.
+    """
+    buffer.attach()
+    try:
+        async for seq, text in buffer.follow(after_seq, live_config.current.DISCONNECT_CHECK_INTERVAL,
+                                             request.is_disconnected):
+            yield f"id: {buffer.stream_id}:{seq}\n{text}"
+    except StreamGone as e:
+        # 전송이 느려 버퍼가 reader를 앞지른 경우
+        yield stream_error_event(generate_chat_id(), model, e)
         yield "data: [DONE]\n\n"
+    finally:
+        buffer.detach()
+
+def resume_stream(last_event_id: str, request: Request, model: str) -> StreamingResponse:
+    """Last-Event-ID(스트림ID:순번) 이후 이벤트부터 이어서 전송"""
+    stream_id, _, seq = last_event_id.partition(":")
+    try:
+        after_seq = int(seq or 0)
+        buffer = stream_registry.get(stream_id)
+        if after_seq + 1 < buffer.first_seq:
+            raise StreamGone(f"스트림 {stream_id}의 이벤트 {after_seq + 1}은(는) 이미 버퍼에서 제거되었습니다.")
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"잘못된 {RESUME_HEADER}: {last_event_id}")
+    except StreamGone as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+
+    logger.info(f"스트림 이어받기: id={stream_id}, 순번 {after_seq} 이후")
+    return StreamingResponse(follow_stream(buffer, after_seq, request, model), media_type="text/plain",
+                             headers={"X-Stream-ID": stream_id})
+
+# WebSocket 채팅 엔드포인트
+WEBSOCKET_ENDPOINT = "/v1/chat/ws"
+
+async def run_websocket_stream(stream_id: str, req: ChatCompletionRequest, timeout: Optional[float],
+                               send: Callable[[dict], Awaitable[None]], client: httpx.AsyncClient,
+                               caller: str = ANONYMOUS_CALLER) -> None:
+    """WebSocket 스트림 하나 처리 (chat_completion과 동일한 업스트림 파이프라인 사용)"""
+    global request_count, error_count
+    request_count += 1
+    started = time.time()
+
+    # 스트림 시작 시점의 설정과 HTTP 클라이언트
+    cfg = live_config.current
+    deadline = resolve_deadline(req.model, str(timeout) if timeout else None, cfg)
+
+    llm_payload, compression = build_llm_payload(req)
+    llm_payload["stream"] = True
+    stream = ChatStream(llm_payload, req.model, deadline, cfg, client, WEBSOCKET_ENDPOINT, caller=caller)
+    logger.info(f"WebSocket 스트림 시작: id={stream_id}, 모델={req.model}, 기한={deadline.budget:.1f}s")
+
+    try:
+        cached_answer = None
+        if cfg.SEMANTIC_CACHE_ENABLED:
+            cached_answer = semantic_cache.lookup(req.model, llm_payload["messages"])
+
+        if cached_answer is not None:
+            logger.info(f"시맨틱 캐시 적중: 모델={req.model}")
+            stream.content, stream.finish_reason = [cached_answer], "stop"
+            await send({"type": "delta", "id": stream_id,
+                        "chunk": build_stream_chunk(stream.chat_id, stream.created, req.model,
+                                                    {"role": "assistant", "content": cached_answer}, "stop")})
+        else:
+            chunks = stream.chunks()
+            try:
+                async for chunk in chunks:
+                    await send({"type": "delta", "id": stream_id, "chunk": chunk})
+            finally:
+                await chunks.aclose()
+
+        done = {"type": "done", "id": stream_id, "finish_reason": stream.finish_reason,
+                "usage": stream.usage_summary()}
+        if compression:
+            done["prompt_compression"] = compression
+        await send(done)
+
+    except asyncio.CancelledError:
+        # 클라이언트의 cancel 메시지 또는 연결 종료
+        stream.mark_cancelled()
+        with suppress(Exception):
+            await send({"type": "cancelled", "id": stream_id})
+        raise
+
+    except Exception as e:
+        error_count += 1
+        if isinstance(e, httpx.HTTPStatusError):
+            detail = f"외부 API 오류: {e.response.status_code}"
+        elif isinstance(e, (DeadlineExceeded, httpx.TimeoutException, asyncio.TimeoutError)):
+            detail = "요청 처리 기한 초과"
+        else:
+            detail = "서버 내부 오류가 발생했습니다."
+        logger.error(f"WebSocket 스트림 오류: id={stream_id} - {e}")
+        with suppress(Exception):
+            await send({"type": "error", "id": stream_id, "detail": detail})
+
+    finally:
+        phase_timers.record(WEBSOCKET_ENDPOINT, "handler", time.time() - started)
+
+@router.websocket(WEBSOCKET_ENDPOINT)
+async def chat_websocket(websocket: WebSocket):
+    """
+    채팅 WebSocket - 연결 하나에서 여러 채팅 요청을 스트림 ID로 구분하여 동시에 처리
+
+    클라이언트 -> 서버
+      {"type": "chat", "id": 스트림ID, "timeout": 기한(초, 선택), ...ChatCompletionRequest 필드}
+      {"type": "cancel", "id": 스트림ID}
+    서버 -> 클라이언트 (스트림 간 프레임은 섞여서 도착할 수 있음)
+      {"type": "delta", "id": 스트림ID, "chunk": chat.completion.chunk}
+      {"type": "done", "id": 스트림ID, "finish_reason": ..., "usage": {...}}
+      {"type": "cancelled", "id": 스트림ID}
+      {"type": "error", "id": 스트림ID 또는 null, "detail": 오류 내용}
+    """
+    await websocket.accept()
+    caller = websocket.headers.get(CALLER_HEADER) or ANONYMOUS_CALLER
+    send_lock = asyncio.Lock()
+    streams: Dict[str, asyncio.Task] = {}
+
+    async def send(frame: dict) -> None:
+        # 여러 스트림 태스크가 동시에 보내므로 프레임 단위로 직렬화
+        async with send_lock:
+            await websocket.send_text(json.dumps(frame, ensure_ascii=False))
+
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                await send({"type": "error", "id": None, "detail": "JSON 형식의 메시지가 아닙니다."})
+                continue
+            if not isinstance(message, dict):
+                # 배열 / 숫자 등 객체가 아닌 JSON (연결을 끊지 않고 다른 스트림은 계속 진행)
+                await send({"type": "error", "id": None, "detail": "메시지는 JSON 객체여야 합니다."})
+                continue
+
+            stream_id = str(message.get("id") or "")
+            kind = message.get("type")
+
+            if kind == "cancel":
+                task = streams.get(stream_id)
+                if task is not None:
+                    task.cancel()
+                continue
+
+            if kind != "chat":
+                await send({"type": "error", "id": stream_id or None, "detail": f"알 수 없는 메시지 유형: {kind}"})
+                continue
+            if not stream_id or stream_id in streams:
+                await send({"type": "error", "id": stream_id or None, "detail": "스트림 ID가 없거나 이미 사용 중입니다."})
+                continue
+            if len(streams) >= live_config.current.WS_MAX_STREAMS:
+                await send({"type": "error", "id": stream_id, "detail": "동시 스트림 수 제한을 초과했습니다."})
+                continue
+
+            try:
+                req = ChatCompletionRequest(**{k: v for k, v in message.items() if k not in ("type", "id", "timeout")})
+            except ValidationError as e:
+                detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                await send({"type": "error", "id": stream_id, "detail": f"요청 형식 오류: {detail}"})
+                continue
+            if not req.messages:
+                await send({"type": "error", "id": stream_id, "detail": "메시지가 비어있습니다."})
+                continue
+            try:
+                usage_meter.check(caller, live_config.current)
+            except QuotaExceeded as e:
+                await send({"type": "error", "id": stream_id, "detail": str(e)})
+                continue
+
+            task = asyncio.create_task(run_websocket_stream(stream_id, req, message.get("timeout"), send,
+                                                                websocket.app.state.http_client, caller))
+            streams[stream_id] = task
+            task.add_done_callback(lambda _, sid=stream_id: streams.pop(sid, None))
+
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket 연결 종료: 진행 중인 스트림 {len(streams)}개 취소")
+
+    finally:
+        # 연결이 끊어지면 진행 중인 업스트림 스트림을 모두 중단
+        pending = list(streams.values())
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
 
 # 전역 예외 처리기
-@app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"전역 예외 발생: {request.method} {request.url} - {exc}")
     return JSONResponse(
@@ -422,12 +1210,59 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "서버 내부 오류가 발생했습니다."}
     )
 
-# 서버 시작 시간 기록
-start_time = time.time()
+def create_app() -> FastAPI:
+    """
+    앱 팩토리: 로그 설정, 설정 검증, 미들웨어 / 엔드포인트 등록
+    (import 시에는 수행하지 않음 - uvicorn src.server:create_app --factory)
+    """
+    setup_logging()
+
+    # 설정 검증
+    try:
+        validate_config()
+        logger.info("✅ 설정 검증 완료")
+    except ValueError as e:
+        logger.error(f"❌ 설정 오류: {e}")
+        raise
+
+    app = FastAPI(
+        title="Isolated Chat API",
+        description="폐쇄망 환경을 위한 LLM 프록시 채팅 API 서버",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # CORS 설정
+    app.add_middleware(
+        LiveCORSMiddleware,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # 요청 본문 해제 / 응답 압축 (gzip, zstd)
+    app.add_middleware(CompressionMiddleware, settings=lambda: live_config.current)
+
+    # 요청 로깅 (가장 바깥쪽)
+    app.add_middleware(RequestLogMiddleware)
+    app.include_router(router)
+    app.add_exception_handler(Exception, global_exception_handler)
+    return app
+
+_app: Optional[FastAPI] = None
+
+def __getattr__(name: str):
+    """uvicorn src.server:app 호환 - 처음 접근할 때 앱 생성"""
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     import uvicorn
     from src.config import print_config
 
     print_config()
-    uvicorn.run(app, host=FASTAPI_HOST, port=FASTAPI_PORT, log_level=LOG_LEVEL.lower())
+    uvicorn.run(create_app(), host=FASTAPI_HOST, port=FASTAPI_PORT, log_level=LOG_LEVEL.lower())
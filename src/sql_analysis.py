@@ -0,0 +1,440 @@
+"""
+대용량 SQL의 MSTR 설계표 분석 (map-reduce)
+
+SQL을 논리 단위(CTE, 인라인 뷰, SELECT 목록, FROM, WHERE 등)로 나누어 병렬로 분석하고,
+부분 결과 표(Attribute / Metric / Prompt)를 하나의 설계 문서로 병합한다.
+청크별 결과는 캐시되어 SQL 일부만 수정한 경우 변경된 부분만 다시 분석한다.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from src.client import chat_with_api
+
+# 청크 최대 길이 (문자 수) 및 동시 분석 수
+DEFAULT_CHUNK_CHARS = 6000
+DEFAULT_MAX_WORKERS = 4
+
+# 표 컬럼 및 Object Type 출력 순서
+DESIGN_COLUMNS = ["Object Type", "Object Name", "Mapped Column / Expression", "Source Table", "Lookup Table", "Description"]
+OBJECT_TYPE_ORDER = {"attribute": 0, "metric": 1, "prompt": 2}
+
+CLAUSE_PATTERN = re.compile(
+    r"\b(SELECT|FROM|WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|UNION\s+ALL|UNION|MINUS|INTERSECT)\b"
+)
+CTE_PATTERN = re.compile(r"(\w+)\s+AS\s*\(")
+# FROM 목록의 끝 (최상위 수준에서 다음 절이 시작되는 위치)
+FROM_END_PATTERN = re.compile(
+    r"\b(?:WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|UNION|MINUS|INTERSECT|CONNECT\s+BY|START\s+WITH)\b", re.IGNORECASE
+)
+JOIN_PATTERN = re.compile(
+    r"\b(?:NATURAL\s+)?(?:(?:LEFT|RIGHT|FULL)(?:\s+OUTER)?\s+|INNER\s+|CROSS\s+)?JOIN\b", re.IGNORECASE
+)
+JOIN_CONDITION_PATTERN = re.compile(r"\b(?:ON|USING)\b", re.IGNORECASE)
+# FROM 목록 항목: 테이블명 [AS] 알리아스
+TABLE_REF_PATTERN = re.compile(r"\s*([A-Z_][\w$#]*(?:\.[A-Z_][\w$#]*)?)\s+(?:AS\s+)?([A-Z_]\w*)\s*", re.IGNORECASE)
+# 알리아스 참조 (A.COL)
+QUALIFIER_PATTERN = re.compile(r"\b([A-Z_]\w*)\s*\.", re.IGNORECASE)
+SQL_KEYWORDS = {"ON", "WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "FULL", "CROSS", "GROUP", "ORDER",
+                "UNION", "MINUS", "INTERSECT", "HAVING", "AND", "OR", "SELECT", "FROM", "WITH", "AS"}
+
+# 청크 분석 결과 캐시 (프로세스 메모리)
+_chunk_cache = {}
+
+
+def _mask_sql(sql: str) -> str:
+    """문자열, 주석, 괄호 안(깊이 1 이상)을 공백으로 가린 대문자 SQL (길이 동일)
+
+    최상위 수준의 키워드 위치를 원본 SQL과 같은 인덱스로 찾기 위해 사용한다.
+    """
+    masked = []
+    depth = 0
+    i = 0
+    length = len(sql)
+    while i < length:
+        ch = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = length if end == -1 else end
+            masked.append(" " * (end - i))
+            i = end
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            masked.append(" " * (end - i))
+            i = end
+            continue
+        if ch == "'":
+            end = i + 1
+            while end < length:
+                if sql[end] == "'" and sql.startswith("''", end):
+                    end += 2
+                    continue
+                if sql[end] == "'":
+                    break
+                end += 1
+            end = min(end + 1, length)
+            masked.append(" " * (end - i))
+            i = end
+            continue
+        if ch == "(":
+            masked.append("(" if depth == 0 else " ")
+            depth += 1
+        elif ch == ")":
+            depth = max(depth - 1, 0)
+            masked.append(")" if depth == 0 else " ")
+        else:
+            masked.append(ch.upper() if depth == 0 else " ")
+        i += 1
+    return "".join(masked)
+
+
+def _find_closing(sql: str, open_idx: int) -> int:
+    """open_idx의 여는 괄호에 대응하는 닫는 괄호 위치"""
+    masked = _mask_sql(sql[open_idx:])
+    close = masked.find(")")
+    return len(sql) - 1 if close == -1 else open_idx + close
+
+
+def _split_top_level_commas(text: str) -> list:
+    """최상위 수준의 콤마로 분리"""
+    masked = _mask_sql(text)
+    parts, start = [], 0
+    for idx, ch in enumerate(masked):
+        if ch == ",":
+            parts.append(text[start:idx])
+            start = idx + 1
+    parts.append(text[start:])
+    return [p for p in parts if p.strip()]
+
+
+def _split_query(sql: str, label: str, max_chars: int) -> list:
+    """단일 쿼리(WITH 제외)를 절 단위로 분리하고, 큰 인라인 뷰와 SELECT 목록은 다시 분할"""
+    masked = _mask_sql(sql)
+    matches = list(CLAUSE_PATTERN.finditer(masked))
+    if not matches:
+        return [(label, sql.strip())]
+
+    units = []
+    prefix = sql[:matches[0].start()].strip()
+    if prefix:
+        units.append((f"{label} 머리말", prefix))
+
+    query_no = 1
+    for idx, match in enumerate(matches):
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(sql)
+        clause = " ".join(match.group(1).split())
+        text = sql[match.start():end].strip()
+        if clause in ("UNION ALL", "UNION", "MINUS", "INTERSECT"):
+            query_no += 1
+            continue
+        clause_label = f"{label}{'' if query_no == 1 else f' #{query_no}'} {clause}"
+
+        if len(text) <= max_chars:
+            units.append((clause_label, text))
+        elif clause == "SELECT":
+            # 큰 SELECT 목록은 컬럼 단위로 묶어서 분할
+            body = text[len("SELECT"):]
+            group = []
+            for column in _split_top_level_commas(body):
+                if group and sum(len(c) for c in group) + len(column) > max_chars:
+                    units.append((f"{clause_label} (일부)", "SELECT " + ",".join(group).strip()))
+                    group = []
+                group.append(column)
+            if group:
+                units.append((f"{clause_label} (일부)", "SELECT " + ",".join(group).strip()))
+        else:
+            units.extend(_extract_subqueries(text, clause_label, max_chars))
+    return units
+
+
+def _extract_subqueries(text: str, label: str, max_chars: int) -> list:
+    """절 안의 큰 인라인 뷰/서브쿼리를 별도 단위로 분리하고 자리표시자로 대체"""
+    masked = _mask_sql(text)
+    units, remainder, cursor, sub_no = [], [], 0, 0
+    for match in re.finditer(r"\(", masked):
+        open_idx = match.start()
+        if open_idx < cursor:
+            continue
+        close_idx = _find_closing(text, open_idx)
+        inner = text[open_idx + 1:close_idx]
+        if len(inner) > max_chars // 4 and re.match(r"\s*(SELECT|WITH)\b", inner, re.IGNORECASE):
+            sub_no += 1
+            sub_label = f"{label} 서브쿼리 {sub_no}"
+            units.extend(split_sql_units(inner, max_chars, sub_label))
+            remainder.append(text[cursor:open_idx])
+            remainder.append(f"( /* {sub_label} 참조 */ )")
+            cursor = close_idx + 1
+    remainder.append(text[cursor:])
+    return [(label, "".join(remainder).strip())] + units
+
+
+def split_sql_units(sql: str, max_chars: int = DEFAULT_CHUNK_CHARS, label: str = "본 쿼리") -> list:
+    """
+    SQL을 논리 단위로 분리한다.
+    :param sql: 분석할 SQL 문자열
+    :param max_chars: 단위 최대 길이 (초과 시 재귀 분할)
+    :param label: 단위 이름 접두어
+    :return: [(단위 이름, SQL 조각), ...]
+    """
+    sql = sql.strip().rstrip(";")
+    masked = _mask_sql(sql)
+    if not re.match(r"\s*WITH\b", masked):
+        return _split_query(sql, label, max_chars)
+
+    # WITH 절: 각 CTE를 개별 단위로 분리
+    units = []
+    cursor = masked.index("WITH") + len("WITH")
+    while True:
+        while cursor < len(masked) and masked[cursor].isspace():
+            cursor += 1
+        match = CTE_PATTERN.match(masked, cursor)
+        if not match:
+            break
+        open_idx = match.end() - 1
+        close_idx = _find_closing(sql, open_idx)
+        cte_name = sql[match.start(1):match.end(1)]
+        body = sql[open_idx + 1:close_idx]
+        if len(body) <= max_chars:
+            units.append((f"CTE {cte_name}", f"{cte_name} AS ({body.strip()})"))
+        else:
+            units.extend(split_sql_units(body, max_chars, f"CTE {cte_name}"))
+        cursor = close_idx + 1
+        while cursor < len(masked) and masked[cursor].isspace():
+            cursor += 1
+        if not masked.startswith(",", cursor):
+            break
+        cursor += 1
+
+    return units + _split_query(sql[cursor:], label, max_chars)
+
+
+def _from_lists(sql: str) -> list:
+    """모든 깊이의 FROM 목록 (괄호 안 인라인 뷰는 "()"로 대체, 다음 절 또는 닫는 괄호에서 끝)"""
+    stripped = re.sub(r"/\*.*?\*/|--[^\n]*|'(?:[^']|'')*'", " ", sql, flags=re.DOTALL)
+    lists = []
+    for match in re.finditer(r"\bFROM\b", stripped, re.IGNORECASE):
+        top, depth = [], 0
+        for ch in stripped[match.end():]:
+            if ch == "(":
+                if depth == 0:
+                    top.append("()")
+                depth += 1
+            elif ch == ")":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif depth == 0:
+                top.append(ch)
+        text = "".join(top)
+        end = FROM_END_PATTERN.search(text)
+        lists.append(text[:end.start()] if end else text)
+    return lists
+
+
+def extract_table_aliases(sql: str) -> dict:
+    """FROM 목록(콤마 / JOIN으로 구분된 항목)에서 알리아스 -> 실제 테이블명 매핑 추출"""
+    aliases = {}
+    for from_list in _from_lists(sql):
+        for part in JOIN_PATTERN.split(from_list):
+            for item in part.split(","):
+                item = JOIN_CONDITION_PATTERN.split(item, 1)[0]
+                match = TABLE_REF_PATTERN.fullmatch(item)
+                if not match:
+                    continue
+                table, alias = match.group(1).upper(), match.group(2).upper()
+                if alias not in SQL_KEYWORDS and table not in SQL_KEYWORDS:
+                    aliases.setdefault(alias, table)
+    return aliases
+
+
+def chunk_aliases(chunk_sql: str, aliases: dict) -> dict:
+    """조각에서 참조(A.COL)하거나 선언한 알리아스만 남긴 매핑 (조각 안의 선언이 우선)"""
+    referenced = {name.upper() for name in QUALIFIER_PATTERN.findall(chunk_sql)}
+    result = {alias: table for alias, table in aliases.items() if alias in referenced}
+    result.update(extract_table_aliases(chunk_sql))
+    return result
+
+
+def _unit_owner(label: str) -> str:
+    """단위가 속한 CTE / 본 쿼리 ("CTE 이름" 또는 첫 단어)"""
+    words = label.split()
+    return " ".join(words[:2]) if words[0] == "CTE" else words[0]
+
+
+def group_units(units: list, max_chars: int = DEFAULT_CHUNK_CHARS) -> list:
+    """
+    작은 단위들을 최대 길이 안에서 묶어 호출 수를 줄인다.
+    CTE / 본 쿼리 경계를 넘어서는 묶지 않으므로, 다른 부분이 바뀌어도 변경되지 않은 CTE의 청크(캐시 키)는 그대로다.
+    """
+    chunks, labels, parts, size, owner = [], [], [], 0, None
+    for label, text in units:
+        if parts and (size + len(text) > max_chars or _unit_owner(label) != owner):
+            chunks.append((", ".join(labels), "\n\n".join(parts)))
+            labels, parts, size = [], [], 0
+        owner = _unit_owner(label)
+        labels.append(label)
+        parts.append(f"-- [{label}]\n{text}")
+        size += len(text)
+    if parts:
+        chunks.append((", ".join(labels), "\n\n".join(parts)))
+    return chunks
+
+
+def get_mstr_chunk_prompt(chunk_label: str, chunk_sql: str, aliases: dict) -> str:
+    """
+    SQL 조각 분석용 프롬프트를 생성한다.
+    :param chunk_label: 조각 이름 (CTE명, 절 이름 등)
+    :param chunk_sql: 분석할 SQL 조각
+    :param aliases: 이 조각에 해당하는 알리아스 -> 실제 테이블명 매핑 (chunk_aliases)
+    :return: LLM에 전달할 프롬프트 문자열
+    """
+    alias_lines = "\n".join(f"{alias} = {table}" for alias, table in sorted(aliases.items())) or "(없음)"
+    return f"""
+너는 MicroStrategy(MSTR) 개발자야.
+아래는 Oracle 기반의 복잡한 웹 리포트용 SQL 중 일부({chunk_label})이다.
+이 조각에 등장하는 항목만 MSTR 설계 문서 형식의 마크다운 표 하나로 정리해줘.
+
+표 컬럼: | {' | '.join(DESIGN_COLUMNS)} |
+- Object Type은 Attribute, Metric, Prompt 중 하나
+- Source Table / Lookup Table은 알리아스명이 아닌 실제 테이블명 (아래 매핑 참고)
+- Metric은 계산식과 함께 분모 0 체크, NVL 사용 여부 등 주의사항을 Description에 포함
+- WHERE 절 및 주석(/* 치환: ... */)의 조건은 Prompt로 분리하고, 치환 조건을 Description에 반드시 적을 것
+- 표 외의 설명은 쓰지 말고, SQL을 그대로 출력하지 말 것
+- 한글로 작성할 것
+
+알리아스 매핑:
+{alias_lines}
+
+SQL 조각:
+{chunk_sql}
+"""
+
+
+def _parse_design_rows(text: str) -> list:
+    """마크다운 표에서 설계 행 추출 (헤더/구분선 제외)"""
+    rows = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            continue
+        cells = [c.strip() for c in line.strip("|").split("|")]
+        if all(re.fullmatch(r":?-{2,}:?", c) for c in cells if c):
+            continue
+        if cells and cells[0].lower() == "object type":
+            continue
+        if len(cells) < len(DESIGN_COLUMNS):
+            cells += [""] * (len(DESIGN_COLUMNS) - len(cells))
+        rows.append(cells[:len(DESIGN_COLUMNS)])
+    return rows
+
+
+def merge_design_tables(results: list) -> str:
+    """
+    청크별 분석 결과를 하나의 설계 문서로 병합한다.
+    동일한 (Object Type, Object Name)은 한 행으로 합치고 서로 다른 설명은 이어 붙인다.
+    :param results: [(청크 이름, LLM 응답 텍스트), ...]
+    :return: 병합된 마크다운 설계 문서
+    """
+    merged = {}
+    unparsed = []
+    for label, text in results:
+        rows = _parse_design_rows(text)
+        if not rows:
+            unparsed.append((label, text))
+            continue
+        for row in rows:
+            key = (row[0].lower(), row[1].lower())
+            if key not in merged:
+                merged[key] = row
+                continue
+            existing = merged[key]
+            for col in range(2, len(DESIGN_COLUMNS)):
+                if row[col] and row[col] not in existing[col]:
+                    existing[col] = f"{existing[col]} / {row[col]}" if existing[col] else row[col]
+
+    ordered = sorted(merged.values(), key=lambda r: (OBJECT_TYPE_ORDER.get(r[0].lower(), 9), r[0].lower()))
+    lines = ["## MSTR 설계표", "", "| " + " | ".join(DESIGN_COLUMNS) + " |",
+             "|" + "|".join(["---"] * len(DESIGN_COLUMNS)) + "|"]
+    lines += ["| " + " | ".join(row) + " |" for row in ordered]
+    if unparsed:
+        lines += ["", "## 분석 메모 (표로 정리되지 않은 결과)"]
+        for label, text in unparsed:
+            lines += ["", f"### {label}", text.strip()]
+    return "\n".join(lines)
+
+
+def _cache_key(model_name: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def _load_cached(key: str, cache_dir):
+    if key in _chunk_cache:
+        return _chunk_cache[key]
+    if cache_dir:
+        path = os.path.join(cache_dir, f"{key}.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                _chunk_cache[key] = json.load(f)["result"]
+            return _chunk_cache[key]
+    return None
+
+
+def _store_cached(key: str, result: str, cache_dir) -> None:
+    _chunk_cache[key] = result
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(os.path.join(cache_dir, f"{key}.json"), "w", encoding="utf-8") as f:
+            json.dump({"result": result}, f, ensure_ascii=False)
+
+
+def analyze_mstr_design(sql, server_url="http://localhost:9393/v1/chat/completions", model_name="gpt-4o",
+                        timeout=120, max_chunk_chars=DEFAULT_CHUNK_CHARS, max_workers=DEFAULT_MAX_WORKERS,
+                        cache_dir=None):
+    """
+    대용량 SQL을 청크 단위로 병렬 분석하여 MSTR 설계 문서를 생성한다.
+    :param sql: 분석할 SQL 문자열
+    :param server_url: LLM 서버 API 주소
+    :param model_name: 사용할 모델명
+    :param timeout: 청크별 요청 타임아웃(초)
+    :param max_chunk_chars: 청크 최대 길이 (문자 수)
+    :param max_workers: 동시 분석 수
+    :param cache_dir: 청크 결과를 파일로도 캐시할 디렉토리 (None이면 메모리 캐시만 사용)
+    :return: 병합된 마크다운 설계 문서
+    """
+    aliases = extract_table_aliases(sql)
+    chunks = group_units(split_sql_units(sql, max_chunk_chars), max_chunk_chars)
+
+    # 청크마다 참조하는 알리아스만 넣어 다른 부분의 변경이 캐시 키에 영향을 주지 않도록 함
+    prompts = [(label, get_mstr_chunk_prompt(label, text, chunk_aliases(text, aliases))) for label, text in chunks]
+    results = [None] * len(prompts)
+    pending = []
+    for idx, (label, prompt) in enumerate(prompts):
+        key = _cache_key(model_name, prompt)
+        cached = _load_cached(key, cache_dir)
+        if cached is not None:
+            results[idx] = (label, cached)
+        else:
+            pending.append((idx, label, prompt, key))
+
+    logging.info(f"MSTR 설계 분석: 청크 {len(prompts)}개 중 {len(pending)}개 분석 (캐시 {len(prompts) - len(pending)}개)")
+
+    def analyze(item):
+        idx, label, prompt, key = item
+        answer = chat_with_api(prompt, server_url=server_url, model_name=model_name, timeout=timeout,
+                               temperature=0.2)
+        # 오류 응답은 캐시하지 않음
+        if not answer.startswith("[오류]"):
+            _store_cached(key, answer, cache_dir)
+        return idx, label, answer
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for idx, label, answer in executor.map(analyze, pending):
+                results[idx] = (label, answer)
+
+    return merge_design_tables(results)
@@ -0,0 +1,198 @@
+"""
+이어받기 가능한 스트림 버퍼
+
+스트리밍 응답의 각 이벤트에 순번을 붙여 스트림별 링 버퍼에 보관한다.
+클라이언트 연결이 잠시 끊어져도 업스트림 생성은 계속되며,
+재연결한 클라이언트는 Last-Event-ID 이후 이벤트부터 이어서 받는다.
+"""
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from src.config import (
+    STREAM_RESUME_GRACE,
+    STREAM_BUFFER_TTL,
+    STREAM_BUFFER_MAX_BYTES,
+    STREAM_BUFFER_MAX_STREAM_BYTES,
+)
+
+
+class StreamGone(Exception):
+    """스트림이 만료되었거나 요청한 이벤트가 이미 버퍼에서 밀려남"""
+
+
+class StreamBuffer:
+    """스트림 하나의 이벤트 링 버퍼 (용량 초과 시 오래된 이벤트부터 제거)"""
+
+    def __init__(self, stream_id: str, max_bytes: int = STREAM_BUFFER_MAX_STREAM_BYTES,
+                 grace: float = STREAM_RESUME_GRACE):
+        self.stream_id = stream_id
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self.events: Deque[Tuple[int, str, int]] = deque()   # (순번, 이벤트 텍스트, 바이트 수)
+        self.size = 0
+        self.last_seq = 0
+        self.finished = False
+        self.finished_at: Optional[float] = None
+        self.readers = 0
+        self.producer: Optional[asyncio.Task] = None
+        self._updated = asyncio.Event()
+        self._abandon_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def first_seq(self) -> int:
+        """버퍼에 남아 있는 가장 오래된 이벤트 순번 (비어 있으면 다음 순번)"""
+        return self.events[0][0] if self.events else self.last_seq + 1
+
+    def _notify(self) -> None:
+        # 대기 중인 reader를 깨우고 다음 대기용 이벤트로 교체
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def append(self, text: str) -> int:
+        """이벤트 추가 후 순번 반환"""
+        self.last_seq += 1
+        nbytes = len(text.encode("utf-8"))
+        self.events.append((self.last_seq, text, nbytes))
+        self.size += nbytes
+        # 마지막 이벤트는 항상 유지
+        while self.size > self.max_bytes and len(self.events) > 1:
+            self.size -= self.events.popleft()[2]
+        self._notify()
+        return self.last_seq
+
+    def shrink(self, nbytes: int) -> int:
+        """오래된 이벤트를 nbytes 이상 제거 (전체 메모리 한도 초과 시), 제거한 바이트 수 반환"""
+        freed = 0
+        while freed < nbytes and len(self.events) > 1:
+            freed += self.events.popleft()[2]
+        self.size -= freed
+        return freed
+
+    def finish(self) -> None:
+        """생성 종료 (이후 reader는 남은 이벤트를 받고 종료)"""
+        self.finished = True
+        self.finished_at = time.monotonic()
+        if self._abandon_handle is not None:
+            self._abandon_handle.cancel()
+        self._notify()
+
+    def attach(self) -> None:
+        """reader 연결 (대기 중인 업스트림 중단 예약 취소)"""
+        self.readers += 1
+        if self._abandon_handle is not None:
+            self._abandon_handle.cancel()
+            self._abandon_handle = None
+
+    def detach(self) -> None:
+        """reader 연결 종료 - 마지막 reader면 grace 동안 재연결이 없을 때 업스트림 중단"""
+        self.readers -= 1
+        if self.readers == 0 and not self.finished and self.producer is not None:
+            self._abandon_handle = asyncio.get_running_loop().call_later(self.grace, self._abandon)
+
+    def _abandon(self) -> None:
+        self._abandon_handle = None
+        if self.readers == 0 and not self.finished and self.producer is not None:
+            self.producer.cancel()
+
+    async def follow(self, after_seq: int, check_interval: float,
+                     is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None):
+        """
+        after_seq 다음 이벤트부터 (순번, 텍스트)를 생성하고, 새 이벤트를 기다리다 스트림 종료 시 끝낸다.
+        요청한 구간이 이미 버퍼에서 밀려났으면 StreamGone.
+        """
+        sent = after_seq
+        while True:
+            # 재연결이 늦었거나 느린 reader를 기다리는 동안 버퍼가 한 바퀴 돈 경우
+            if sent + 1 < self.first_seq:
+                raise StreamGone(f"스트림 {self.stream_id}의 이벤트 {sent + 1}은(는) 이미 버퍼에서 제거되었습니다.")
+            waiter = self._updated
+            for seq, text, _ in list(self.events):
+                if seq > sent:
+                    sent = seq
+                    yield seq, text
+            if self.finished and sent >= self.last_seq:
+                return
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=check_interval)
+            except asyncio.TimeoutError:
+                if is_disconnected is not None and await is_disconnected():
+                    return
+
+
+class StreamRegistry:
+    """진행 중 / 최근 스트림 버퍼 관리 (완료 후 TTL 및 전체 메모리 한도로 제거, 한도는 설정 재적재 시 갱신)"""
+
+    def __init__(self, ttl: float = STREAM_BUFFER_TTL, max_bytes: int = STREAM_BUFFER_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.streams: Dict[str, StreamBuffer] = {}
+        self.resumes = 0
+        self.evictions = 0
+
+    def create(self, max_bytes: int = STREAM_BUFFER_MAX_STREAM_BYTES,
+               grace: float = STREAM_RESUME_GRACE) -> StreamBuffer:
+        """새 스트림 버퍼 등록 (스트림별 한도 / 재연결 대기 시간은 요청 시작 시점의 설정)"""
+        self.evict()
+        buffer = StreamBuffer(uuid.uuid4().hex, max_bytes, grace)
+        self.streams[buffer.stream_id] = buffer
+        return buffer
+
+    def get(self, stream_id: str) -> StreamBuffer:
+        """이어받을 스트림 조회 (없으면 StreamGone)"""
+        self.evict()
+        buffer = self.streams.get(stream_id)
+        if buffer is None:
+            raise StreamGone(f"스트림 {stream_id}을(를) 찾을 수 없습니다 (만료 또는 제거됨).")
+        self.resumes += 1
+        return buffer
+
+    def _remove(self, stream_id: str) -> None:
+        del self.streams[stream_id]
+        self.evictions += 1
+
+    def total_bytes(self) -> int:
+        return sum(buffer.size for buffer in self.streams.values())
+
+    def evict(self) -> None:
+        """만료된 완료 스트림 제거 후, 전체 한도를 넘으면 오래된 완료 스트림 -> 진행 중 스트림의 앞부분 순으로 정리"""
+        now = time.monotonic()
+        for stream_id, buffer in list(self.streams.items()):
+            if buffer.finished and buffer.readers == 0 and now - buffer.finished_at > self.ttl:
+                self._remove(stream_id)
+
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        finished = sorted((b for b in self.streams.values() if b.finished and b.readers == 0),
+                          key=lambda b: b.finished_at)
+        for buffer in finished:
+            self._remove(buffer.stream_id)
+            total -= buffer.size
+            if total <= self.max_bytes:
+                return
+
+        # 진행 중인 스트림만 남으면 큰 버퍼부터 오래된 이벤트를 버림 (해당 구간은 이어받기 불가)
+        for buffer in sorted(self.streams.values(), key=lambda b: b.size, reverse=True):
+            total -= buffer.shrink(total - self.max_bytes)
+            if total <= self.max_bytes:
+                return
+
+    def stats(self) -> dict:
+        """통계 엔드포인트용 버퍼 현황"""
+        active = sum(1 for buffer in self.streams.values() if not buffer.finished)
+        return {
+            "active_streams": active,
+            "buffered_streams": len(self.streams),
+            "buffered_bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+            "resumes": self.resumes,
+            "evictions": self.evictions,
+        }
+
+
+# 프로세스 전역 스트림 버퍼 관리자
+stream_registry = StreamRegistry()
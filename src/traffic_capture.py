@@ -0,0 +1,162 @@
+"""
+트래픽 캡처 (재현 부하 테스트용)
+
+업스트림으로 전달된 요청의 형태(모델, 스트리밍 여부, 메시지별 역할과 추정 토큰 수, 도착 시각)와
+업스트림 응답 시간 프로필(첫 토큰 지연, 토큰 간 간격, 전체 지연)을 gzip JSONL 파일에 기록한다.
+메시지 내용은 저장하지 않으며 호출자는 해시로만 남긴다.
+기록한 파일은 benchmarks/replay_traffic.py로 재현한다.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+from src.config import CAPTURE_ENABLED, CAPTURE_FILE, CAPTURE_SAMPLE_RATE
+from src.prompt_compression import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def anonymize(value: str) -> str:
+    """호출자 등 식별자를 되돌릴 수 없는 짧은 해시로 변환"""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:12]
+
+
+def to_ms(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+
+class CaptureRecord:
+    """요청 하나의 형태와 업스트림 응답 시간 측정"""
+
+    def __init__(self, capture: "TrafficCapture", endpoint: str, model: str, llm_payload: dict, caller: str):
+        self.capture = capture
+        self.arrived_at = time.time()
+        self.shape = {
+            "endpoint": endpoint,
+            "caller": anonymize(caller),
+            "model": model,
+            "stream": bool(llm_payload.get("stream")),
+            "messages": [[m.get("role", ""), estimate_tokens(str(m.get("content", "")))]
+                         for m in llm_payload.get("messages", [])],
+            "max_tokens": llm_payload.get("max_tokens"),
+        }
+        self.upstream_started: Optional[float] = None
+        self.token_times: List[float] = []
+        self.attempt_times: List[float] = []
+
+    def start(self) -> None:
+        """업스트림 요청 시작 (재시도, 헤지 포함 전체 시간의 기준)"""
+        self.upstream_started = time.monotonic()
+
+    def attempt(self, seconds: float) -> None:
+        """업스트림 시도 하나의 소요 시간 (재시도 대기 제외, 재현 시 시도별로 지연 / 오류 재현)"""
+        self.attempt_times.append(seconds)
+
+    def token(self) -> None:
+        """스트리밍 응답의 내용 청크 수신"""
+        self.token_times.append(time.monotonic())
+
+    def finish(self, status: str, completion_tokens: int = 0) -> None:
+        """측정 종료 후 기록 대기열에 추가 (status: ok, error, cancelled)"""
+        if self.upstream_started is None:
+            return
+        now = time.monotonic()
+        record = {"t": round(self.arrived_at, 3), **self.shape, "status": status,
+                  "completion_tokens": completion_tokens, "latency_ms": to_ms(now - self.upstream_started)}
+        if self.token_times:
+            record["ttfb_ms"] = to_ms(self.token_times[0] - self.upstream_started)
+            record["gaps_ms"] = [to_ms(b - a) for a, b in zip(self.token_times, self.token_times[1:])]
+        if self.attempt_times:
+            record["attempts_ms"] = [to_ms(seconds) for seconds in self.attempt_times]
+        self.capture.pending.append(record)
+
+    def finish_current(self, completion_tokens: int = 0, cancelled: bool = False) -> None:
+        """finally 블록용: 진행 중인 예외가 있으면 error, 취소면 cancelled, 아니면 ok로 기록"""
+        if cancelled:
+            status = "cancelled"
+        else:
+            status = "error" if sys.exc_info()[0] is not None else "ok"
+        self.finish(status, completion_tokens)
+
+
+class TrafficCapture:
+    """요청 형태 / 업스트림 응답 시간 캡처 (메모리에 모아 주기적으로 파일에 추가)"""
+
+    def __init__(self, path: str = CAPTURE_FILE, enabled: bool = CAPTURE_ENABLED,
+                 sample_rate: float = CAPTURE_SAMPLE_RATE, flush_interval: float = 5.0):
+        self.path = path
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.pending: List[dict] = []
+        self.records = 0
+        self.flush_failures = 0
+
+    def begin(self, endpoint: str, model: str, llm_payload: dict, caller: str) -> Optional[CaptureRecord]:
+        """캡처 대상이면 측정 객체 반환 (비활성화 또는 샘플링 제외 시 None)"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        return CaptureRecord(self, endpoint, model, llm_payload, caller)
+
+    def _write(self, batch: List[dict]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # gzip 멤버를 이어 붙이는 방식이라 재시작 후에도 같은 파일에 계속 추가 가능
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            for record in batch:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    async def flush(self) -> None:
+        """대기 중인 기록을 파일에 추가 (실패 시 다음 주기에 다시 시도)"""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.records += len(batch)
+        except Exception as e:
+            self.flush_failures += 1
+            logger.error(f"트래픽 캡처 기록 실패 (다음 주기에 재시도): {e}")
+            self.pending = batch + self.pending
+
+    async def run(self) -> None:
+        """주기적 기록 (백그라운드 태스크, 취소 시 남은 기록 저장)"""
+        if not self.enabled:
+            return
+        logger.info(f"트래픽 캡처 활성화: {self.path} (샘플링 비율 {self.sample_rate:g})")
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+    def stats(self) -> dict:
+        """통계 엔드포인트용 캡처 현황"""
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "records": self.records,
+            "pending": len(self.pending),
+            "flush_failures": self.flush_failures,
+        }
+
+
+def load_capture(path: str) -> List[dict]:
+    """캡처 파일을 도착 시각 순으로 읽음"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda r: r["t"])
+
+
+# 프로세스 전역 트래픽 캡처
+traffic_capture = TrafficCapture()
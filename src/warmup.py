@@ -0,0 +1,96 @@
+"""
+업스트림 커넥션 사전 연결(pre-warming) 및 유휴 구간 keepalive 유지
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Tuple
+
+import httpx
+
+from src.config import (
+    UPSTREAM_PREWARM_CONNECTIONS,
+    UPSTREAM_KEEPALIVE_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# keepalive 주기가 0(비활성화)일 때 재적재로 다시 켜졌는지 확인하는 간격 (초)
+DISABLED_CHECK_INTERVAL = 5.0
+
+
+class UpstreamWarmer:
+    """업스트림 커넥션을 미리 맺고, 유휴 구간에는 가벼운 probe로 최소 개수를 유지"""
+
+    def __init__(self, connections: int = UPSTREAM_PREWARM_CONNECTIONS,
+                 interval: float = UPSTREAM_KEEPALIVE_INTERVAL):
+        self.connections = connections
+        self.interval = interval
+        self.ready = False
+        self.warm_connections = 0
+        self.last_activity = 0.0
+        self.probes = 0
+        self.probe_failures = 0
+        self.last_warmed_at = None
+
+    def touch(self) -> None:
+        """실제 업스트림 요청 발생 기록 (유휴 판단용)"""
+        self.last_activity = time.monotonic()
+
+    async def _probe(self, client: httpx.AsyncClient, url: str, timeout: float) -> bool:
+        """HEAD 요청으로 커넥션 수립 (응답 코드와 무관하게 연결되면 성공)"""
+        self.probes += 1
+        try:
+            response = await client.head(url, timeout=httpx.Timeout(timeout))
+            await response.aclose()
+            return True
+        except Exception as e:
+            self.probe_failures += 1
+            logger.debug(f"업스트림 probe 실패: {e}")
+            return False
+
+    async def warm(self, client: httpx.AsyncClient, url: str, timeout: float) -> int:
+        """동시 probe로 설정된 개수만큼 커넥션을 열어 풀에 보관"""
+        if self.connections <= 0:
+            self.ready = True
+            return 0
+        results = await asyncio.gather(*(self._probe(client, url, timeout) for _ in range(self.connections)))
+        self.warm_connections = sum(results)
+        if self.warm_connections:
+            self.ready = True
+            self.last_warmed_at = time.time()
+        return self.warm_connections
+
+    async def run(self, get_upstream: Callable[[], Tuple[httpx.AsyncClient, str, float]]) -> None:
+        """유휴 구간마다 커넥션 풀을 다시 데움 (백그라운드 태스크)
+
+        get_upstream은 (클라이언트, 업스트림 URL, 연결 타임아웃)을 반환하며,
+        설정 재적재로 클라이언트나 URL이 바뀌어도 최신 값을 사용한다.
+        주기(interval)도 재적재 시 갱신되며, 0이면 다시 켜질 때까지 probe 없이 대기한다.
+        """
+        while True:
+            if self.interval <= 0:
+                await asyncio.sleep(DISABLED_CHECK_INTERVAL)
+                continue
+            await asyncio.sleep(self.interval)
+            # 최근 실제 트래픽이 있었으면 커넥션이 이미 살아 있으므로 생략
+            if time.monotonic() - self.last_activity < self.interval and self.ready:
+                continue
+            warmed = await self.warm(*get_upstream())
+            if not warmed:
+                logger.warning("업스트림 커넥션 유지 probe가 모두 실패했습니다.")
+
+    def status(self) -> dict:
+        """헬스체크용 준비 상태"""
+        return {
+            "ready": self.ready,
+            "warm_connections": self.warm_connections,
+            "target_connections": self.connections,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "last_warmed_at": self.last_warmed_at,
+        }
+
+
+# 프로세스 전역 업스트림 커넥션 사전 연결 관리
+upstream_warmer = UpstreamWarmer()
@@ -0,0 +1,121 @@
+"""
+클라이언트 연결 종료 시 업스트림 요청 취소 (실제 소켓 연결을 끊어서 확인)
+
+느린 대역 업스트림과 프록시 프로세스를 띄운 뒤, 일반(비스트리밍) 요청을 보낸 클라이언트가
+응답 전에 소켓을 닫으면 프록시가 업스트림 요청을 중단하고 cancelled_requests를 올리는지 확인한다.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+
+UPSTREAM_DELAY = 12.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_slow_upstream(state: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        state["started"] += 1
+        deadline = time.monotonic() + UPSTREAM_DELAY
+        while time.monotonic() < deadline:
+            if await request.is_disconnected():
+                # 프록시가 업스트림 연결을 끊음 (요청 취소)
+                state["aborted"] += 1
+                return
+            await asyncio.sleep(0.1)
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": "늦은 응답"},
+                             "finish_reason": "stop"}]}
+
+    return app
+
+
+def wait_until(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    state = {"started": 0, "aborted": 0}
+    upstream_port, proxy_port = free_port(), free_port()
+    upstream = uvicorn.Server(uvicorn.Config(create_slow_upstream(state), host="127.0.0.1",
+                                             port=upstream_port, log_level="warning"))
+    thread = threading.Thread(target=upstream.run, daemon=True)
+    thread.start()
+    assert wait_until(lambda: upstream.started, 10)
+
+    env = {
+        **os.environ,
+        "LLM_API_BASE_URL": f"http://127.0.0.1:{upstream_port}/v1/chat/completions",
+        "API_KEY": "test",
+        "API_MAX_RETRIES": "1",
+        "CAPTURE_ENABLED": "false",
+        "METERING_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "CONFIG_WATCH_INTERVAL": "0",
+        "LOG_DIR": str(tmp_path),
+        "LOG_LEVEL": "WARNING",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.server:create_app", "--factory", "--host", "127.0.0.1",
+         "--port", str(proxy_port), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{proxy_port}"
+
+    def live() -> bool:
+        try:
+            return httpx.get(f"{url}/health/live", timeout=1).status_code == 200
+        except httpx.TransportError:
+            return False
+
+    try:
+        assert wait_until(live, 20), "프록시가 시작되지 않았습니다."
+        yield url, proxy_port, state
+    finally:
+        process.terminate()
+        process.wait()
+        upstream.should_exit = True
+        thread.join(timeout=5)
+
+
+def test_client_disconnect_cancels_non_streaming_request(proxy):
+    url, port, state = proxy
+    body = json.dumps({"model": "gpt-4o", "messages": [{"role": "user", "content": "안녕"}]}).encode()
+    request = (f"POST /v1/chat/completions HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+               f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+
+    started = time.monotonic()
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        sock.sendall(request)
+        assert wait_until(lambda: state["started"] == 1, 5), "업스트림 요청이 시작되지 않았습니다."
+        time.sleep(1.0)
+    # 소켓을 닫은 뒤 업스트림 지연(12초)보다 훨씬 빨리 취소되어야 함
+
+    def cancelled() -> bool:
+        return httpx.get(f"{url}/stats", timeout=1).json()["cancelled_requests"] == 1
+
+    assert wait_until(cancelled, 5), "연결 종료 후에도 요청이 취소되지 않았습니다."
+    assert time.monotonic() - started < UPSTREAM_DELAY / 2
+    assert wait_until(lambda: state["aborted"] == 1, 5), "업스트림 요청이 중단되지 않았습니다."
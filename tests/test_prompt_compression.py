@@ -0,0 +1,31 @@
+"""
+프롬프트 압축: 코드 블록 없는 SQL 뒤의 문장(질문)은 압축 / 삭제하지 않음
+"""
+from src.client import get_mstr_design_prompt
+from src.prompt_compression import MSTR_SQL_MARKER, compress_content
+
+
+def test_prose_after_unfenced_query_is_kept():
+    content = ("SELECT a.x AS x FROM t a WHERE a.y = 1\n\n"
+               "위 쿼리에서 x = 1 인 경우 -- 인덱스 타나요? 실행 계획도  같이 봐줘")
+    compressed = compress_content(content)
+    assert compressed.startswith("SELECT a.x FROM t a WHERE a.y=1\n\n")
+    assert compressed.endswith("위 쿼리에서 x = 1 인 경우 -- 인덱스 타나요? 실행 계획도  같이 봐줘")
+
+
+def test_query_ends_at_semicolon():
+    content = "다음 쿼리 봐줘\nSELECT a.x AS x\n  FROM t a;  -- 이 부분은 질문\n왜 느린가요?"
+    assert compress_content(content) == "다음 쿼리 봐줘\nSELECT a.x FROM t a;  -- 이 부분은 질문\n왜 느린가요?"
+
+
+def test_fenced_block_only():
+    content = "설명:\n```sql\nSELECT a.x AS x\n  FROM t a\n```\n\n--  그대로 두세요"
+    assert compress_content(content) == "설명:\n```sql\nSELECT a.x FROM t a\n```\n\n--  그대로 두세요"
+
+
+def test_mstr_prompt_compresses_whole_embedded_sql():
+    sql = "WITH b AS (\n  SELECT x.k AS k\n    FROM x\n\n)\nSELECT b.k AS k\n  FROM b -- 불필요한 주석\n"
+    compressed = compress_content(get_mstr_design_prompt(sql))
+    head, _, body = compressed.partition(MSTR_SQL_MARKER)
+    assert head == get_mstr_design_prompt(sql).partition(MSTR_SQL_MARKER)[0]
+    assert body == "WITH b AS(SELECT x.k FROM x)SELECT b.k FROM b\n"
@@ -0,0 +1,36 @@
+"""
+시작 시간: src.server import 시간 예산 (python -X importtime) 및 import 시 부수 효과 없음
+
+예산은 STARTUP_IMPORT_BUDGET_MS 환경 변수로 조정한다 (느린 CI 머신 등).
+"""
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_startup import import_profile
+
+IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", "1000"))
+REPEAT = 3
+
+
+def test_server_import_within_budget():
+    # 새 프로세스에서 측정한 누적 import 시간의 최솟값 (일시적인 부하 영향 제외)
+    runs = [import_profile("src.server") for _ in range(REPEAT)]
+    best_us, self_times = min(runs, key=lambda run: run[0])
+    slowest = sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:5]
+    assert best_us / 1000 <= IMPORT_BUDGET_MS, (
+        f"src.server import {best_us / 1000:.0f}ms > 예산 {IMPORT_BUDGET_MS:g}ms, "
+        f"자체 시간 상위: {', '.join(f'{name} {us / 1000:.1f}ms' for name, us in slowest)}"
+    )
+
+
+def test_server_import_has_no_side_effects(tmp_path):
+    # 로그 디렉토리 생성 / 설정 검증 / 앱 생성은 create_app()에서만 수행
+    log_dir = tmp_path / "logs"
+    env = {**os.environ, "LOG_DIR": str(log_dir), "API_KEY": ""}
+    result = subprocess.run(
+        [sys.executable, "-c", "import src.server as s; assert 'app' not in vars(s)"],
+        env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert not log_dir.exists()